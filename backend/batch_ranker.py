@@ -0,0 +1,157 @@
+try:
+    import numpy as np
+except ImportError: # numpy 是可选依赖, 没有时调用方回退到 ScoringKernel
+    np = None
+
+from .compiled_course import MAX_WEEKS, WEEK_BITS, DAYS_PER_WEEK, NODES_PER_DAY
+from .ranker import ScoringKernel, DAY_POPCOUNT, DAY_GAPS
+
+_PACKED_BYTES = (MAX_WEEKS * WEEK_BITS + 7) // 8
+
+
+def numpy_available():
+    return np is not None
+
+
+class BatchRanker:
+    """
+    Vectorized ScheduleRanker for many merged schedules at once.
+
+    Accepted bitmap arrays (axis 1 is indexed by week number like schedule_bitmaps,
+    index 0 is ignored, only weeks 1..25 are scored):
+      - bool/uint8 of shape (N, W, 7, 13): one entry per week/day/node
+      - uint64 of shape (N, W, 2): the 91-bit week mask split into two words
+        (word 0 = bits 0-63, word 1 = bits 64-90)
+    Scores and details are identical to ScheduleRanker.evaluate_bitmap (same float
+    operation order, same value types in details).
+    """
+
+    @staticmethod
+    def _require_numpy():
+        if np is None:
+            raise RuntimeError("BatchRanker requires numpy (pip install numpy)")
+
+    @staticmethod
+    def from_packed(merged_list):
+        """Packed semester integers (see compiled_course) -> bool array (N, 26, 7, 13)."""
+        BatchRanker._require_numpy()
+        n = len(merged_list)
+        raw = b"".join(m.to_bytes(_PACKED_BYTES, 'little') for m in merged_list)
+        bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder='little')
+        bits = bits.reshape(n, _PACKED_BYTES * 8)[:, :MAX_WEEKS * WEEK_BITS]
+        out = np.zeros((n, MAX_WEEKS + 1, DAYS_PER_WEEK, NODES_PER_DAY), dtype=bool)
+        out[:, 1:] = bits.reshape(n, MAX_WEEKS, DAYS_PER_WEEK, NODES_PER_DAY)
+        return out
+
+    @staticmethod
+    def _day_masks(bitmaps):
+        """(N, W, ...) input -> uint16 day masks (N, 25, 7) for weeks 1..25."""
+        arr = np.asarray(bitmaps)
+        n, n_weeks = arr.shape[0], arr.shape[1]
+        weeks = min(n_weeks - 1, MAX_WEEKS)
+        days = np.zeros((n, MAX_WEEKS, DAYS_PER_WEEK), dtype=np.uint16)
+        if weeks <= 0:
+            return days
+
+        if arr.ndim == 4:
+            nodes = arr[:, 1:weeks + 1]
+            nodes = nodes.view(np.uint8) if nodes.dtype == bool else (nodes != 0).view(np.uint8)
+            weights = (1 << np.arange(NODES_PER_DAY)).astype(np.uint16)
+            days[:, :weeks] = nodes @ weights
+        elif arr.ndim == 3 and arr.shape[2] == 2:
+            lo = arr[:, 1:weeks + 1, 0].astype(np.uint64)
+            hi = arr[:, 1:weeks + 1, 1].astype(np.uint64)
+            mask = np.uint64(0x1FFF)
+            for d in range(DAYS_PER_WEEK):
+                shift = d * NODES_PER_DAY
+                if shift + NODES_PER_DAY <= 64:
+                    val = (lo >> np.uint64(shift)) & mask
+                elif shift < 64:
+                    val = ((lo >> np.uint64(shift)) | (hi << np.uint64(64 - shift))) & mask
+                else:
+                    val = (hi >> np.uint64(shift - 64)) & mask
+                days[:, :weeks, d] = val.astype(np.uint16)
+        else:
+            raise ValueError(f"Unsupported bitmap array shape {arr.shape}")
+        return days
+
+    @staticmethod
+    def evaluate(bitmaps, preferences, with_details=True):
+        """
+        Returns {'scores': float64 array (N,), 'details': List[dict] or None}.
+        """
+        BatchRanker._require_numpy()
+        return BatchRanker.evaluate_days(BatchRanker._day_masks(bitmaps), preferences, with_details)
+
+    @staticmethod
+    def day_masks_packed(merged_list):
+        """Packed semester integers -> uint16 day masks (N, 25, 7), the preference-independent part."""
+        return BatchRanker._day_masks(BatchRanker.from_packed(merged_list))
+
+    @staticmethod
+    def evaluate_days(days, preferences, with_details=True):
+        """evaluate() on precomputed day masks (see day_masks_packed), e.g. kept across preference changes."""
+        BatchRanker._require_numpy()
+        kernel = ScoringKernel.for_preferences(preferences)
+        n = days.shape[0]
+
+        early_weeks = weekend_weeks = total_gaps = overload = day_excess = None
+        if kernel.early:
+            early_weeks = ((days & 0b11) != 0).any(axis=2).sum(axis=1)
+        if kernel.weekend:
+            weekend_weeks = (days[:, :, 5:7] != 0).any(axis=2).sum(axis=1)
+        if kernel.compactness:
+            gaps_table = np.asarray(DAY_GAPS, dtype=np.int64)
+            total_gaps = gaps_table[days[:, :, :5]].sum(axis=(1, 2))
+        if kernel.load_limit is not None or kernel.day_limit is not None:
+            counts = np.asarray(DAY_POPCOUNT, dtype=np.int64)[days]
+            if kernel.load_limit is not None:
+                overload = np.maximum(counts - kernel.load_limit, 0).sum(axis=(1, 2))
+            if kernel.day_limit is not None:
+                targets = list(kernel.day_targets)
+                if targets:
+                    day_excess = np.maximum(counts[:, :, targets] - kernel.day_limit, 0).sum(axis=(1, 2))
+                else:
+                    day_excess = np.zeros(n, dtype=np.int64)
+
+        # Same accumulation order as ScoringKernel.evaluate
+        total_penalty = np.zeros(n, dtype=np.float64)
+        total_bonus = np.zeros(n, dtype=np.float64)
+        if kernel.early:
+            total_penalty += early_weeks * 2
+        if kernel.weekend:
+            total_penalty += weekend_weeks * 2.0
+        if kernel.compactness == 'high':
+            total_penalty += total_gaps * 0.2
+        elif kernel.compactness == 'low':
+            total_bonus += total_gaps * 0.2
+        if kernel.load_limit is not None:
+            total_penalty += overload * 5.0
+        if kernel.day_limit is not None:
+            total_penalty += day_excess * 50.0
+        scores = 100.0 + total_bonus - total_penalty
+
+        details = None
+        if with_details:
+            columns = []
+            if kernel.early:
+                columns.append(('早八回避', [-(v * 2) for v in early_weeks.tolist()]))
+            if kernel.weekend:
+                columns.append(('周末回避', [-(v * 2.0) for v in weekend_weeks.tolist()]))
+            if kernel.compactness == 'high':
+                columns.append(('课程紧凑', [-(v * 0.2) for v in total_gaps.tolist()]))
+            elif kernel.compactness == 'low':
+                columns.append(('课程分散', [+(v * 0.2) for v in total_gaps.tolist()]))
+            if kernel.load_limit is not None:
+                columns.append(('每日负载', [-(v * 5.0) for v in overload.tolist()]))
+            if kernel.day_limit is not None:
+                columns.append(('特定日限制', [-(v * 50.0) if v else 0 for v in day_excess.tolist()]))
+            details = [dict(zip([k for k, _ in columns], row)) for row in zip(*[v for _, v in columns])] \
+                if columns else [{} for _ in range(n)]
+
+        return {'scores': scores, 'details': details}
+
+    @staticmethod
+    def evaluate_packed(merged_list, preferences, with_details=True):
+        """Convenience wrapper for packed semester integers."""
+        return BatchRanker.evaluate(BatchRanker.from_packed(merged_list), preferences, with_details)
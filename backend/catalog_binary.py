@@ -0,0 +1,291 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# 列式二进制课程目录 (.ncat), 与 dist/data 的 JSON 逐项等价:
+#
+#   header    <4sHHIIII  magic, version, n_weeks, n_rows, n_sessions, n_strings, n_sections
+#   sections  <II * n_sections  (offset, length), 每段按 8 字节对齐
+#   name / code / teacher / school / location_text   u32[n_rows]  字符串表下标 (NONE = None)
+#   credit / hours                                   f64[n_rows]
+#   bitmaps          n_rows * n_weeks * 12 字节, 每周 91 位小端定长存放
+#   session_offsets  u32[n_rows + 1]  第 i 行的 session 为 [off[i], off[i+1])
+#   sessions         <BBBxII 记录: day, start, end, weeks 位集 (Bit w = 第 w 周), location 下标
+#   string_offsets   u32[n_strings + 1], string_data  UTF-8, 所有字符串列共用一张去重表
+#
+# 所有整数小端存放; 加载时 mmap 整个文件, 行按需解码.
+
+MAGIC = b"NJUC"
+VERSION = 1
+EXTENSION = ".ncat"
+BITMAP_BYTES = 12  # 91 位
+NONE = 0xFFFFFFFF
+
+STRING_COLUMNS = ("name", "code", "teacher", "school", "location_text")
+FLOAT_COLUMNS = ("credit", "hours")
+_SECTIONS = STRING_COLUMNS + FLOAT_COLUMNS + (
+    "bitmaps", "session_offsets", "sessions", "string_offsets", "string_data")
+
+_HEADER = struct.Struct("<4sHHIIII")
+_SECTION = struct.Struct("<II")
+_SESSION = struct.Struct("<BBBxII")
+
+
+def binary_path(json_path):
+    """dist/data/nju_courses_3_2025-2026-2.json -> .../nju_courses_3_2025-2026-2.ncat"""
+    root, _ = os.path.splitext(json_path)
+    return root + EXTENSION
+
+
+def _le(arr):
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def encode_catalog(items):
+    """Cleaned catalog items (NJUCourseClient.clean_row format) -> .ncat bytes."""
+    n_weeks = len(items[0]["schedule_bitmaps"]) if items else 0
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return NONE
+        idx = strings.get(value)
+        if idx is None:
+            idx = strings[value] = len(strings)
+        return idx
+
+    columns = {c: array("I") for c in STRING_COLUMNS}
+    floats = {c: array("d") for c in FLOAT_COLUMNS}
+    bitmaps = bytearray()
+    session_offsets = array("I", [0])
+    sessions = bytearray()
+
+    for row, item in enumerate(items):
+        for c in STRING_COLUMNS:
+            columns[c].append(intern(item.get(c)))
+        for c in FLOAT_COLUMNS:
+            floats[c].append(float(item.get(c) or 0.0))
+
+        week_values = item["schedule_bitmaps"]
+        if len(week_values) != n_weeks:
+            raise ValueError(f"row {row}: {len(week_values)} bitmap weeks, expected {n_weeks}")
+        for value in week_values:
+            bitmaps += int(value).to_bytes(BITMAP_BYTES, "little")  # OverflowError past 96 bits
+
+        for s in item["sessions"]:
+            weeks = 0
+            for w in s["weeks"]:
+                if not 0 <= w < 32:
+                    raise ValueError(f"row {row}: week {w} out of range")
+                weeks |= 1 << w
+            sessions += _SESSION.pack(s["day"], s["start"], s["end"], weeks, intern(s["location"]))
+        session_offsets.append(session_offsets[-1] + len(item["sessions"]))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    string_offsets = array("I", [0])
+    for b in encoded:
+        string_offsets.append(string_offsets[-1] + len(b))
+
+    blobs = [_le(columns[c]) for c in STRING_COLUMNS] + [_le(floats[c]) for c in FLOAT_COLUMNS] + [
+        bytes(bitmaps), _le(session_offsets), bytes(sessions), _le(string_offsets), b"".join(encoded)]
+
+    offset = _HEADER.size + _SECTION.size * len(blobs)
+    table = []
+    body = bytearray()
+    for blob in blobs:
+        pad = -offset % 8
+        body += b"\0" * pad
+        offset += pad
+        table.append(_SECTION.pack(offset, len(blob)))
+        body += blob
+        offset += len(blob)
+    header = _HEADER.pack(MAGIC, VERSION, n_weeks, len(items), len(sessions) // _SESSION.size,
+                          len(encoded), len(blobs))
+    return header + b"".join(table) + bytes(body)
+
+
+def write_catalog(items, path):
+    """Writes items as a .ncat file (via a temp file, so readers never see half a catalog)."""
+    data = encode_catalog(items)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def build_from_json(json_path, out_path=None):
+    """Build step: dist/data JSON -> .ncat next to it (or out_path). Returns the output path."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    out_path = out_path or binary_path(json_path)
+    write_catalog(items, out_path)
+    return out_path
+
+
+class BinaryCatalog:
+    """
+    Memory-mapped, read-only view of a .ncat catalog.
+    Opening only parses the header; rows are decoded on access, so the cost of
+    a lookup doesn't depend on the catalog size. Indexing / iterating yields fresh
+    item dicts identical to the JSON catalog's.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._views = []  # 释放顺序与创建相反, 全部释放后 mmap 才能关闭
+        self._map = None
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = self._view(memoryview(self._map))
+            magic, version, self.n_weeks, self.n_rows, self.n_sessions, self.n_strings, n_sections = \
+                _HEADER.unpack_from(view)
+            if magic != MAGIC or version != VERSION or n_sections != len(_SECTIONS):
+                raise ValueError(f"{path}: not a version {VERSION} catalog")
+            self._sections = {}
+            for i, name in enumerate(_SECTIONS):
+                offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+                self._sections[name] = self._view(view[offset:offset + length])
+        except (ValueError, struct.error) as e:  # 空文件 / 截断 / 其他格式
+            self.close()
+            raise ValueError(f"{path}: not a catalog file ({e})")
+        self._columns = {c: self._array(c, "I") for c in STRING_COLUMNS}
+        self._columns.update({c: self._array(c, "d") for c in FLOAT_COLUMNS})
+        self._session_offsets = self._array("session_offsets", "I")
+        self._string_offsets = self._array("string_offsets", "I")
+        self._strings = {}
+        self._mask_strings = {bytes(BITMAP_BYTES): "0"}  # 12 字节原值 -> 十进制字符串, 多数周相同
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    def _array(self, name, code):
+        section = self._sections[name]
+        if sys.byteorder == "little":
+            return self._view(section.cast(code))
+        arr = array(code, section.tobytes())
+        arr.byteswap()
+        return arr
+
+    def close(self):
+        while self._views:
+            self._views.pop().release()
+        if self._map is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_rows
+
+    def string(self, idx):
+        if idx == NONE:
+            return None
+        value = self._strings.get(idx)
+        if value is None:
+            start, end = self._string_offsets[idx], self._string_offsets[idx + 1]
+            value = self._strings[idx] = str(self._sections["string_data"][start:end], "utf-8")
+        return value
+
+    def column(self, name):
+        """One column for every row, e.g. column('name') for a scan without building items."""
+        values = self._columns[name]
+        if name in FLOAT_COLUMNS:
+            return list(values)
+        return [self.string(i) for i in values]
+
+    def week_masks(self, row):
+        """Week bitmaps of a row as ints (index = week), as CompiledCourse expects."""
+        size = self.n_weeks * BITMAP_BYTES
+        raw = self._sections["bitmaps"][row * size:(row + 1) * size]
+        return [int.from_bytes(raw[i:i + BITMAP_BYTES], "little") for i in range(0, size, BITMAP_BYTES)]
+
+    def bitmap_strings(self, row):
+        """schedule_bitmaps of a row in the JSON form (decimal strings)."""
+        size = self.n_weeks * BITMAP_BYTES
+        raw = bytes(self._sections["bitmaps"][row * size:(row + 1) * size])
+        cache = self._mask_strings
+        out = []
+        for i in range(0, size, BITMAP_BYTES):
+            chunk = raw[i:i + BITMAP_BYTES]
+            text = cache.get(chunk)
+            if text is None:
+                text = cache[chunk] = str(int.from_bytes(chunk, "little"))
+            out.append(text)
+        return out
+
+    def sessions(self, row):
+        out = []
+        start_at, end_at = self._session_offsets[row] * _SESSION.size, self._session_offsets[row + 1] * _SESSION.size
+        for day, start, end, weeks, location in _SESSION.iter_unpack(self._sections["sessions"][start_at:end_at]):
+            out.append({"day": day, "start": start, "end": end,
+                        "weeks": [w for w in range(weeks.bit_length()) if (weeks >> w) & 1],
+                        "location": self.string(location)})
+        return out
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.n_rows
+        if not 0 <= row < self.n_rows:
+            raise IndexError(row)
+        cols = self._columns
+        return {
+            "name": self.string(cols["name"][row]),
+            "code": self.string(cols["code"][row]),
+            "teacher": self.string(cols["teacher"][row]),
+            "credit": cols["credit"][row],
+            "hours": cols["hours"][row],
+            "location_text": self.string(cols["location_text"][row]),
+            "school": self.string(cols["school"][row]),
+            "schedule_bitmaps": self.bitmap_strings(row),
+            "sessions": self.sessions(row),
+        }
+
+    def __iter__(self):
+        for row in range(self.n_rows):
+            yield self[row]
+
+    def items(self):
+        return list(self)
+
+    def export_json(self, path):
+        """JSON export in the dist/data format (byte-identical to what sync_catalog writes)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.items(), f, ensure_ascii=False, indent=2)
+
+
+def load_catalog(path):
+    """Items of a catalog file, .ncat or dist/data JSON."""
+    if path.endswith(EXTENSION):
+        with BinaryCatalog(path) as catalog:
+            return catalog.items()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # python -m backend.catalog_binary build dist/data/*.json
+    # python -m backend.catalog_binary export <file.ncat> <out.json>
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        for src in sys.argv[2:]:
+            out = build_from_json(src)
+            print(f"[Catalog] {src} ({os.path.getsize(src)} B) -> {out} ({os.path.getsize(out)} B)")
+    elif len(sys.argv) == 4 and sys.argv[1] == "export":
+        with BinaryCatalog(sys.argv[2]) as catalog:
+            catalog.export_json(sys.argv[3])
+        print(f"[Catalog] {sys.argv[2]} -> {sys.argv[3]}")
+    else:
+        print("usage: python -m backend.catalog_binary build <json>... | export <ncat> <json>")
+        sys.exit(2)
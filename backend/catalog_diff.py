@@ -0,0 +1,88 @@
+import hashlib
+import json
+
+# Raw qxfbkccx fields that NJUCourseClient.clean_row reads; a row is re-parsed
+# only when one of them changed (YPSJDD / SKJS / XF in practice)
+FINGERPRINT_FIELDS = ("KCM", "KCH", "SKJS", "YPSJDD", "XF", "XS", "PKDWDM_DISPLAY", "KKDWDM_DISPLAY")
+
+
+def section_id(row):
+    """
+    Stable identity of a teaching section: course code + section number (KXH).
+    Rows without KXH fall back to code + teacher + time/place, so for those a
+    change shows up as removed + added instead of modified.
+    """
+    code = row.get("KCH") or ""
+    number = row.get("KXH")
+    if number not in (None, ""):
+        return f"{code}/{number}"
+    return f"{code}/{row.get('SKJS') or ''}/{row.get('YPSJDD') or ''}"
+
+
+def row_fingerprint(row):
+    payload = json.dumps([row.get(f) for f in FINGERPRINT_FIELDS], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def diff_rows(pages, previous, clean_row, item_key):
+    """
+    Rebuilds a catalog from raw pages, reusing the cleaned item of every section
+    whose fingerprint is unchanged since `previous` ({section_id: (fingerprint, item)}).
+    clean_row / item_key: NJUCourseClient.clean_row / item_key, so the items (order,
+    filtering and de-duplication) are exactly what collect_items would produce.
+
+    Returns (items, records, changes):
+      records: [(section_id, fingerprint)] parallel to items
+      changes: {'added': [item], 'removed': [old item],
+                'modified': [{'section', 'before', 'after'}], 'unchanged': n,
+                'parsed': rows re-parsed, 'reused': rows taken from previous,
+                'baseline': True when there was nothing to compare against}
+    """
+    previous = previous or {}
+    items = []
+    records = []
+    seen_hashes = set()
+    seen_sections = set()
+    added, modified = [], []
+    unchanged = parsed = reused = 0
+
+    for rows in pages:
+        for row in rows:
+            sid = section_id(row)
+            fp = row_fingerprint(row)
+            known = previous.get(sid)
+            if known is not None and known[0] == fp:
+                item = known[1]
+                reused += 1
+            else:
+                item = clean_row(row)
+                parsed += 1
+            if item is None:
+                continue
+            key = item_key(item)
+            if key in seen_hashes:
+                continue
+            seen_hashes.add(key)
+            items.append(item)
+            records.append((sid, fp))
+
+            if sid in seen_sections:
+                continue
+            seen_sections.add(sid)
+            if known is None:
+                added.append(item)
+            elif known[0] != fp:
+                modified.append({'section': sid, 'before': known[1], 'after': item})
+            else:
+                unchanged += 1
+
+    removed = [entry[1] for sid, entry in previous.items() if sid not in seen_sections]
+    changes = {'added': added, 'removed': removed, 'modified': modified, 'unchanged': unchanged,
+               'parsed': parsed, 'reused': reused, 'baseline': not previous}
+    return items, records, changes
+
+
+def has_changes(changes):
+    """True for a real change set (a baseline download reports everything as added)."""
+    return bool(changes and not changes.get('baseline')
+                and (changes['added'] or changes['removed'] or changes['modified']))
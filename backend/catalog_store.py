@@ -0,0 +1,245 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .catalog_binary import BinaryCatalog
+from .search_index import CatalogIndex
+
+# Catalogs older than this are still served, but trigger a background refresh
+DEFAULT_TTL = 24 * 3600
+# A failed background refresh is retried no sooner than this
+RETRY_DELAY = 15 * 60
+# 默认放在项目根目录 (main.py 旁), 不随启动时的工作目录变化
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogs (
+    campus TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (campus, semester)
+);
+CREATE TABLE IF NOT EXISTS courses (
+    campus TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    name_lc TEXT NOT NULL,
+    code_lc TEXT NOT NULL,
+    data TEXT NOT NULL,
+    section_id TEXT,
+    fingerprint TEXT,
+    PRIMARY KEY (campus, semester, seq)
+);
+"""
+
+# Columns added after the first release of the schema: (name, type)
+_LATE_COLUMNS = (("section_id", "TEXT"), ("fingerprint", "TEXT"))
+
+
+class CatalogStore:
+    """
+    Local SQLite copy of whole campus/semester catalogs.
+    Rows are the cleaned items NJUCourseClient.search returns (bitmaps and
+    sessions included), kept in catalog order and searched with the same
+    keyword semantics as dist/functions/search.js: case-insensitive substring,
+    name keywords split on whitespace and joined by OR / AND, code as one substring.
+    Searches go through an in-memory CatalogIndex built on first use and dropped
+    whenever the catalog is replaced.
+    The database file is only created by the first write.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.RLock()
+        self._indexes = {}  # (campus, semester) -> CatalogIndex
+
+    def _connect(self, create=False):
+        if self._conn is None:
+            if not create and not os.path.exists(self.db_path):
+                return None
+            folder = os.path.dirname(self.db_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            # 后台刷新线程与 Api 线程共用一个连接, 由 _lock 串行化
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            existing = {r[1] for r in self._conn.execute("PRAGMA table_info(courses)")}
+            for name, kind in _LATE_COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE courses ADD COLUMN {name} {kind}")
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def info(self, campus, semester):
+        """{'fetched_at', 'row_count', 'age', 'stale'} or None when the catalog isn't stored."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT fetched_at, row_count FROM catalogs WHERE campus = ? AND semester = ?",
+                (campus, semester)).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        return {'fetched_at': row[0], 'row_count': row[1], 'age': age, 'stale': age >= self.ttl}
+
+    def replace_catalog(self, campus, semester, items, fetched_at=None, records=None):
+        """
+        Atomically swaps in a freshly downloaded catalog (items in catalog order).
+        records: optional [(section_id, fingerprint)] parallel to items, kept for
+        incremental refreshes (see sections()).
+        """
+        if records is None:
+            records = [(None, None)] * len(items)
+        rows = [
+            (campus, semester, seq, (item.get('name') or '').lower(), (item.get('code') or '').lower(),
+             json.dumps(item, ensure_ascii=False), sid, fp)
+            for seq, (item, (sid, fp)) in enumerate(zip(items, records))
+        ]
+        with self._lock:
+            conn = self._connect(create=True)
+            with conn:
+                conn.execute("DELETE FROM courses WHERE campus = ? AND semester = ?", (campus, semester))
+                conn.executemany(
+                    "INSERT INTO courses (campus, semester, seq, name_lc, code_lc, data, section_id, fingerprint)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO catalogs VALUES (?, ?, ?, ?)",
+                             (campus, semester, fetched_at if fetched_at is not None else time.time(), len(rows)))
+            self._indexes.pop((campus, semester), None)
+        return len(rows)
+
+    def import_json(self, campus, semester, path, fetched_at=0):
+        """
+        Seeds a catalog from a dist/data JSON dump. The file's mtime says nothing about
+        when it was crawled, so a seed counts as fetched at `fetched_at` (default: never,
+        i.e. stale at once). An empty dump is not stored; returns the row count.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        if not items:
+            return 0
+        return self.replace_catalog(campus, semester, items, fetched_at=fetched_at)
+
+    def import_binary(self, campus, semester, path, fetched_at=0):
+        """Seeds a catalog from a .ncat file (see backend/catalog_binary.py), as import_json."""
+        with BinaryCatalog(path) as catalog:
+            items = catalog.items()
+        if not items:
+            return 0
+        return self.replace_catalog(campus, semester, items, fetched_at=fetched_at)
+
+    def sections(self, campus, semester):
+        """{section_id: (fingerprint, item)} of the stored catalog; rows stored without records are left out."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return {}
+            rows = conn.execute(
+                "SELECT section_id, fingerprint, data FROM courses WHERE campus = ? AND semester = ?"
+                " AND section_id IS NOT NULL ORDER BY seq", (campus, semester)).fetchall()
+        return {sid: (fp, json.loads(data)) for sid, fp, data in rows}
+
+    def load(self, campus, semester):
+        """The whole stored catalog, in catalog order."""
+        return self._query(campus, semester, "", [])
+
+    def index(self, campus, semester):
+        """CatalogIndex of a stored catalog (built once), or None when the catalog isn't stored."""
+        with self._lock:
+            index = self._indexes.get((campus, semester))
+            if index is None:
+                items = self.load(campus, semester)
+                if items is None:
+                    return None
+                index = self._indexes[(campus, semester)] = CatalogIndex(items)
+        return index
+
+    def search(self, campus, semester, course_name=None, course_code=None, match_mode="OR", teacher=None):
+        """
+        Local equivalent of NJUCourseClient.search. Returns None when the catalog
+        isn't stored, so callers can fall back to the network.
+        Items come from the shared index, treat them as read-only.
+        """
+        index = self.index(campus, semester)
+        if index is None:
+            return None
+        return index.search(course_name, course_code, match_mode, teacher)
+
+    def _query(self, campus, semester, where, args):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            known = conn.execute("SELECT 1 FROM catalogs WHERE campus = ? AND semester = ?",
+                                 (campus, semester)).fetchone()
+            if known is None:
+                return None
+            rows = conn.execute(
+                "SELECT data FROM courses WHERE campus = ? AND semester = ?" + where + " ORDER BY seq",
+                [campus, semester] + args).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+class CatalogRefresher:
+    """
+    Background refresh of stale catalogs, at most one per campus/semester at a time.
+    fetch(campus, semester, previous) -> (items, records, changes) downloads a whole
+    catalog; previous is the store's sections() so unchanged rows needn't be re-parsed,
+    records / changes may be None. on_update(campus, semester, items, changes) runs
+    after the store was replaced.
+    A failed refresh keeps the stored (stale) catalog and is only retried after
+    retry_delay; failures lists them as {(campus, semester): {'error', 'retry_at'}}.
+    """
+
+    def __init__(self, store, fetch, on_update=None, retry_delay=RETRY_DELAY):
+        self.store = store
+        self.fetch = fetch
+        self.on_update = on_update
+        self.retry_delay = retry_delay
+        self.failures = {}
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def refresh_async(self, campus, semester, force=False):
+        """Starts a refresh; False when one is running or, unless force, a failed one isn't due for retry yet."""
+        key = (campus, semester)
+        with self._lock:
+            if key in self._running:
+                return False
+            failure = self.failures.get(key)
+            if failure and not force and time.time() < failure['retry_at']:
+                return False
+            self._running.add(key)
+        threading.Thread(target=self._refresh, args=key, daemon=True).start()
+        return True
+
+    def _refresh(self, campus, semester):
+        try:
+            items, records, changes = self.fetch(campus, semester, self.store.sections(campus, semester))
+            if items:
+                # An empty result is more likely a failed crawl than an empty semester
+                self.store.replace_catalog(campus, semester, items, records=records)
+                print(f"[Catalog] Refreshed {campus}/{semester}: {len(items)} rows")
+                if self.on_update:
+                    self.on_update(campus, semester, items, changes)
+            with self._lock:
+                self.failures.pop((campus, semester), None)
+        except Exception as e:
+            # 保留旧目录, 稍后再试; 后台刷新失败不打扰用户
+            print(f"[Catalog] Refresh {campus}/{semester} failed, retry in {self.retry_delay}s: {e}")
+            with self._lock:
+                self.failures[(campus, semester)] = {'error': str(e), 'retry_at': time.time() + self.retry_delay}
+        finally:
+            with self._lock:
+                self._running.discard((campus, semester))
@@ -0,0 +1,125 @@
+from functools import lru_cache
+
+# 位图布局 (与 jwFetcher.ScheduleBitmapper 一致):
+# 每周 7 天 * 13 节 = 91 位, Bit = Day(0-6) * 13 + Node(0-12)
+NODES_PER_DAY = 13
+DAYS_PER_WEEK = 7
+WEEK_BITS = NODES_PER_DAY * DAYS_PER_WEEK  # 91
+MAX_WEEKS = 25
+WEEK_MASK = (1 << WEEK_BITS) - 1
+DAY_MASK = (1 << NODES_PER_DAY) - 1
+
+
+def week_shift(week):
+    """Bit offset of `week` (1-based) inside a packed semester integer."""
+    return (week - 1) * WEEK_BITS
+
+
+def unpack_week(packed, week):
+    """Extracts the 91-bit mask of one week from a packed semester integer."""
+    return (packed >> ((week - 1) * WEEK_BITS)) & WEEK_MASK
+
+
+def describe_slot(bit_pos):
+    """Formats a packed bit position the way courses_conflict_with_details does."""
+    week = bit_pos // WEEK_BITS + 1
+    bit = bit_pos % WEEK_BITS
+    day = (bit // NODES_PER_DAY) + 1
+    node = (bit % NODES_PER_DAY) + 1
+    return f"Week {week} Day {day} Node {node}"
+
+
+class CompiledCourse:
+    """
+    Precompiled, immutable view of a course's schedule_bitmaps.
+    packed:       整个学期压成一个整数, 第 w 周占 [(w-1)*91, w*91) 位
+    any_week:     所有周的 91 位掩码按位或 (某个时段在任意一周有课)
+    active_weeks: 有课的周集合, Bit w 表示第 w 周
+    week_masks:   解析后的逐周整数 (index=周次, 0 不使用)
+    """
+    __slots__ = ('packed', 'any_week', 'active_weeks', 'week_masks', '_cells')
+
+    def __init__(self, week_masks):
+        packed = 0
+        any_week = 0
+        active_weeks = 0
+        for w in range(1, len(week_masks)):
+            mask = week_masks[w]
+            if mask:
+                packed |= mask << ((w - 1) * WEEK_BITS)
+                any_week |= mask
+                active_weeks |= 1 << w
+        self.packed = packed
+        self.any_week = any_week
+        self.active_weeks = active_weeks
+        self.week_masks = week_masks
+        self._cells = None
+
+    def conflicts_with(self, other):
+        return (self.packed & other.packed) != 0
+
+    def first_overlap(self, other):
+        """Returns the lowest overlapping packed bit position, or -1."""
+        overlap = self.packed & other.packed
+        if not overlap:
+            return -1
+        return (overlap & -overlap).bit_length() - 1
+
+    def weeks(self):
+        """Active week numbers in ascending order."""
+        aw = self.active_weeks
+        return [w for w in range(aw.bit_length()) if (aw >> w) & 1]
+
+    def popcount(self):
+        return bin(self.packed).count('1')
+
+    def cells(self):
+        """
+        Non-empty (week, day, day_bits) cells for weeks 1..MAX_WEEKS, computed once.
+        day_bits is the 13-bit node mask of that day.
+        """
+        if self._cells is None:
+            cells = []
+            for w in range(1, min(len(self.week_masks), MAX_WEEKS + 1)):
+                mask = self.week_masks[w]
+                if not mask:
+                    continue
+                for d in range(DAYS_PER_WEEK):
+                    day_bits = (mask >> (d * NODES_PER_DAY)) & DAY_MASK
+                    if day_bits:
+                        cells.append((w, d, day_bits))
+            self._cells = tuple(cells)
+        return self._cells
+
+
+def _to_int(val):
+    if isinstance(val, str):
+        try:
+            return int(val)
+        except ValueError:
+            return 0
+    return val or 0
+
+
+@lru_cache(maxsize=8192)
+def _compile_bitmaps(bitmap_tuple):
+    return CompiledCourse(tuple(_to_int(x) for x in bitmap_tuple))
+
+
+def compile_course(course):
+    """
+    Returns the CompiledCourse record for a course dict (or passes a record through).
+    Records are memoized on the bitmap content, so candidates that come back over
+    the bridge as fresh dicts still share one record per distinct schedule.
+    """
+    if isinstance(course, CompiledCourse):
+        return course
+    return _compile_bitmaps(tuple(course.get('schedule_bitmaps', ())))
+
+
+def merge_packed(records):
+    """Bitwise OR of the packed semesters of several records."""
+    merged = 0
+    for r in records:
+        merged |= r.packed
+    return merged
@@ -0,0 +1,132 @@
+import heapq
+
+from .compiled_course import MAX_WEEKS, DAYS_PER_WEEK, NODES_PER_DAY, DAY_MASK, unpack_week
+from .ranker import ScoringKernel, EARLY_MASK, WEEKEND_MASK
+
+
+def group_envelope(records):
+    """OR of every candidate's packed semester: all slots the group could ever occupy."""
+    env = 0
+    for r in records:
+        env |= r.packed
+    return env
+
+
+def conflict_components(group_records):
+    """
+    Splits groups into connected components of the conflict graph (an edge means
+    some candidate of one group overlaps some candidate of the other).
+    Returns a list of group index lists, each in the original (MRV) order.
+    """
+    n = len(group_records)
+    envelopes = [group_envelope(g) for g in group_records]
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i in range(n):
+        for j in range(i + 1, n):
+            if envelopes[i] & envelopes[j]:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[rj] = ri
+
+    components = {}
+    for i in range(n):
+        components.setdefault(find(i), []).append(i)
+    return sorted(components.values(), key=lambda c: c[0])
+
+
+def _footprint(envelope, kernel):
+    """
+    The parts of the score a component can touch, as bit sets:
+    (early weeks, weekend weeks, Mon-Fri (week, day) cells, counted (week, day) cells).
+    """
+    early_weeks = 0
+    weekend_weeks = 0
+    gap_cells = 0
+    count_cells = 0
+    for w in range(1, MAX_WEEKS + 1):
+        week = unpack_week(envelope, w)
+        if not week:
+            continue
+        if week & EARLY_MASK:
+            early_weeks |= 1 << w
+        if week & WEEKEND_MASK:
+            weekend_weeks |= 1 << w
+        for d in range(DAYS_PER_WEEK):
+            if (week >> (d * NODES_PER_DAY)) & DAY_MASK:
+                cell = 1 << (w * DAYS_PER_WEEK + d)
+                if d < 5:
+                    gap_cells |= cell
+                if kernel.load_limit is not None or (kernel.day_limit is not None and d in kernel.day_targets):
+                    count_cells |= cell
+    return early_weeks, weekend_weeks, gap_cells, count_cells
+
+
+def is_separable(components, group_records, preferences):
+    """
+    True when the score of a combined schedule is 100 + the sum of each component's
+    (score - 100): every enabled term only sees weeks/days that at most one
+    component can occupy.
+    """
+    kernel = ScoringKernel.for_preferences(preferences)
+    enabled = (kernel.early, kernel.weekend, kernel.compactness is not None,
+               kernel.load_limit is not None or kernel.day_limit is not None)
+    if not any(enabled):
+        return True
+
+    seen = [0, 0, 0, 0]
+    for comp in components:
+        env = 0
+        for g in comp:
+            env |= group_envelope(group_records[g])
+        for k, part in enumerate(_footprint(env, kernel)):
+            if not enabled[k]:
+                continue
+            if seen[k] & part:
+                return False
+            seen[k] |= part
+    return True
+
+
+def merge_k_best(lists, k):
+    """
+    k-best sums across lists, ties broken by the combined path.
+    lists: one list per component of (value, path), path a tuple of (group, candidate)
+           pairs sorted by group; each list best first under (value desc, path asc).
+    Returns up to k (total_value, path) best first under the same order, path being
+    the union of one path per list, sorted by group (so tuple order is the order of
+    the full interleaved path, as in the joint search).
+    Each list only needs its own top k: any entry below that is beaten by k entries
+    of the same list, and swapping those in gives k better combinations.
+    """
+    combined = [(0.0, ())]
+    for items in lists:
+        if not items:
+            return []
+        combined = _merge_two(combined, items, k)
+    return combined
+
+
+def _merge_two(a, b, k):
+    # (i + 1, j) and (i, j + 1) never precede (i, j): lower or equal value, and on a tie
+    # only one list's part of the path changes, for a later one
+    def entry(i, j):
+        return (-(a[i][0] + b[j][0]), tuple(heapq.merge(a[i][1], b[j][1])), i, j)
+
+    result = []
+    heap = [entry(0, 0)]
+    seen = {(0, 0)}
+    while heap and len(result) < k:
+        neg, path, i, j = heapq.heappop(heap)
+        result.append((-neg, path))
+        for ni, nj in ((i + 1, j), (i, j + 1)):
+            if ni < len(a) and nj < len(b) and (ni, nj) not in seen:
+                seen.add((ni, nj))
+                heapq.heappush(heap, entry(ni, nj))
+    return result
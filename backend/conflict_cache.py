@@ -0,0 +1,79 @@
+from .compiled_course import compile_course, describe_slot
+
+
+class ConflictCache:
+    """
+    Pairwise candidate conflict results, kept across Api calls.
+    Keyed by candidate identity (code + location_text); each candidate owns a row
+    {other_key: reason} where reason is "" for no conflict. Rows fill lazily, so
+    selecting one more candidate only computes that candidate's pairs.
+    A row is dropped when the same identity shows up with a different bitmap
+    (i.e. the catalog changed), or explicitly through invalidate().
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._records = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(course):
+        code = course.get('code')
+        location = course.get('location_text')
+        if code is None and location is None:
+            # Hand-built candidates without identity fields: fall back to content
+            return ('__bitmaps__', tuple(course.get('schedule_bitmaps', ())))
+        return (code, location)
+
+    def _record(self, course):
+        """Compiled record for the candidate; a changed bitmap invalidates its row."""
+        key = self.key(course)
+        record = compile_course(course)
+        known = self._records.get(key)
+        if known is not record:
+            if known is not None:
+                self.invalidate(key)
+            self._records[key] = record
+        return key, record
+
+    def conflict(self, course_a, course_b):
+        """Same contract as ScheduleSolver.courses_conflict_with_details: (bool, reason)."""
+        key_a, rec_a = self._record(course_a)
+        key_b, rec_b = self._record(course_b)
+        row = self._rows.get(key_a)
+        if row is not None and key_b in row:
+            self.hits += 1
+            reason = row[key_b]
+            return bool(reason), reason
+
+        self.misses += 1
+        bit_pos = rec_a.first_overlap(rec_b)
+        reason = describe_slot(bit_pos) if bit_pos >= 0 else ""
+        self._rows.setdefault(key_a, {})[key_b] = reason
+        self._rows.setdefault(key_b, {})[key_a] = reason
+        return bool(reason), reason
+
+    def invalidate(self, key=None):
+        """Drops one candidate's row (and its mirror entries), or everything when key is None."""
+        if key is None:
+            self._rows.clear()
+            self._records.clear()
+            return
+        row = self._rows.pop(key, None)
+        self._records.pop(key, None)
+        if row:
+            for other in row:
+                other_row = self._rows.get(other)
+                if other_row is not None:
+                    other_row.pop(key, None)
+
+    def refresh(self, courses):
+        """Feeds fresh catalog rows (e.g. search results); rows whose bitmap changed are dropped."""
+        for course in courses:
+            key = self.key(course)
+            if key in self._records:
+                self._record(course)
+
+    def stats(self):
+        return {'rows': len(self._rows), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,175 @@
+import time
+
+# 每隔多少个节点检查一次时间预算 (2 的幂)
+_CLOCK_POLL_NODES = 1024
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+def _popcount(x):
+    return bin(x).count('1')
+
+
+class CombinationCounter:
+    """
+    Exact number of conflict-free combinations (one candidate per group), without
+    enumerating them.
+
+    Conflicts are pairwise, so once some groups are assigned the number of ways to
+    finish depends only on the remaining groups' narrowed candidate sets. The
+    counter assigns the group with the fewest options, narrows the others with the
+    compat masks (as TopKSearch's forward checking does), splits the remaining
+    groups into independent parts (no clashing pair left between them) and
+    multiplies their counts; two groups left are counted directly. Every state is
+    memoized on its (group, candidate set) tuple, so subproblems shared by many
+    prefixes are counted once.
+
+    weights: optional weights[g][i] per candidate (e.g. the size of a meta-candidate's
+             alternatives list); the count is then the sum over combinations of the
+             product of weights, i.e. the number of section-level combinations.
+    max_nodes / max_seconds: optional budget; count() returns None (unknown) past it.
+    stats counts: nodes (branches tried), memo_hits, splits (independent parts found).
+    """
+
+    def __init__(self, group_records, compat, weights=None, max_nodes=None, max_seconds=None):
+        self.n = len(group_records)
+        self.compat = compat
+        self.weights = weights
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self._node_limit = float('inf') if max_nodes is None else max_nodes
+        self._deadline = None
+        self.memo = {}
+        self.stats = {'nodes': 0, 'memo_hits': 0, 'splits': 0}
+        # Pairs with no clash at all can never tie two groups together
+        self.neighbours = [
+            [h for h in range(self.n)
+             if h != g and any(row[h] != (1 << len(group_records[h])) - 1 for row in compat[g])]
+            for g in range(self.n)
+        ]
+
+    def count(self):
+        """The (weighted) count, or None when the budget ran out first."""
+        if not self.n:
+            return 1
+        if self.max_seconds is not None:
+            self._deadline = time.monotonic() + self.max_seconds
+        try:
+            return self._count(tuple((g, (1 << len(self.compat[g])) - 1) for g in range(self.n)))
+        except _OutOfBudget:
+            return None
+
+    def _past_deadline(self):
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+    def _weight(self, g, dom):
+        """Count of a group with no constraint left: its (weighted) candidate total."""
+        if self.weights is None:
+            return _popcount(dom)
+        weights = self.weights[g]
+        total = 0
+        while dom:
+            low = dom & -dom
+            total += weights[low.bit_length() - 1]
+            dom ^= low
+        return total
+
+    def _clashes(self, g, dom_g, h, dom_h):
+        """True when some candidate left in g rules out some candidate left in h."""
+        rows = self.compat[g]
+        while dom_g:
+            low = dom_g & -dom_g
+            if rows[low.bit_length() - 1][h] & dom_h != dom_h:
+                return True
+            dom_g ^= low
+        return False
+
+    def _parts(self, state):
+        """Splits state ((g, dom), ...) into parts with no clashing pair between them."""
+        domains = dict(state)
+        seen = set()
+        parts = []
+        for g, _ in state:
+            if g in seen:
+                continue
+            seen.add(g)
+            part = [g]
+            stack = [g]
+            while stack:
+                x = stack.pop()
+                for h in self.neighbours[x]:
+                    if h in domains and h not in seen and self._clashes(x, domains[x], h, domains[h]):
+                        seen.add(h)
+                        part.append(h)
+                        stack.append(h)
+            parts.append(tuple(sorted((h, domains[h]) for h in part)))
+        return parts
+
+    def _pair(self, a, b):
+        """Count of two groups: for each candidate left in a, the candidates of b it allows."""
+        (g, dom_g), (h, dom_h) = a, b
+        rows = self.compat[g]
+        weights = self.weights[g] if self.weights is not None else None
+        total = 0
+        while dom_g:
+            low = dom_g & -dom_g
+            dom_g ^= low
+            i = low.bit_length() - 1
+            sub = self._weight(h, dom_h & rows[i][h])
+            total += sub * weights[i] if weights is not None else sub
+        return total
+
+    def _count(self, state):
+        """state: ((g, candidate set), ...) of the unassigned groups, in group order."""
+        if len(state) == 1:
+            return self._weight(*state[0])
+        found = self.memo.get(state)
+        if found is not None:
+            self.stats['memo_hits'] += 1
+            return found
+
+        if len(state) == 2:
+            total = self._pair(*state)
+        else:
+            parts = self._parts(state)
+            if len(parts) > 1:
+                self.stats['splits'] += len(parts) - 1
+                total = 1
+                for part in parts:
+                    total *= self._count(part)
+                    if not total:
+                        break
+            else:
+                total = self._branch(state)
+        self.memo[state] = total
+        return total
+
+    def _branch(self, state):
+        # Branch on the group with the fewest candidates left
+        pos = min(range(len(state)), key=lambda k: _popcount(state[k][1]))
+        g, dom = state[pos]
+        rest = state[:pos] + state[pos + 1:]
+        rows = self.compat[g]
+        weights = self.weights[g] if self.weights is not None else None
+        stats = self.stats
+        total = 0
+        while dom:
+            low = dom & -dom
+            dom ^= low
+            i = low.bit_length() - 1
+            nodes = stats['nodes'] = stats['nodes'] + 1
+            if nodes > self._node_limit or (not nodes & (_CLOCK_POLL_NODES - 1) and self._past_deadline()):
+                raise _OutOfBudget()
+            row = rows[i]
+            narrowed = []
+            for h, d in rest:
+                m = d & row[h]
+                if not m:
+                    break
+                narrowed.append((h, m))
+            else:
+                sub = self._count(tuple(narrowed))
+                total += sub * weights[i] if weights is not None else sub
+        return total
@@ -0,0 +1,122 @@
+from .components import conflict_components, group_envelope
+
+# 报告里最多列出的冲突时间段 (完整列表在 slots 里)
+_MESSAGE_SLOTS = 5
+# 每隔多少个节点检查一次 stop (取消 / 截止时间)
+_STOP_POLL_NODES = 2048
+
+
+class DiagnosisAborted(Exception):
+    """The node budget ran out, or stop() asked to give up, before a core was found."""
+
+
+class NodeBudget:
+    """
+    Node allowance shared by every feasibility check of one diagnosis.
+    max_nodes: None for no limit; stop: optional callable() polled every
+    _STOP_POLL_NODES nodes. spend() raises DiagnosisAborted past either.
+    """
+
+    def __init__(self, max_nodes=None, stop=None):
+        self.max_nodes = max_nodes
+        self.stop = stop
+        self.nodes = 0
+        self._next_poll = _STOP_POLL_NODES
+
+    def spend(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise DiagnosisAborted(f"node budget of {self.max_nodes} exhausted")
+        if self.nodes >= self._next_poll:
+            self._next_poll += _STOP_POLL_NODES
+            if self.stop is not None and self.stop():
+                raise DiagnosisAborted("stopped")
+
+
+def is_feasible(group_records, compat, members, stats=None, budget=None):
+    """
+    True when the groups `members` (indices into group_records) have a conflict-free
+    assignment. Forward-checking DFS with dynamic MRV that stops at the first leaf.
+    compat: TopKSearch._compat_masks(group_records).
+    budget: optional NodeBudget charged one unit per node.
+    """
+    if not members:
+        return True
+    domains = {g: (1 << len(group_records[g])) - 1 for g in members}
+
+    def visit(domains):
+        g = min(domains, key=lambda h: bin(domains[h]).count('1'))
+        dom = domains[g]
+        rest = [h for h in domains if h != g]
+        rows = compat[g]
+        while dom:
+            low = dom & -dom
+            dom ^= low
+            if stats is not None:
+                stats['nodes'] = stats.get('nodes', 0) + 1
+            if budget is not None:
+                budget.spend()
+            row = rows[low.bit_length() - 1]
+            narrowed = {}
+            for h in rest:
+                m = domains[h] & row[h]
+                if not m:
+                    break
+                narrowed[h] = m
+            else:
+                if not narrowed or visit(narrowed):
+                    return True
+        return False
+
+    return visit(domains)
+
+
+def minimal_infeasible_core(group_records, compat, stats=None, budget=None):
+    """
+    A minimal set of groups with no conflict-free assignment (dropping any one of
+    them makes the rest feasible), as sorted group indices; None when all groups
+    together are feasible.
+    Only the conflict-graph components can be infeasible on their own, so the
+    first infeasible component is filtered: each group is removed in turn and
+    stays out if the remaining groups are still infeasible (deletion filtering).
+    budget: optional NodeBudget over all checks; raises DiagnosisAborted when spent.
+    """
+    for comp in conflict_components(group_records):
+        if stats is not None:
+            stats['checks'] = stats.get('checks', 0) + 1
+        if is_feasible(group_records, compat, comp, stats, budget):
+            continue
+        core = list(comp)
+        # Groups with many candidates are the likeliest to be unnecessary, try them first
+        for g in sorted(comp, key=lambda h: -len(group_records[h])):
+            trial = [h for h in core if h != g]
+            if stats is not None:
+                stats['checks'] = stats.get('checks', 0) + 1
+            if not is_feasible(group_records, compat, trial, stats, budget):
+                core = trial
+        return sorted(core)
+    return None
+
+
+def contested_slots(group_records, core):
+    """Packed bit positions that at least two groups of the core can occupy, ascending."""
+    seen = 0
+    contested = 0
+    for g in core:
+        env = group_envelope(group_records[g])
+        contested |= seen & env
+        seen |= env
+    slots = []
+    while contested:
+        low = contested & -contested
+        slots.append(low.bit_length() - 1)
+        contested ^= low
+    return slots
+
+
+def describe_core(names, slots):
+    """One-line message for the frontend; slots are describe_slot strings (courses_conflict_with_details format)."""
+    text = ", ".join(slots[:_MESSAGE_SLOTS])
+    if len(slots) > _MESSAGE_SLOTS:
+        text += f" 等 {len(slots)} 个时间段"
+    return f"{' + '.join(names)} 无法同时安排 (争用: {text})"
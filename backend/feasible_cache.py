@@ -0,0 +1,192 @@
+import heapq
+import threading
+
+from .batch_ranker import BatchRanker, numpy_available, np
+from .ranker import ScoringKernel
+from .compiled_course import MAX_WEEKS, DAYS_PER_WEEK
+
+# 计算 day masks 时每块的方案数 (from_packed 每个方案先展开成 26*7*13 的布尔数组)
+_SCORE_CHUNK = 4096
+# 每个组合缓存的 uint16 day masks 字节数 (有 numpy 时)
+_DAY_MASK_BYTES = MAX_WEEKS * DAYS_PER_WEEK * 2
+# 枚举时每隔多少个节点检查一次 stop (取消 / 截止时间)
+_STOP_POLL_NODES = 2048
+
+
+class _Overflow(Exception):
+    pass
+
+
+class EnumerationStopped(Exception):
+    """enumerate_feasible's stop callback asked to give up (cancel / deadline)."""
+
+
+class FeasibleSet:
+    """
+    Every conflict-free combination of one basket's meta-candidates.
+    paths:  one flat bytes / array blob, n_groups candidate indices per combination
+            (in DFS order, so combination order == path order)
+    merged: the packed semester bitmap of each combination
+    With numpy the (N, 25, 7) day masks of `merged` are kept after the first scoring,
+    so re-ranking for new preferences is only BatchRanker.evaluate_days.
+    """
+
+    def __init__(self, n_groups, paths, merged):
+        self.n_groups = n_groups
+        self.paths = paths
+        self.merged = merged
+        self._days = None
+
+    def __len__(self):
+        return len(self.merged)
+
+    def path(self, i):
+        n = self.n_groups
+        return tuple(self.paths[i * n:(i + 1) * n])
+
+    def scores(self, preferences):
+        """
+        Score of every combination: float64 array through BatchRanker when numpy is
+        there (same floats as ScoringKernel), else a list.
+        """
+        if numpy_available() and len(self.merged) > 16:
+            if self._days is None:
+                self._days = np.concatenate([
+                    BatchRanker.day_masks_packed(self.merged[start:start + _SCORE_CHUNK])
+                    for start in range(0, len(self.merged), _SCORE_CHUNK)])
+            return BatchRanker.evaluate_days(self._days, preferences, with_details=False)['scores']
+        kernel = ScoringKernel.for_preferences(preferences)
+        return [kernel.score(m) for m in self.merged]
+
+    def top_k(self, preferences, k):
+        """[(score, path)] best first, ties in path order (as TopKSearch.results)."""
+        scores = self.scores(preferences)
+        if not isinstance(scores, list):
+            best = np.argsort(-scores, kind='stable')[:k].tolist()
+            return [(float(scores[i]), self.path(i)) for i in best]
+        best = heapq.nsmallest(k, range(len(scores)), key=lambda i: (-scores[i], i))
+        return [(scores[i], self.path(i)) for i in best]
+
+
+def enumerate_feasible(group_records, compat, max_combinations, max_bytes, max_nodes=None, stop=None):
+    """
+    DFS with forward checking over all groups (static order), collecting every leaf.
+    compat: TopKSearch._compat_masks(group_records).
+    max_nodes: budget of visited nodes; a basket with few leaves can still have a
+               huge dead-end tree (e.g. n groups sharing n-1 slots), that is where it stops.
+    stop: optional callable() polled every _STOP_POLL_NODES nodes; a truthy return
+          raises EnumerationStopped.
+    Returns a FeasibleSet, or None once the set outgrows max_combinations / max_bytes
+    or the walk outgrows max_nodes.
+    """
+    n = len(group_records)
+    wide = any(len(g) > 255 for g in group_records)
+    per_leaf = n + 32 + (_DAY_MASK_BYTES if numpy_available() else 0)
+    paths = bytearray() if not wide else []
+    merged = []
+    size = [0]
+    nodes = [0, _STOP_POLL_NODES]  # visited, next stop poll
+    path = [0] * n
+
+    def visit(level, domains, occupied):
+        dom = domains[level]
+        group = group_records[level]
+        row_masks = compat[level]
+        while dom:
+            low = dom & -dom
+            dom ^= low
+            i = low.bit_length() - 1
+            nodes[0] += 1
+            if nodes[0] >= nodes[1]:
+                nodes[1] += _STOP_POLL_NODES
+                if stop is not None and stop():
+                    raise EnumerationStopped()
+            if max_nodes is not None and nodes[0] > max_nodes:
+                raise _Overflow()
+            path[level] = i
+            occ = occupied | group[i].packed
+            if level == n - 1:
+                paths.extend(path)
+                merged.append(occ)
+                size[0] += per_leaf + (occ.bit_length() + 7) // 8
+                if len(merged) > max_combinations or size[0] > max_bytes:
+                    raise _Overflow()
+                continue
+            row = row_masks[i]
+            narrowed = list(domains)
+            for h in range(level + 1, n):
+                m = narrowed[h] & row[h]
+                if not m:
+                    break
+                narrowed[h] = m
+            else:
+                visit(level + 1, narrowed, occ)
+
+    if n:
+        try:
+            visit(0, [(1 << len(g)) - 1 for g in group_records], 0)
+        except _Overflow:
+            return None
+    return FeasibleSet(n, bytes(paths) if not wide else tuple(paths), merged)
+
+
+class FeasibleCache:
+    """
+    Feasible combinations of the last basket, so a preference-only change re-scores
+    the cached bitmaps instead of running check_conflicts + the DFS again.
+    The basket is identified by the packed bitmaps of its meta-candidates (the
+    solver's input), so any change to candidates / selection is a miss. A basket
+    with more than max_combinations feasible combinations (or max_bytes of cache)
+    isn't cached; the solver falls back to the branch-and-bound search, and the
+    basket is remembered as too big so it isn't enumerated again. The same goes
+    for a basket whose enumeration visits more than max_nodes nodes, so a miss
+    costs at most that much before the search runs.
+    """
+
+    def __init__(self, max_combinations=50000, max_bytes=32 * 1024 * 1024, max_nodes=200000):
+        self.max_combinations = max_combinations
+        self.max_bytes = max_bytes
+        self.max_nodes = max_nodes
+        self._key = None
+        self._set = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.overflows = 0
+
+    @staticmethod
+    def key(group_records):
+        return tuple(tuple(r.packed for r in g) for g in group_records)
+
+    def get(self, group_records, compat_masks, stop=None):
+        """
+        FeasibleSet of the basket (enumerated on a miss), or None when it's over the
+        cap / node budget or stop() interrupted the enumeration (not remembered then).
+        """
+        key = self.key(group_records)
+        with self._lock:
+            if key == self._key:
+                self.hits += 1
+                return self._set
+            self.misses += 1
+        try:
+            feasible = enumerate_feasible(group_records, compat_masks(group_records),
+                                          self.max_combinations, self.max_bytes, self.max_nodes, stop)
+        except EnumerationStopped:
+            return None
+        with self._lock:
+            if feasible is None:
+                self.overflows += 1
+            self._key = key
+            self._set = feasible
+        return feasible
+
+    def clear(self):
+        with self._lock:
+            self._key = None
+            self._set = None
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'overflows': self.overflows,
+                    'cached': len(self._set) if self._set is not None else 0}
@@ -0,0 +1,146 @@
+import json
+import random
+import threading
+import time
+
+import requests
+
+# 错误分类
+NETWORK = 'network'      # 超时 / 连接失败 / 5xx / 响应不完整 (JSON 解析失败): 退避后重试
+THROTTLED = 'throttled'  # 429: 降速并退避后重试
+SESSION = 'session'      # 会话过期 (跳转到统一认证登录页, 401/403): 恢复会话后重试
+FATAL = 'fatal'          # 其他错误: 不重试
+
+# 未跳转但直接返回了登录页时, 页面里的标记 (同 LoginInterceptor.validate_cookie)
+_LOGIN_MARKERS = ("统一身份认证", "账号登录")
+
+
+class FetchError(Exception):
+    """A page request that failed for good; kind is one of the classes above."""
+
+    def __init__(self, kind, cause):
+        super().__init__(f"{kind}: {cause}")
+        self.kind = kind
+        self.cause = cause
+
+
+def classify_response(resp):
+    """Error class of an HTTP response, or None when it looks usable."""
+    status = getattr(resp, 'status_code', 200)
+    if not isinstance(status, int):
+        status = 200
+    if status == 429:
+        return THROTTLED
+    if status in (401, 403) or 'authserver' in str(getattr(resp, 'url', '') or ''):
+        return SESSION
+    content_type = (getattr(resp, 'headers', None) or {}).get('Content-Type', '')
+    if isinstance(content_type, str) and 'html' in content_type:
+        text = getattr(resp, 'text', '')
+        if isinstance(text, str) and any(marker in text for marker in _LOGIN_MARKERS):
+            return SESSION
+    if status >= 500:
+        return NETWORK
+    if status >= 400:
+        return FATAL
+    return None
+
+
+def classify_error(exc):
+    """
+    Error class of an exception raised while requesting or decoding a page.
+    A body that isn't JSON is most often a truncated or gateway error page, so it is
+    retried like a network error; an expired session is recognised from the
+    response itself (classify_response), not from the decode failure.
+    """
+    # requests 的 JSONDecodeError 同时也是 RequestException, 必须先判断
+    if isinstance(exc, (json.JSONDecodeError, ValueError)):
+        return NETWORK
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return NETWORK
+    if isinstance(exc, requests.RequestException):
+        return NETWORK
+    return FATAL
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient errors (network / throttled);
+    session errors get their own small budget, each preceded by a session recovery.
+    """
+
+    def __init__(self, max_retries=4, base_delay=0.5, max_delay=8.0, session_retries=1, timeout=10):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.session_retries = session_retries
+        self.timeout = timeout
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every page request of a client (thread-safe).
+    The rate follows an AIMD rule: fast successful responses add `increase` req/s
+    (x1.25 during slow start, i.e. until the first slow or failed response),
+    slow responses (above target_latency) shave 10%, errors cut it by 30% and
+    throttling (429) halves it, always within [min_rate, max_rate].
+    The recent error rate (EWMA) scales both directions: each error cuts a further
+    error_rate fraction, and the additive increase shrinks linearly to nothing as
+    the error rate approaches error_ceiling, so a flaky server is not sped up again
+    right after one lucky response.
+    The default start rate matches the old fixed 0.3 s pause between pages.
+    """
+
+    def __init__(self, rate=1 / 0.3, burst=2, min_rate=0.5, max_rate=20.0, target_latency=1.5,
+                 increase=0.25, error_ceiling=0.3):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.error_ceiling = error_ceiling
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.latency = None  # EWMA
+        self.error_rate = 0.0  # EWMA
+        self.slow_start = True
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token even if it isn't there yet; later callers queue behind us
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, latency, ok=True, throttled=False):
+        """Feeds back one request outcome and adjusts the rate."""
+        with self._lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.error_rate = 0.9 * self.error_rate + (0.0 if ok else 0.1)
+            if throttled:
+                self.rate *= 0.5 * (1 - self.error_rate)
+            elif not ok:
+                self.rate *= 0.7 * (1 - self.error_rate)
+            elif latency > self.target_latency:
+                self.rate *= 0.9
+            elif self.slow_start:
+                self.rate *= 1.25
+            else:
+                self.rate += self.increase * max(0.0, 1 - self.error_rate / self.error_ceiling)
+            if throttled or not ok or latency > self.target_latency:
+                self.slow_start = False
+            self.rate = min(self.max_rate, max(self.min_rate, self.rate))
+
+    def snapshot(self):
+        with self._lock:
+            return {'rate': round(self.rate, 2), 'latency': None if self.latency is None else round(self.latency, 3),
+                    'error_rate': round(self.error_rate, 3)}
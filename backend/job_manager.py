@@ -0,0 +1,121 @@
+import itertools
+import threading
+import time
+import traceback
+
+
+class Job:
+    """
+    One background task. The target receives the Job and should poll
+    should_stop() and hand partial results to publish(); when it gives up early
+    because of the deadline it sets truncated, so a task that finished its work
+    just past the deadline still ends as done.
+    state: running -> done | cancelled | timeout | error
+    """
+
+    def __init__(self, job_id, emit, deadline=None, interval=0.1):
+        self.id = job_id
+        self.state = 'running'
+        self.started = time.monotonic()
+        self.deadline = None if deadline is None else self.started + deadline
+        self.interval = interval
+        self._emit = emit
+        self._cancel = threading.Event()
+        self._last_publish = 0.0
+        self.truncated = False
+        self.thread = None
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def should_stop(self):
+        return self.cancelled or self.expired
+
+    def due(self):
+        """True when enough time passed since the last publish (batches UI updates)."""
+        return time.monotonic() - self._last_publish >= self.interval
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def publish(self, payload):
+        """Sends a progress payload; dropped once the job was cancelled."""
+        if self.cancelled:
+            return
+        self._last_publish = time.monotonic()
+        self._send(dict(payload, done=False))
+
+    def _send(self, payload):
+        try:
+            self._emit(self.id, dict(payload, job_id=self.id, state=self.state,
+                                     elapsed_ms=int(self.elapsed() * 1000)))
+        except Exception as e:
+            print(f"[JobManager] Emit failed for job {self.id}: {e}")
+
+
+class JobManager:
+    """
+    Runs targets on daemon threads and tracks them by id.
+    emit(job_id, payload) delivers updates (e.g. via window.evaluate_js); the final
+    payload carries done=True and the terminal state.
+    """
+
+    def __init__(self, emit, interval=0.1):
+        self.emit = emit
+        self.interval = interval
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, target, deadline=None):
+        """target(job) -> final payload dict. deadline: seconds of wall clock, or None."""
+        with self._lock:
+            job = Job(next(self._ids), self.emit, deadline, self.interval)
+            self.jobs[job.id] = job
+        job.thread = threading.Thread(target=self._run, args=(job, target), daemon=True)
+        job.thread.start()
+        return job.id
+
+    def _run(self, job, target):
+        try:
+            result = target(job) or {}
+            if job.cancelled:
+                job.state = 'cancelled'
+                result = {}
+            elif job.truncated:
+                job.state = 'timeout'
+            else:
+                job.state = 'done'
+        except Exception as e:
+            traceback.print_exc()
+            job.state = 'error'
+            result = {'error': str(e)}
+        job._send(dict(result, done=True))
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
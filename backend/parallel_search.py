@@ -0,0 +1,94 @@
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .solver import TopKSearch, add_stats
+
+# Aim for several subtrees per worker so uneven branches still balance out
+_TASKS_PER_WORKER = 4
+
+# Per-process state, filled once by _init_worker
+_worker_state = {}
+
+
+class SharedThreshold:
+    """
+    Best-known K-th score shared by all workers (a double in shared memory).
+    Reads are lock-free; offer() only ever raises the value.
+    """
+
+    def __init__(self, value=None, lock=None):
+        self.value = value if value is not None else multiprocessing.RawValue('d', float('-inf'))
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+
+    def read(self):
+        return self.value.value
+
+    def offer(self, score):
+        if score <= self.value.value:
+            return
+        with self.lock:
+            if score > self.value.value:
+                self.value.value = score
+
+
+def _init_worker(value, lock, group_records, preferences, max_results):
+    # Compatibility masks etc. are built once per process, not once per task
+    _worker_state['search'] = TopKSearch(
+        group_records, preferences, max_results, shared=SharedThreshold(value, lock))
+
+
+def _search_subtrees(prefixes):
+    search = _worker_state['search']
+    search.reset()
+    search._poll_shared()
+    for prefix in prefixes:
+        search.run(prefix)
+    return search.results(), search.total_found, search.stats
+
+
+def split_prefixes(group_records, workers):
+    """
+    Conflict-free candidate index prefixes over the first one or two groups
+    (two only when the first group alone gives too few subtrees).
+    """
+    if not group_records:
+        return [()]
+    prefixes = [(i,) for i in range(len(group_records[0]))]
+    if len(prefixes) < workers * _TASKS_PER_WORKER and len(group_records) > 1:
+        first, second = group_records[0], group_records[1]
+        prefixes = [(i, j) for i, a in enumerate(first) for j, b in enumerate(second)
+                    if not (a.packed & b.packed)]
+    return prefixes
+
+
+def parallel_top_k(group_records, preferences, max_results, workers, stats=None):
+    """
+    Runs TopKSearch over subtrees in a ProcessPoolExecutor and merges the per-worker
+    heaps and total_found counts. Returns ([(score, path)], total_found) like the
+    serial search (best first, ties in path order).
+    """
+    prefixes = split_prefixes(group_records, workers)
+    if not prefixes:
+        return [], 0
+
+    # Contiguous chunks keep the DFS order inside each task
+    n_tasks = min(len(prefixes), workers * _TASKS_PER_WORKER)
+    size = -(-len(prefixes) // n_tasks)
+    chunks = [prefixes[k:k + size] for k in range(0, len(prefixes), size)]
+
+    shared = SharedThreshold()
+    merged = []
+    total_found = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(shared.value, shared.lock, group_records, preferences, max_results),
+    ) as pool:
+        for results, found, counters in pool.map(_search_subtrees, chunks):
+            total_found += found
+            merged.extend(results)
+            add_stats(stats, counters)
+
+    top = heapq.nsmallest(max_results, merged, key=lambda e: (-e[0], e[1]))
+    return top, total_found
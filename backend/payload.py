@@ -0,0 +1,82 @@
+"""
+Compact result payloads for the pywebview bridge.
+
+A ranked schedule list repeats the same sections many times: every course is a
+full dict with sessions and 26 bitmap strings, and embeds its whole alternatives
+list. The compact form sends each section once:
+
+    {
+        'format': 'compact',
+        'candidates': [section dict, ...],          # no 'alternatives' key
+        'alternative_sets': [[candidate index, ...], ...],
+        'schedules': [{'courses': [[candidate index, alternative set index or -1], ...],
+                       'score', 'score_details', 'stats'}, ...]
+    }
+
+The frontend (static/app.js, scheduleCourses) rebuilds a schedule's course dicts
+only when that schedule is shown.
+"""
+
+COMPACT_FORMAT = 'compact'
+
+
+def _is_copy_of(course, section):
+    """True when course is section.copy() plus an 'alternatives' key (what the solver returns)."""
+    if len(course) != len(section) + 1:
+        return False
+    return all(k == 'alternatives' or (k in section and section[k] is v) for k, v in course.items())
+
+
+def compact_schedules(ranked):
+    """Ranked schedules (Api._rank_and_enrich output) -> compact payload dict."""
+    candidates = []
+    by_id = {}   # id(section dict) -> candidate index; ranked keeps the objects alive
+    sets = []
+    set_by_id = {}  # id(alternatives list) -> alternative set index, the solver shares one list per time cluster
+
+    def intern(section):
+        idx = by_id.get(id(section))
+        if idx is None:
+            idx = by_id[id(section)] = len(candidates)
+            candidates.append({k: v for k, v in section.items() if k != 'alternatives'}
+                              if 'alternatives' in section else section)
+        return idx
+
+    schedules = []
+    for entry in ranked:
+        refs = []
+        for course in entry['courses']:
+            alternatives = course.get('alternatives')
+            if alternatives is None:
+                refs.append([intern(course), -1])
+                continue
+            alt_idx = set_by_id.get(id(alternatives))
+            if alt_idx is None:
+                alt_idx = set_by_id[id(alternatives)] = len(sets)
+                sets.append([intern(a) for a in alternatives])
+            if alternatives and _is_copy_of(course, alternatives[0]):
+                refs.append([sets[alt_idx][0], alt_idx])
+            else:
+                refs.append([intern(course), alt_idx])
+        compact = {k: v for k, v in entry.items() if k != 'courses'}
+        compact['courses'] = refs
+        schedules.append(compact)
+    return {'format': COMPACT_FORMAT, 'candidates': candidates, 'alternative_sets': sets, 'schedules': schedules}
+
+
+def expand_schedules(payload):
+    """Inverse of compact_schedules (same shape as the ranked list, fresh dicts)."""
+    candidates = payload['candidates']
+    sets = payload['alternative_sets']
+    out = []
+    for entry in payload['schedules']:
+        courses = []
+        for cand_idx, alt_idx in entry['courses']:
+            course = dict(candidates[cand_idx])
+            if alt_idx >= 0:
+                course['alternatives'] = [candidates[i] for i in sets[alt_idx]]
+            courses.append(course)
+        expanded = {k: v for k, v in entry.items() if k != 'courses'}
+        expanded['courses'] = courses
+        out.append(expanded)
+    return out
@@ -1,135 +1,167 @@
-import math
+from .compiled_course import (
+    compile_course, MAX_WEEKS, DAYS_PER_WEEK, NODES_PER_DAY, WEEK_BITS, WEEK_MASK, DAY_MASK
+)
+
+# 早八: 每天第 1-2 节; 周末: 周六/周日全天 (Bit = Day * 13 + Node)
+EARLY_MASK = sum(1 << (d * 13 + n) for d in range(7) for n in (0, 1))
+WEEKEND_MASK = sum(1 << (d * 13 + n) for d in (5, 6) for n in range(13))
+
+# 只统计第 1-25 周
+SEMESTER_MASK = (1 << (MAX_WEEKS * WEEK_BITS)) - 1
+
+
+def _day_gaps(day_bits):
+    """Empty nodes between the first and last class of one day."""
+    if not day_bits:
+        return 0
+    low = (day_bits & -day_bits).bit_length() - 1
+    return (day_bits.bit_length() - low) - bin(day_bits).count('1')
+
+
+# 每天 13 节 -> 8192 种状态的查找表
+DAY_POPCOUNT = tuple(bin(x).count('1') for x in range(1 << NODES_PER_DAY))
+DAY_GAPS = tuple(_day_gaps(x) for x in range(1 << NODES_PER_DAY))
+
+
+class ScoringKernel:
+    """
+    Preferences compiled once into flags and limits; evaluate() makes a single pass
+    over the active weeks and runs only the enabled terms, with per-day popcount and
+    gap counts read from the 8192-entry tables above.
+    Produces exactly the same score/details as the original per-term loops.
+    """
+    _cache = {}
+
+    def __init__(self, preferences):
+        self.early = bool(preferences.get('avoid_early_morning'))
+        self.weekend = bool(preferences.get('avoid_weekend'))
+        compactness = preferences.get('compactness')
+        self.compactness = compactness if compactness in ['high', 'low'] else None
+
+        limit = preferences.get('max_daily_load')
+        self.load_limit = limit if limit and limit > 0 else None
+
+        self.day_limit = None
+        self.day_targets = ()
+        if preferences.get('day_max_limit_enabled'):
+            self.day_limit = preferences.get('day_max_limit_value', 4)
+            target_days = preferences.get('day_max_limit_days', [])
+            if len(target_days) < 7:
+                target_days = target_days + [False] * (7 - len(target_days))
+            self.day_targets = tuple(d for d in range(7) if target_days[d])
+
+        # Days that need a per-day lookup at all
+        days = set()
+        if self.compactness:
+            days.update(range(5)) # Mon-Fri
+        if self.load_limit is not None:
+            days.update(range(7))
+        if self.day_limit is not None:
+            days.update(self.day_targets)
+        self.days = tuple(sorted(days))
 
-class ScheduleRanker:
     @staticmethod
-    def evaluate_schedule(schedule, preferences):
-        """
-        Evaluates a schedule based on preferences and returns score + breakdown.
-        """
+    def _key(preferences):
+        days = preferences.get('day_max_limit_days', [])
+        return (
+            bool(preferences.get('avoid_early_morning')),
+            bool(preferences.get('avoid_weekend')),
+            preferences.get('compactness'),
+            preferences.get('max_daily_load'),
+            bool(preferences.get('day_max_limit_enabled')),
+            preferences.get('day_max_limit_value', 4),
+            tuple(bool(d) for d in days),
+        )
+
+    @classmethod
+    def for_preferences(cls, preferences):
+        key = cls._key(preferences)
+        kernel = cls._cache.get(key)
+        if kernel is None:
+            if len(cls._cache) > 64:
+                cls._cache.clear()
+            kernel = cls(preferences)
+            cls._cache[key] = kernel
+        return kernel
+
+    def _counts(self, merged):
+        """Fused pass: (early_weeks, weekend_weeks, total_gaps, overload, day_excess)."""
+        early_weeks = 0
+        weekend_weeks = 0
+        total_gaps = 0
+        overload = 0
+        day_excess = 0
+
+        early = self.early
+        weekend = self.weekend
+        days = self.days
+        compact = self.compactness is not None
+        load_limit = self.load_limit
+        day_limit = self.day_limit
+        day_targets = self.day_targets
+
+        bits = merged & SEMESTER_MASK
+        while bits:
+            week = bits & WEEK_MASK
+            bits >>= WEEK_BITS
+            if not week:
+                continue
+            if early and week & EARLY_MASK:
+                early_weeks += 1
+            if weekend and week & WEEKEND_MASK:
+                weekend_weeks += 1
+            for d in days:
+                day_bits = (week >> (d * NODES_PER_DAY)) & DAY_MASK
+                if not day_bits:
+                    continue
+                if compact and d < 5:
+                    total_gaps += DAY_GAPS[day_bits]
+                if load_limit is not None or day_limit is not None:
+                    count = DAY_POPCOUNT[day_bits]
+                    if load_limit is not None and count > load_limit:
+                        overload += count - load_limit
+                    if day_limit is not None and count > day_limit and d in day_targets:
+                        day_excess += count - day_limit
+        return early_weeks, weekend_weeks, total_gaps, overload, day_excess
+
+    def evaluate(self, merged):
+        early_weeks, weekend_weeks, total_gaps, overload, day_excess = self._counts(merged)
         base_score = 100.0
         details = {}
         total_penalty = 0.0
         total_bonus = 0.0
 
-        # Merge bitmaps
-        full_bitmap = [0] * 30 # Assume max weeks 25
-        for course in schedule:
-            cb = course.get('schedule_bitmaps', [])
-            for w in range(len(cb)):
-                if w < len(full_bitmap):
-                    val = cb[w]
-                    if isinstance(val, str):
-                        try:
-                            val = int(val)
-                        except:
-                            val = 0
-                    full_bitmap[w] |= val
-
         # 1. Avoid Early Morning
-        if preferences.get('avoid_early_morning'):
-            penalty = 0
-            for w in range(1, 26):
-                mask = full_bitmap[w]
-                if mask == 0: continue
-                early_mask = 0
-                for d in range(7):
-                    early_mask |= (1 << (d * 13 + 0))
-                    early_mask |= (1 << (d * 13 + 1))
-
-                if (mask & early_mask):
-                    penalty += 1
-
-            p_val = penalty * 2
+        if self.early:
+            p_val = early_weeks * 2
             total_penalty += p_val
             details['早八回避'] = -p_val
 
         # 2. Avoid Weekend
-        if preferences.get('avoid_weekend'):
-            penalty = 0
-            weekend_mask = 0
-            for node in range(13):
-                weekend_mask |= (1 << (5 * 13 + node))
-                weekend_mask |= (1 << (6 * 13 + node))
-
-            for w in range(1, 26):
-                if (full_bitmap[w] & weekend_mask):
-                    penalty += 1
-
-            p_val = penalty * 2.0
+        if self.weekend:
+            p_val = weekend_weeks * 2.0
             total_penalty += p_val
             details['周末回避'] = -p_val
 
         # 3. Compactness
-        if preferences.get('compactness') in ['high', 'low']:
-            total_gaps = 0
-            for w in range(1, 26):
-                mask = full_bitmap[w]
-                if mask == 0: continue
-                for d in range(5): # Mon-Fri
-                    day_bits = (mask >> (d * 13)) & 0x1FFF
-                    if day_bits == 0: continue
-
-                    has_started = False
-                    gap_count = 0
-                    current_gap = 0
-
-                    for i in range(13):
-                        is_set = (day_bits >> i) & 1
-                        if is_set:
-                            if has_started and current_gap > 0:
-                                gap_count += current_gap
-                            has_started = True
-                            current_gap = 0
-                        elif has_started:
-                            current_gap += 1
-
-                    total_gaps += gap_count
-
-            if preferences['compactness'] == 'high':
-                p_val = total_gaps * 0.2
-                total_penalty += p_val
-                details['课程紧凑'] = -p_val
-            else:
-                b_val = total_gaps * 0.2
-                total_bonus += b_val
-                details['课程分散'] = +b_val
+        if self.compactness == 'high':
+            p_val = total_gaps * 0.2
+            total_penalty += p_val
+            details['课程紧凑'] = -p_val
+        elif self.compactness == 'low':
+            b_val = total_gaps * 0.2
+            total_bonus += b_val
+            details['课程分散'] = +b_val
 
         # 4. Max Daily Load
-        limit = preferences.get('max_daily_load')
-        if limit and limit > 0:
-            overload = 0
-            for w in range(1, 26):
-                mask = full_bitmap[w]
-                if mask == 0: continue
-                for d in range(7):
-                    day_bits = (mask >> (d * 13)) & 0x1FFF
-                    count = bin(day_bits).count('1')
-                    if count > limit:
-                        overload += (count - limit)
+        if self.load_limit is not None:
             p_val = overload * 5.0
             total_penalty += p_val
             details['每日负载'] = -p_val
 
         # 5. Day Max Limit
-        if preferences.get('day_max_limit_enabled'):
-            limit = preferences.get('day_max_limit_value', 4)
-            target_days = preferences.get('day_max_limit_days', [])
-            if len(target_days) < 7:
-                target_days = target_days + [False] * (7 - len(target_days))
-
-            penalty = 0
-            for w in range(1, 26):
-                mask = full_bitmap[w]
-                if mask == 0: continue
-                for d in range(7):
-                    if not target_days[d]: continue
-                    day_bits = (mask >> (d * 13)) & 0x1FFF
-                    count = bin(day_bits).count('1')
-                    if count > limit:
-                        diff = count - limit
-                        penalty += diff * 50.0
-
-            p_val = penalty
+        if self.day_limit is not None:
+            p_val = day_excess * 50.0 if day_excess else 0
             total_penalty += p_val
             details['特定日限制'] = -p_val
 
@@ -139,7 +171,191 @@ class ScheduleRanker:
             'details': details
         }
 
+    def score(self, merged):
+        """evaluate()['score'] without building details (same operation order, same float)."""
+        early_weeks, weekend_weeks, total_gaps, overload, day_excess = self._counts(merged)
+        total_penalty = 0.0
+        total_bonus = 0.0
+        if self.early:
+            total_penalty += early_weeks * 2
+        if self.weekend:
+            total_penalty += weekend_weeks * 2.0
+        if self.compactness == 'high':
+            total_penalty += total_gaps * 0.2
+        elif self.compactness == 'low':
+            total_bonus += total_gaps * 0.2
+        if self.load_limit is not None:
+            total_penalty += overload * 5.0
+        if self.day_limit is not None and day_excess:
+            total_penalty += day_excess * 50.0
+        return 100.0 + total_bonus - total_penalty
+
+class ScheduleRanker:
+    @staticmethod
+    def evaluate_schedule(schedule, preferences):
+        """
+        Evaluates a schedule based on preferences and returns score + breakdown.
+        """
+        # Merge bitmaps (one OR per course on the packed semester record)
+        merged = 0
+        for course in schedule:
+            merged |= compile_course(course).packed
+        return ScheduleRanker.evaluate_bitmap(merged, preferences)
+
+    @staticmethod
+    def evaluate_bitmap(merged, preferences):
+        """
+        Same as evaluate_schedule, but takes the already merged packed semester
+        integer (see compiled_course), so the solver can score without building
+        schedule objects.
+        """
+        return ScoringKernel.for_preferences(preferences).evaluate(merged)
+
     @staticmethod
     def score_schedule(schedule, preferences):
         result = ScheduleRanker.evaluate_schedule(schedule, preferences)
         return result['score']
+
+    @staticmethod
+    def score_bitmap(merged, preferences):
+        return ScoringKernel.for_preferences(preferences).score(merged)
+
+
+class IncrementalScore:
+    """
+    Running score state for the solver's branch-and-bound.
+
+    早八/周末/每日负载/特定日限制 only grow when a course is added, so the penalty of a
+    partial schedule is a lower bound of every completion's penalty; push() returns
+    that per-group delta. Compactness is not monotone (a later course can fill or open
+    a gap), so it is bounded optimistically instead: no penalty for 'high', and for
+    'low' a static ceiling on the gaps any completion can reach.
+    bound() is therefore an admissible upper bound on the final score.
+    """
+
+    def __init__(self, preferences, candidate_groups=()):
+        """candidate_groups: List[List[CompiledCourse]], one list per group still to place."""
+        self.early = bool(preferences.get('avoid_early_morning'))
+        self.weekend = bool(preferences.get('avoid_weekend'))
+
+        load_limit = preferences.get('max_daily_load')
+        self.load_limit = load_limit if load_limit and load_limit > 0 else None
+
+        self.day_limit = None
+        self.day_targets = None
+        if preferences.get('day_max_limit_enabled'):
+            self.day_limit = preferences.get('day_max_limit_value', 4)
+            target_days = preferences.get('day_max_limit_days', [])
+            if len(target_days) < 7:
+                target_days = target_days + [False] * (7 - len(target_days))
+            self.day_targets = [bool(t) for t in target_days[:7]]
+
+        self.track_cells = self.load_limit is not None or self.day_limit is not None
+        self.counts = [0] * ((MAX_WEEKS + 1) * DAYS_PER_WEEK)
+        self.early_weeks = 0
+        self.weekend_weeks = 0
+        self.penalty = 0.0
+        self._stack = []
+        self._features = {}
+
+        self.bonus_ceiling = 0.0
+        if preferences.get('compactness') == 'low':
+            self.bonus_ceiling = self._gap_ceiling(candidate_groups) * 0.2
+
+    def _feature(self, record):
+        f = self._features.get(id(record))
+        if f is None:
+            early_weeks = 0
+            weekend_weeks = 0
+            cells = []
+            for w in range(1, min(len(record.week_masks), MAX_WEEKS + 1)):
+                mask = record.week_masks[w]
+                if mask & EARLY_MASK:
+                    early_weeks |= 1 << w
+                if mask & WEEKEND_MASK:
+                    weekend_weeks |= 1 << w
+            for w, d, day_bits in record.cells():
+                cells.append((w * DAYS_PER_WEEK + d, bin(day_bits).count('1')))
+            # Keep the record alive alongside its id() key
+            f = (early_weeks, weekend_weeks, tuple(cells), record)
+            self._features[id(record)] = f
+        return f
+
+    @staticmethod
+    def _gap_ceiling(candidate_groups):
+        """
+        Upper bound on Mon-Fri gaps of any conflict-free completion.
+        Per (week, day): gaps = span - popcount; the final bits lie inside the OR of all
+        candidates (span can't exceed its span), and chosen courses are disjoint, so the
+        popcount is at least the sum over groups of the smallest candidate popcount.
+        """
+        envelope = {}
+        min_pop = {}
+        for group in candidate_groups:
+            group_min = None
+            for record in group:
+                pops = {}
+                for w, d, day_bits in record.cells():
+                    if d >= 5:
+                        continue
+                    envelope[(w, d)] = envelope.get((w, d), 0) | day_bits
+                    pops[(w, d)] = bin(day_bits).count('1')
+                if group_min is None:
+                    group_min = pops
+                else:
+                    group_min = {k: min(v, pops[k]) for k, v in group_min.items() if k in pops}
+            for k, v in (group_min or {}).items():
+                min_pop[k] = min_pop.get(k, 0) + v
+
+        total = 0
+        for k, env in envelope.items():
+            low = (env & -env).bit_length() - 1
+            span = env.bit_length() - low
+            total += max(0, span - min_pop.get(k, 0))
+        return total
+
+    def push(self, record):
+        """Adds a course (its bits must not overlap the current ones). Returns the penalty delta."""
+        early_weeks, weekend_weeks, cells, _ = self._feature(record)
+        prev_early = self.early_weeks
+        prev_weekend = self.weekend_weeks
+        delta = 0.0
+
+        if self.early and early_weeks:
+            self.early_weeks = prev_early | early_weeks
+            delta += bin(self.early_weeks ^ prev_early).count('1') * 2
+        if self.weekend and weekend_weeks:
+            self.weekend_weeks = prev_weekend | weekend_weeks
+            delta += bin(self.weekend_weeks ^ prev_weekend).count('1') * 2.0
+
+        if self.track_cells:
+            counts = self.counts
+            load_limit = self.load_limit
+            day_limit = self.day_limit
+            for cell, pop in cells:
+                before = counts[cell]
+                after = before + pop
+                counts[cell] = after
+                if load_limit is not None and after > load_limit:
+                    delta += (after - max(before, load_limit)) * 5.0
+                if day_limit is not None and after > day_limit and self.day_targets[cell % DAYS_PER_WEEK]:
+                    delta += (after - max(before, day_limit)) * 50.0
+
+        self.penalty += delta
+        self._stack.append((prev_early, prev_weekend, cells, delta))
+        return delta
+
+    def pop(self):
+        """Undoes the last push()."""
+        prev_early, prev_weekend, cells, delta = self._stack.pop()
+        self.early_weeks = prev_early
+        self.weekend_weeks = prev_weekend
+        if self.track_cells:
+            counts = self.counts
+            for cell, pop in cells:
+                counts[cell] -= pop
+        self.penalty -= delta
+
+    def bound(self):
+        """Optimistic (never too low) score of any completion of the current partial schedule."""
+        return 100.0 + self.bonus_ceiling - self.penalty
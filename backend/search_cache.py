@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A fetch other callers with the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchCache:
+    """
+    Bounded LRU of search results with per-entry expiry, plus in-flight coalescing:
+    identical concurrent searches share one fetch instead of each crawling the server.
+    Results are shared between callers, so treat them as read-only.
+    Empty results aren't cached (the fetcher returns [] on failures as well).
+    """
+
+    def __init__(self, max_entries=128, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(name=None, code=None, campus='1', semester='2025-2026-2', match_mode='OR'):
+        return ((name or '').strip(), (code or '').strip(), campus, semester, match_mode)
+
+    def get_or_fetch(self, key, fetch):
+        """Cached result for key, else the result of one shared fetch() call."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expired += 1
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._inflight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = fetch()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if pending.error is None and pending.result:
+                    self._entries[key] = (time.monotonic() + self.ttl, pending.result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            pending.done.set()
+        return pending.result
+
+    def invalidate(self, campus=None, semester=None):
+        """Drops cached results, all of them or those of one campus/semester."""
+        with self._lock:
+            if campus is None and semester is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries
+                        if (campus is None or k[2] == campus) and (semester is None or k[3] == semester)]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced, 'expired': self.expired, 'evictions': self.evictions}
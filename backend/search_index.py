@@ -0,0 +1,228 @@
+from .compiled_course import compile_course, merge_packed
+from .ranker import ScoringKernel, SEMESTER_MASK
+
+
+class CodeTrie:
+    """
+    Prefix trie over every suffix of the course codes, so a code *substring*
+    (what search.js matches with includes) is a prefix walk.
+    Each node carries the bitset of rows whose code passes through it.
+    """
+    __slots__ = ('root',)
+
+    def __init__(self):
+        self.root = [{}, 0]  # [children, rows]
+
+    def add(self, text, row):
+        bit = 1 << row
+        for start in range(len(text)):
+            node = self.root
+            for ch in text[start:]:
+                child = node[0].get(ch)
+                if child is None:
+                    child = node[0][ch] = [{}, 0]
+                child[1] |= bit
+                node = child
+
+    def rows(self, fragment):
+        node = self.root
+        for ch in fragment:
+            node = node[0].get(ch)
+            if node is None:
+                return 0
+        return node[1]
+
+
+class TextIndex:
+    """
+    Character bigram index of one text column (unigrams too, for one-character keywords).
+    A keyword's candidates are the rows holding all its bigrams; candidates are then
+    checked with a plain substring test, so results equal `keyword in text`.
+    """
+    __slots__ = ('texts', 'grams')
+
+    def __init__(self, texts):
+        self.texts = texts
+        grams = {}
+        for row, text in enumerate(texts):
+            bit = 1 << row
+            for i in range(len(text)):
+                for gram in (text[i], text[i:i + 2]):
+                    grams[gram] = grams.get(gram, 0) | bit
+        self.grams = grams
+
+    def rows(self, keyword):
+        grams = self.grams
+        if len(keyword) == 1:
+            return grams.get(keyword, 0)
+        candidates = -1
+        for i in range(len(keyword) - 1):
+            candidates &= grams.get(keyword[i:i + 2], 0)
+            if not candidates:
+                return 0
+        if len(keyword) == 2:
+            return candidates
+        texts = self.texts
+        confirmed = 0
+        for row in iter_rows(candidates):
+            if keyword in texts[row]:
+                confirmed |= 1 << row
+        return confirmed
+
+
+class SlotIndex:
+    """
+    Per-week-per-slot posting index: slot bit position (packed layout, week w at
+    (w-1)*91) -> bitset of the rows with a class there. The rows that clash with
+    a busy packed schedule are the union of the postings of its set bits, so a
+    "what still fits" query costs one OR per busy slot instead of a pairwise
+    conflict check per row.
+    """
+    __slots__ = ('postings', 'packed')
+
+    def __init__(self, items):
+        postings = {}
+        packed = []
+        for row, item in enumerate(items):
+            bits = compile_course(item).packed & SEMESTER_MASK
+            packed.append(bits)
+            bit = 1 << row
+            while bits:
+                low = bits & -bits
+                pos = low.bit_length() - 1
+                postings[pos] = postings.get(pos, 0) | bit
+                bits ^= low
+        self.postings = postings
+        self.packed = packed
+
+    def conflicting(self, busy):
+        """Bitset of the rows sharing at least one slot with the packed schedule `busy`."""
+        postings = self.postings
+        rows = 0
+        busy &= SEMESTER_MASK
+        while busy:
+            low = busy & -busy
+            rows |= postings.get(low.bit_length() - 1, 0)
+            busy ^= low
+        return rows
+
+
+def iter_rows(bits):
+    """Row numbers of a bitset, ascending."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CatalogIndex:
+    """
+    Inverted index over one campus/semester catalog (items in catalog order).
+    Posting lists are row bitsets, so OR / AND over keywords is a union /
+    intersection of ints. Results come back in catalog order, which is the
+    server's +KKDWDM,+KCH,+KXH order the catalog was downloaded in.
+    Matching follows dist/functions/search.js: case-insensitive substrings,
+    whitespace-separated name keywords joined by OR / AND, the code as one substring.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.all_rows = (1 << len(items)) - 1
+        self._slots = None
+        self._schools = None
+        self.names = TextIndex([(i.get('name') or '').lower() for i in items])
+        self.teachers = TextIndex([(i.get('teacher') or '').lower() for i in items])
+        self.codes = CodeTrie()
+        for row, item in enumerate(items):
+            self.codes.add((item.get('code') or '').lower(), row)
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    def _combine(index, keywords, match_mode):
+        if match_mode == 'AND':
+            rows = -1
+            for k in keywords:
+                rows &= index.rows(k)
+                if not rows:
+                    break
+            return rows
+        rows = 0
+        for k in keywords:
+            rows |= index.rows(k)
+        return rows
+
+    def match(self, course_name=None, course_code=None, match_mode='OR', teacher=None):
+        """Bitset of the matching rows."""
+        rows = self.all_rows
+        keywords = (course_name or '').lower().split()
+        if keywords:
+            rows &= self._combine(self.names, keywords, match_mode)
+        teacher_keywords = (teacher or '').lower().split()
+        if rows and teacher_keywords:
+            rows &= self._combine(self.teachers, teacher_keywords, match_mode)
+        code = (course_code or '').lower().strip()
+        if rows and code:
+            rows &= self.codes.rows(code)
+        return rows
+
+    def search(self, course_name=None, course_code=None, match_mode='OR', teacher=None):
+        """Matching items, in catalog order. Items are shared with the index, treat them as read-only."""
+        items = self.items
+        return [items[row] for row in iter_rows(self.match(course_name, course_code, match_mode, teacher))]
+
+    @property
+    def slots(self):
+        """SlotIndex over the catalog, built on the first free-slot query."""
+        if self._slots is None:
+            self._slots = SlotIndex(self.items)
+        return self._slots
+
+    def _school_rows(self, schools):
+        if self._schools is None:
+            postings = {}
+            for row, item in enumerate(self.items):
+                school = item.get('school')
+                postings[school] = postings.get(school, 0) | (1 << row)
+            self._schools = postings
+        rows = 0
+        for school in schools:
+            rows |= self._schools.get(school, 0)
+        return rows
+
+    def fitting(self, busy, schools=None, min_credit=None, max_credit=None, preferences=None, max_penalty=None):
+        """
+        Rows that fit into the gaps of a schedule, as [(row, penalty)] in catalog order.
+        busy: packed semester int of the schedule (merge_packed of its courses), or a list of course dicts
+        schools: only these schools (exact names)
+        min_credit / max_credit: inclusive credit range
+        preferences: ranker preferences; penalty = score drop the section would cause
+                     (None without preferences)
+        max_penalty: with preferences, drop sections costing more than this
+        """
+        if not isinstance(busy, int):
+            busy = merge_packed(compile_course(c) for c in busy)
+        rows = self.all_rows & ~self.slots.conflicting(busy)
+        if schools:
+            rows &= self._school_rows(schools)
+        if min_credit is not None or max_credit is not None:
+            lo = float('-inf') if min_credit is None else min_credit
+            hi = float('inf') if max_credit is None else max_credit
+            items = self.items
+            rows &= sum(1 << r for r in iter_rows(rows) if lo <= (items[r].get('credit') or 0.0) <= hi)
+        if not preferences:
+            return [(row, None) for row in iter_rows(rows)]
+
+        kernel = ScoringKernel.for_preferences(preferences)
+        base = kernel.score(busy)
+        packed = self.slots.packed
+        penalties = {}  # 同一时间的教学班 (不同老师/教室) 只评分一次
+        out = []
+        for row in iter_rows(rows):
+            penalty = penalties.get(packed[row])
+            if penalty is None:
+                penalty = penalties[packed[row]] = base - kernel.score(busy | packed[row])
+            if max_penalty is None or penalty <= max_penalty:
+                out.append((row, penalty))
+        return out
@@ -42,3 +42,52 @@ class SessionManager:
     def list_sessions(self):
         """Lists all saved session files."""
         return [f for f in os.listdir(self.sessions_dir) if f.endswith(".json")]
+
+    def flag_catalog_changes(self, changes):
+        """
+        Marks candidates of saved sessions whose section changed in a catalog refresh
+        (changes as produced by backend.catalog_diff.diff_rows):
+        candidate['catalog_status'] = 'modified' | 'removed', plus 'catalog_update'
+        holding the new row for modified sections. Only affected files are rewritten.
+        Returns {filename: flagged candidate count}.
+        """
+        def key(item):
+            return (item.get("name"), item.get("code"), item.get("teacher"),
+                    item.get("location_text"), item.get("school"))
+
+        status = {}
+        for entry in changes.get("modified", []):
+            status[key(entry["before"])] = ("modified", entry["after"])
+        for item in changes.get("removed", []):
+            status[key(item)] = ("removed", None)
+        if not status:
+            return {}
+
+        flagged = {}
+        for filename in self.list_sessions():
+            filepath = self._get_filepath(filename)
+            try:
+                with open(filepath, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[SessionMan] Skipping {filepath}: {e}")
+                continue
+
+            count = 0
+            for group in data.get("groups", []):
+                for cand in group.get("candidates", []):
+                    hit = status.get(key(cand))
+                    if hit is None:
+                        continue
+                    cand["catalog_status"] = hit[0]
+                    if hit[1] is not None:
+                        cand["catalog_update"] = hit[1]
+                    else:
+                        cand.pop("catalog_update", None)
+                    count += 1
+            if count:
+                with open(filepath, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                flagged[filename] = count
+                print(f"[SessionMan] Flagged {count} changed sections in {filepath}")
+        return flagged
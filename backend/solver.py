@@ -1,14 +1,331 @@
 import heapq
-import itertools
-from .ranker import ScheduleRanker
+import os
+from .ranker import ScoringKernel, IncrementalScore
+from .compiled_course import compile_course, describe_slot
+from .components import conflict_components, is_separable, merge_k_best
+from .counting import CombinationCounter
+from .diagnosis import minimal_infeasible_core, contested_slots, describe_core, NodeBudget
+
+# Float slack in the bound comparison (scores are multiples of 0.2, so real
+# differences are far larger; within it a bound counts as a tie with the cutoff)
+_BOUND_EPS = 1e-9
+# generate_schedules(workers='auto') switches to the process pool above this many combinations
+PARALLEL_MIN_COMBINATIONS = 200000
+# How often (in visited nodes) a search re-reads an external shared threshold
+_THRESHOLD_POLL_NODES = 512
+# How often (in visited nodes) a search reports to its progress callback
+_PROGRESS_NODES = 2048
+
+
+def add_stats(target, counters):
+    """Adds search counters into an optional caller-supplied dict."""
+    if target is None:
+        return
+    for key, value in counters.items():
+        target[key] = target.get(key, 0) + value
+
+
+class TopKSearch:
+    """
+    Branch-and-bound DFS over meta-candidate records (List[List[CompiledCourse]],
+    already in MRV order). Keeps a min-heap of the best `max_results` leaves as
+    (score, rank, path), where path holds the chosen candidate index per group and
+    rank is path with negated entries, so heap[0] is the worst leaf in the result
+    order (score desc, then path asc). The result is the exact top-K in that order,
+    whatever order the leaves are visited in: a leaf tying the K-th score replaces
+    it when its path comes first, and a branch whose bound only ties the cutoff is
+    kept while its partial path can still come before the K-th path.
+
+    forward_checking: after each assignment the remaining groups' candidate sets
+    (bitmasks over candidate indices) are narrowed with precomputed compatibility
+    masks; a branch is abandoned as soon as one becomes empty, and the next group
+    is the one with the fewest remaining options (dynamic MRV). With False the
+    groups are visited in the static order and dead ends surface at the exhausted
+    group, as before; kept for comparison (see benchmarks/bench_solver.py).
+
+    shared: optional object with read() / offer(score) used by parallel workers to
+    exchange the best-known K-th score; a leaf scoring below that can't make the
+    global top-K either. Ties with it are kept (the score carries no path, and a
+    tied leaf of this worker may come first), so the merged result equals the
+    serial one.
+
+    progress: optional callable(search) invoked every _PROGRESS_NODES nodes; a truthy
+    return stops the search, leaving the best leaves found so far in the heap
+    (self.stopped tells a truncated search from a finished one).
+
+    stats counts: nodes (assignments tried), leaves, conflicts (candidates rejected
+    by a direct bitmap clash), wipeouts (branches cut by an emptied domain) and
+    bound_prunes.
+    """
+
+    def __init__(self, group_records, preferences, max_results, shared=None, forward_checking=True,
+                 progress=None):
+        self.groups = group_records
+        self.kernel = ScoringKernel.for_preferences(preferences)
+        self.scorer = IncrementalScore(preferences, group_records)
+        self.max_results = max_results
+        self.shared = shared
+        self.forward_checking = forward_checking
+        self.heap = []
+        self.total_found = 0
+        self.cutoff = float('-inf')
+        self.external = float('-inf')
+        self.tie_path = None  # path of the local K-th leaf while it sets the cutoff, else None
+        self._poll = 0
+        self.progress = progress
+        self.stopped = False
+        self._ticks = 0
+        self.stats = {'nodes': 0, 'leaves': 0, 'conflicts': 0, 'wipeouts': 0, 'bound_prunes': 0}
+        self.compat = self._compat_masks(group_records) if forward_checking else None
+
+    @staticmethod
+    def _compat_masks(group_records):
+        """compat[g][i][h]: bitmask of group h's candidates that don't clash with candidate i of group g."""
+        compat = []
+        for g, group in enumerate(group_records):
+            rows = []
+            for record in group:
+                row = []
+                for h, other in enumerate(group_records):
+                    mask = 0
+                    if h != g:
+                        for j, cand in enumerate(other):
+                            if not (cand.packed & record.packed):
+                                mask |= 1 << j
+                    row.append(mask)
+                rows.append(row)
+            compat.append(rows)
+        return compat
+
+    def reset(self):
+        """Clears results and counters so the same search can run another batch of subtrees."""
+        self.heap = []
+        self.total_found = 0
+        self.cutoff = self.external
+        self.tie_path = None
+        self.stopped = False
+        self.stats = {key: 0 for key in self.stats}
+
+    def _refresh_cutoff(self):
+        local = self.heap[0][0] if len(self.heap) >= self.max_results else float('-inf')
+        self.cutoff = max(local, self.external)
+        # Only the local K-th leaf has a path to break ties against
+        self.tie_path = self.heap[0][2] if local > self.external else None
+
+    def _poll_shared(self):
+        self._poll = 0
+        value = self.shared.read()
+        if value > self.external:
+            self.external = value
+            self._refresh_cutoff()
+
+    def _tick(self):
+        self._ticks = 0
+        if self.progress(self):
+            self.stopped = True
+
+    def _leaf(self, occupied, path):
+        self.total_found += 1
+        self.stats['leaves'] += 1
+        score = self.kernel.score(occupied)
+        path = tuple(path)
+        entry = (score, tuple(-i for i in path), path)
+        if len(self.heap) < self.max_results:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+        else:
+            return
+        if len(self.heap) >= self.max_results:
+            self._refresh_cutoff()
+            if self.shared is not None:
+                self.shared.offer(self.heap[0][0])
+
+    def _worth_descending(self, bound, path, unassigned):
+        """
+        Bound check: a leaf below the cutoff can't enter the result, one tying it only
+        if its path comes before tie_path (unassigned groups may still make it so).
+        """
+        if bound > self.cutoff + _BOUND_EPS:
+            return True
+        if bound < self.cutoff - _BOUND_EPS:
+            return False
+        kth = self.tie_path
+        if kth is None:
+            return True
+        for h, k in enumerate(kth):
+            if h in unassigned:
+                return True
+            if path[h] != k:
+                return path[h] < k
+        return False
+
+    def run(self, prefix=()):
+        """Searches the subtree below the fixed candidate indices of the first len(prefix) groups."""
+        n = len(self.groups)
+        path = [0] * n
+        occupied = 0
+        domains = [(1 << len(g)) - 1 for g in self.groups]
+        pushed = 0
+        feasible = True
+        for g, i in enumerate(prefix):
+            record = self.groups[g][i]
+            if record.packed & occupied or not (domains[g] >> i) & 1:
+                feasible = False
+                break
+            occupied |= record.packed
+            path[g] = i
+            self.scorer.push(record)
+            pushed += 1
+            if self.forward_checking:
+                compat = self.compat[g][i]
+                for h in range(len(prefix), n):
+                    domains[h] &= compat[h]
+                    if not domains[h]:
+                        feasible = False
+
+        if feasible:
+            if self.forward_checking:
+                self._dfs_fc(domains, list(range(len(prefix), n)), occupied, path)
+            else:
+                self._dfs(len(prefix), occupied, path)
+        for _ in range(pushed):
+            self.scorer.pop()
+
+    def _dfs(self, group_idx, occupied, path):
+        if group_idx == len(self.groups):
+            # Found a valid schedule; score straight from the running bitmap
+            self._leaf(occupied, path)
+            return
+
+        scorer = self.scorer
+        stats = self.stats
+        for i, record in enumerate(self.groups[group_idx]):
+            bits = record.packed
+
+            # Check Conflict
+            if bits & occupied:
+                stats['conflicts'] += 1
+                continue
+
+            if self.stopped:
+                return
+            stats['nodes'] += 1
+            if self.shared is not None:
+                self._poll += 1
+                if self._poll >= _THRESHOLD_POLL_NODES:
+                    self._poll_shared()
+            if self.progress is not None:
+                self._ticks += 1
+                if self._ticks >= _PROGRESS_NODES:
+                    self._tick()
+
+            # Apply
+            scorer.push(record)
+
+            # Pruning: O(1) bound check, path comparison only on a tie with the cutoff
+            path[group_idx] = i
+            if self._worth_descending(scorer.bound(), path, range(group_idx + 1, len(self.groups))):
+                self._dfs(group_idx + 1, occupied | bits, path)
+            else:
+                stats['bound_prunes'] += 1
+
+            # Undo
+            scorer.pop()
+
+    def _dfs_fc(self, domains, unassigned, occupied, path):
+        if not unassigned:
+            self._leaf(occupied, path)
+            return
+
+        # Dynamic MRV: the group with the fewest candidates left
+        g = unassigned[0]
+        best = bin(domains[g]).count('1')
+        for h in unassigned[1:]:
+            size = bin(domains[h]).count('1')
+            if size < best:
+                g, best = h, size
+        rest = [h for h in unassigned if h != g]
+
+        scorer = self.scorer
+        stats = self.stats
+        group = self.groups[g]
+        compat_rows = self.compat[g]
+        dom = domains[g]
+        while dom:
+            low = dom & -dom
+            dom ^= low
+            i = low.bit_length() - 1
+
+            if self.stopped:
+                return
+            stats['nodes'] += 1
+            if self.shared is not None:
+                self._poll += 1
+                if self._poll >= _THRESHOLD_POLL_NODES:
+                    self._poll_shared()
+            if self.progress is not None:
+                self._ticks += 1
+                if self._ticks >= _PROGRESS_NODES:
+                    self._tick()
+
+            # Forward check: narrow every future domain, stop at the first wipeout
+            compat = compat_rows[i]
+            narrowed = domains[:]
+            wiped = False
+            for h in rest:
+                d = domains[h] & compat[h]
+                if not d:
+                    wiped = True
+                    break
+                narrowed[h] = d
+            if wiped:
+                stats['wipeouts'] += 1
+                continue
+
+            record = group[i]
+            scorer.push(record)
+            path[g] = i
+            if self._worth_descending(scorer.bound(), path, rest):
+                self._dfs_fc(narrowed, rest, occupied | record.packed, path)
+            else:
+                stats['bound_prunes'] += 1
+            scorer.pop()
+
+    def results(self):
+        """[(score, path)] best first; ties in path order."""
+        return [(score, path) for score, _, path in sorted(self.heap, key=lambda e: (-e[0], e[2]))]
+
+
+class SearchProgress:
+    """
+    What generate_schedules(progress=...) callbacks receive while a search runs:
+    found / stats so far, and schedules() for the current top-K (best first).
+    On a decomposed basket the partial per-component results can't form whole
+    schedules yet, so schedules() is empty until the final result. search is None
+    while the feasible cache enumerates a basket (nothing found yet).
+    """
+
+    def __init__(self, search, build=None):
+        self.search = search
+        self._build = build
+        self.found = search.total_found if search is not None else 0
+        self.stats = dict(search.stats) if search is not None else {}
+
+    def schedules(self):
+        if self._build is None or self.search is None:
+            return []
+        return [self._build(path) for _, path in self.search.results()]
+
 
 class ScheduleSolver:
     @staticmethod
-    def check_conflicts(groups):
+    def check_conflicts(groups, cache=None):
         """
         Checks for definite conflicts between groups.
         A "definite conflict" between Group A and Group B exists if
         EVERY active candidate in Group A conflicts with EVERY active candidate in Group B.
+        cache: optional ConflictCache; pair results are then reused across calls.
 
         Returns: List of tuples (group_index_1, group_index_2, reason) representing conflicting pairs.
         """
@@ -33,7 +350,10 @@ class ScheduleSolver:
                 for ca in cands_a:
                     pair_conflict = False
                     for cb in cands_b:
-                        is_conf, details = ScheduleSolver.courses_conflict_with_details(ca, cb)
+                        if cache is not None:
+                            is_conf, details = cache.conflict(ca, cb)
+                        else:
+                            is_conf, details = ScheduleSolver.courses_conflict_with_details(ca, cb)
                         if is_conf:
                             pair_conflict = True
                             if not first_reason:
@@ -51,26 +371,13 @@ class ScheduleSolver:
 
         return conflicts
 
-    @staticmethod
-    def _parse_bitmap(bitmap_list):
-        """Helper to convert list of potential strings to integers"""
-        return [int(x) if isinstance(x, str) else x for x in bitmap_list]
-
     @staticmethod
     def courses_conflict(course_a, course_b):
         """
         Checks if two courses conflict in time.
-        Uses bitwise AND on schedule bitmaps.
+        Uses a single bitwise AND on the packed semester bitmaps.
         """
-        bmp_a = ScheduleSolver._parse_bitmap(course_a.get('schedule_bitmaps', []))
-        bmp_b = ScheduleSolver._parse_bitmap(course_b.get('schedule_bitmaps', []))
-
-        length = min(len(bmp_a), len(bmp_b))
-
-        for w in range(1, length):
-            if (bmp_a[w] & bmp_b[w]) != 0:
-                return True
-        return False
+        return compile_course(course_a).conflicts_with(compile_course(course_b))
 
     @staticmethod
     def courses_conflict_with_details(course_a, course_b):
@@ -78,31 +385,19 @@ class ScheduleSolver:
         Checks if two courses conflict and returns details.
         Returns: (bool, str_reason)
         """
-        bmp_a = ScheduleSolver._parse_bitmap(course_a.get('schedule_bitmaps', []))
-        bmp_b = ScheduleSolver._parse_bitmap(course_b.get('schedule_bitmaps', []))
-        length = min(len(bmp_a), len(bmp_b))
-
-        for w in range(1, length):
-            overlap = bmp_a[w] & bmp_b[w]
-            if overlap != 0:
-                # Decode bits to find Day and Node
-                # Bit pos: Day(0-6)*13 + Node(0-12)
-                for bit in range(91): # 7*13=91
-                    if (overlap >> bit) & 1:
-                        day = (bit // 13) + 1
-                        node = (bit % 13) + 1
-                        return True, f"Week {w} Day {day} Node {node}"
-        return False, ""
+        # Lowest overlapping bit = earliest week, then Day/Node order
+        bit_pos = compile_course(course_a).first_overlap(compile_course(course_b))
+        if bit_pos < 0:
+            return False, ""
+        return True, describe_slot(bit_pos)
 
     @staticmethod
-    def generate_schedules(groups, max_results=20, preferences=None):
+    def _prepare_meta_groups(groups):
         """
-        Generates valid schedules using DFS with Pruning and Meta-Candidate Clustering.
-        Returns a list of top scoring schedules (each schedule is a list of courses).
+        Merges same-name groups, keeps selected candidates and clusters them by bitmap.
+        Returns meta_groups (List[List[meta]]) in MRV order, or None if some group
+        has no active candidate.
         """
-        if preferences is None:
-            preferences = {}
-
         # 0. Preprocess: Merge Groups with Identical Name (First candidate's name)
         # This handles cases where user accidentally has 2 groups for "Phys Lab".
         merged_groups_map = {} # Key: Course Name -> Group Data
@@ -145,41 +440,26 @@ class ScheduleSolver:
             if not active:
                 # If a group has NO active candidates after merge, it's a dead end.
                 # "I need one choice per group". If 0 choices, invalid.
-                return []
+                return None
 
             # Cluster by unique bitmap content
+            # The packed semester integer is the cluster key; the compiled record is
+            # shared by all members so nothing is re-parsed during the search.
+            # (Original candidate dicts keep their string bitmaps for the frontend.)
             clusters = {}
             for c in active:
-                # Ensure bitmaps are integers for the solver
-                # Use in-place update or copy?
-                # Since 'active' is from 'groups' (which is transient input here),
-                # modifying it is generally safe if we don't return it directly to frontend without care.
-                # But wait, frontend gets these objects back.
-                # If we convert to int here, frontend receives int. Overflow again in JS?
-                # YES.
-                # So we must NOT mutate the original object permanently if it goes back to frontend.
-                # However, the result of generate_schedules is a NEW list of objects.
-                # But 'active' references the input objects.
-
-                # We need internal integer bitmaps for solving, but keep original for result?
-                # Actually, we can just use a separate key or parse on the fly.
-                # But for clustering we need a tuple key.
-
-                raw_bm = c.get('schedule_bitmaps', [])
-                int_bm = ScheduleSolver._parse_bitmap(raw_bm)
-                bm_tuple = tuple(int_bm)
-
-                if bm_tuple not in clusters:
-                    clusters[bm_tuple] = []
-                clusters[bm_tuple].append(c)
+                record = compile_course(c)
+                if record.packed not in clusters:
+                    clusters[record.packed] = (record, [])
+                clusters[record.packed][1].append(c)
 
             # Create Meta-Candidates
             meta_candidates = []
-            for bm_tuple, c_list in clusters.items():
+            for record, c_list in clusters.values():
                 rep = c_list[0]
                 meta_candidates.append({
                     'representative': rep,
-                    'bitmaps': bm_tuple, # Tuple of ints
+                    'record': record,
                     'alternatives': c_list,
                 })
 
@@ -187,104 +467,219 @@ class ScheduleSolver:
             # to succeed easier? Or heuristic from Ranker?
             # Let's sort by: (Number of conflicts with EMPTY schedule) -> just density.
             # Less dense courses are easier to fit.
-            meta_candidates.sort(key=lambda m: sum(bin(x).count('1') for x in m['bitmaps']))
+            meta_candidates.sort(key=lambda m: m['record'].popcount())
 
             meta_groups.append(meta_candidates)
 
-        # 2. DFS Initialization
-        top_n_heap = [] # Min-Heap of (score, unique_id, schedule)
-
-        # Use a list for bitmap to allow mutation
-        current_bitmap = [0] * 30
-
-        counter = itertools.count()
-        total_found_container = [0]
-
         # Pre-calculate group order?
         # Heuristic: Process groups with FEWEST options first (Fail Fast).
         # MRV (Minimum Remaining Values).
-        # meta_groups is a list of lists.
-        # Let's preserve index to map back? No, result order doesn't matter for correctness,
-        # but for consistent display maybe?
-        # We just need to return a list of courses. Order in list doesn't matter.
-        # So we can reorder groups.
-
-        # Wrap meta_groups with index so we can debug if needed, or just sort.
-        # sort by len(candidates)
-        # meta_groups.sort(key=len) -> This makes `backtrack` simpler.
+        # Order in the result list doesn't matter for correctness, so we can reorder groups.
         meta_groups.sort(key=len)
+        return meta_groups
 
-        def backtrack(group_idx, current_schedule_meta):
-            if group_idx == len(meta_groups):
-                # Found a valid schedule
-                total_found_container[0] += 1
-
-                # Reconstruct final schedule but include alternatives info
-                final_schedule = []
-                for m in current_schedule_meta:
-                    # Create a shallow copy of the representative so we can attach alternatives
-                    # without mutating the original shared object
-                    rep = m['representative'].copy()
-
-                    # Inject alternatives.
-                    # We pass the list of alternatives (including the rep itself is fine)
-                    # Use a simplified list to avoid circular refs or massive dumps if needed,
-                    # but for now full objects are fine.
-                    rep['alternatives'] = m['alternatives']
-                    final_schedule.append(rep)
-
-                score = ScheduleRanker.score_schedule(final_schedule, preferences)
-
-                entry = (score, next(counter), final_schedule)
-                if len(top_n_heap) < max_results:
-                    heapq.heappush(top_n_heap, entry)
-                else:
-                    if score > top_n_heap[0][0]:
-                        heapq.heapreplace(top_n_heap, entry)
-                return
-
-            # Pruning
-            if len(top_n_heap) == max_results:
-                partial_sched = [m['representative'] for m in current_schedule_meta]
-                partial_score = ScheduleRanker.score_schedule(partial_sched, preferences)
-                # Upper bound check (assuming score decreases with penalties)
-                # If partial score is already too low, we can't recover.
-                if partial_score < top_n_heap[0][0]:
-                    return
-
-            candidates = meta_groups[group_idx]
-
-            for meta in candidates:
-                meta_bmp = meta['bitmaps']
-
-                # Check Conflict
-                is_valid = True
-                limit = min(len(meta_bmp), len(current_bitmap))
-                for w in range(1, limit):
-                    if (meta_bmp[w] & current_bitmap[w]) != 0:
-                        is_valid = False
-                        break
+    @staticmethod
+    def generate_schedules(groups, max_results=20, preferences=None, workers=None, stats=None,
+                           progress=None, feasible_cache=None):
+        """
+        Generates valid schedules using DFS with Pruning and Meta-Candidate Clustering.
+        Returns a list of top scoring schedules (each schedule is a list of courses).
+        workers: > 1 splits the search over a process pool (see parallel_search);
+                 'auto' does so only for big baskets; None / 1 searches on the calling thread.
+        stats: optional dict, receives the summed TopKSearch counters, plus 'stopped'
+               (number of searches cut short by progress) when the result is truncated.
+        progress: optional callable(SearchProgress) polled during the search; returning
+                  True stops it and the best schedules found so far are returned.
+                  Progress reporting keeps the search on the calling thread.
+        feasible_cache: optional FeasibleCache; when the basket's feasible set fits in it,
+                  the top-K is re-selected from the cached combinations (a preference-only
+                  change then skips the search) and total_found is the exact feasible count.
+                  Filling the cache polls progress too and gives up past its node budget.
+        """
+        if preferences is None:
+            preferences = {}
 
-                if not is_valid:
-                    continue
+        meta_groups = ScheduleSolver._prepare_meta_groups(groups)
+        if meta_groups is None:
+            return [], 0
+
+        group_records = [[m['record'] for m in g] for g in meta_groups]
+
+        def build(path):
+            return ScheduleSolver._build_schedule([meta_groups[g][i] for g, i in enumerate(path)])
+
+        if feasible_cache is not None:
+            before = feasible_cache.stats()
+            stop = None if progress is None else (lambda: bool(progress(SearchProgress(None))))
+            feasible = feasible_cache.get(group_records, TopKSearch._compat_masks, stop)
+            after = feasible_cache.stats()
+            add_stats(stats, {'cache_' + k: after[k] - before[k] for k in ('hits', 'misses', 'overflows')})
+            if feasible is not None:
+                top = feasible.top_k(preferences, max_results)
+                return [build(path) for score, path in top], len(feasible)
+
+        # Independent parts of the basket (e.g. a weekend lab vs weekday lectures) are
+        # solved separately and recombined, as long as the preferences add up across them.
+        components = conflict_components(group_records)
+        if len(components) > 1 and is_separable(components, group_records, preferences):
+            hook = None if progress is None else (lambda search: progress(SearchProgress(search)))
+            top, total_found = ScheduleSolver._solve_components(
+                group_records, components, preferences, max_results, workers, stats, hook)
+        else:
+            hook = None if progress is None else (lambda search: progress(SearchProgress(search, build)))
+            top, total_found = ScheduleSolver._solve_joint(
+                group_records, preferences, max_results, workers, stats, hook)
+
+        schedules = [build(path) for score, path in top]
+        return schedules, total_found
 
-                # Apply
-                for w in range(1, limit):
-                    current_bitmap[w] |= meta_bmp[w]
+    @staticmethod
+    def count_schedules(groups, with_alternatives=False, stats=None, max_nodes=None, max_seconds=None):
+        """
+        Exact number of valid schedules (what a full generate_schedules would report as
+        total_found), counted by CombinationCounter without building or scoring any.
+        with_alternatives: count section-level combinations instead, i.e. every
+                  meta-candidate counts len(alternatives) times (same-time sections).
+        stats: optional dict, receives the counter's statistics.
+        max_nodes / max_seconds: optional budget; None is returned (unknown) past it.
+        """
+        meta_groups = ScheduleSolver._prepare_meta_groups(groups)
+        if meta_groups is None:
+            return 0
+        group_records = [[m['record'] for m in g] for g in meta_groups]
+        weights = None
+        if with_alternatives:
+            weights = [[len(m['alternatives']) for m in g] for g in meta_groups]
+        counter = CombinationCounter(group_records, TopKSearch._compat_masks(group_records), weights,
+                                     max_nodes, max_seconds)
+        total = counter.count()
+        add_stats(stats, counter.stats)
+        return total
 
-                current_schedule_meta.append(meta)
+    @staticmethod
+    def diagnose_infeasible(groups, stats=None, max_nodes=None, stop=None):
+        """
+        Why a basket has no valid schedule: a minimal set of groups that can't be
+        placed together (see diagnosis.minimal_infeasible_core), which may involve
+        three or more groups with no pairwise definite conflict.
+        Returns None when a schedule exists, else
+        {'groups': indices into `groups`, 'names', 'slots': the week/day/node slots
+        two or more of those groups compete for ("Week 3 Day 2 Node 1", ...), 'message'}.
+        stats: optional dict, receives nodes / checks counters.
+        max_nodes / stop: search budget and optional cancel callable() shared by all
+        feasibility checks; past either, diagnosis.DiagnosisAborted is raised.
+        """
+        def input_groups(candidates):
+            ids = {id(c) for c in candidates}
+            return [i for i, g in enumerate(groups) if any(id(c) in ids for c in g.get('candidates', []))]
+
+        def names(indices):
+            return [groups[i]['candidates'][0].get('name') or f"Group {i + 1}" for i in indices]
+
+        meta_groups = ScheduleSolver._prepare_meta_groups(groups)
+        if meta_groups is None:
+            # Some (merged) group has no selected section at all
+            empty = [i for i, g in enumerate(groups)
+                     if g.get('candidates') and not any(c.get('selected', False) for c in g['candidates'])]
+            return {'groups': empty, 'names': names(empty), 'slots': [],
+                    'message': f"{' + '.join(names(empty))} 没有选中的教学班"}
+
+        group_records = [[m['record'] for m in g] for g in meta_groups]
+        counters = {}
+        try:
+            core = minimal_infeasible_core(group_records, TopKSearch._compat_masks(group_records), counters,
+                                           NodeBudget(max_nodes, stop))
+        finally:
+            add_stats(stats, counters)
+        if core is None:
+            return None
+        indices = sorted({i for g in core for i in input_groups(
+            [c for m in meta_groups[g] for c in m['alternatives']])})
+        slots = [describe_slot(b) for b in contested_slots(group_records, core)]
+        return {'groups': indices, 'names': names(indices), 'slots': slots,
+                'message': describe_core(names(indices), slots)}
 
-                backtrack(group_idx + 1, current_schedule_meta)
+    @staticmethod
+    def _solve_joint(group_records, preferences, max_results, workers, stats=None, progress=None):
+        """One branch-and-bound search over all groups. Returns ([(score, path)], total_found)."""
+        if workers == 'auto':
+            workers = ScheduleSolver._auto_workers(group_records)
+        if workers and workers > 1 and progress is None:
+            from .parallel_search import parallel_top_k
+            return parallel_top_k(group_records, preferences, max_results, workers, stats)
+        search = TopKSearch(group_records, preferences, max_results, progress=progress)
+        search.run()
+        add_stats(stats, search.stats)
+        if search.stopped:
+            add_stats(stats, {'stopped': 1})
+        return search.results(), search.total_found
 
-                # Undo
-                current_schedule_meta.pop()
-                for w in range(1, limit):
-                    current_bitmap[w] ^= meta_bmp[w]
+    @staticmethod
+    def _solve_components(group_records, components, preferences, max_results, workers, stats=None,
+                          progress=None):
+        """
+        Top-K per conflict-graph component, combined with a k-best merge on
+        (score - 100) that breaks ties by the full path, so the result is the joint
+        search's (score desc, path asc) top-K. total_found is the number of leaves the component searches
+        visited (explored, like a joint search's); the exact count is count_schedules.
+        A stop requested through progress applies to every remaining component, but
+        only once a component has found its first leaf (so the best schedules found
+        elsewhere still make it into the result).
+        """
+        lists = []
+        total_found = 0
+        stopped = [False]
+
+        def hook(search):
+            stopped[0] = stopped[0] or bool(progress(search))
+            # Each component needs its first leaf for the merge to yield anything
+            return stopped[0] and bool(search.heap)
+
+        for comp in components:
+            if stopped[0]:
+                hook = lambda search: bool(search.heap)
+            top, found = ScheduleSolver._solve_joint(
+                [group_records[g] for g in comp], preferences, max_results, workers, stats,
+                hook if progress is not None else None)
+            total_found += found
+            lists.append([(score - 100.0, tuple(zip(comp, path))) for score, path in top])
+
+        kernel = ScoringKernel.for_preferences(preferences)
+        combined = []
+        for _, pairs in merge_k_best(lists, max_results):
+            path = tuple(i for _, i in pairs)
+            occupied = 0
+            for g, i in pairs:
+                occupied |= group_records[g][i].packed
+            combined.append((kernel.score(occupied), path))
+        combined.sort(key=lambda e: (-e[0], e[1]))
+        return combined, total_found
 
-        backtrack(0, [])
+    @staticmethod
+    def _auto_workers(group_records):
+        """Process pool only pays off past a few hundred thousand combinations."""
+        cpus = os.cpu_count() or 1
+        if cpus < 2:
+            return None
+        combinations = 1
+        for g in group_records:
+            combinations *= len(g)
+        if combinations < PARALLEL_MIN_COMBINATIONS:
+            return None
+        return min(cpus, 8)
 
-        sorted_results = sorted(top_n_heap, key=lambda x: x[0], reverse=True)
-        return [item[2] for item in sorted_results], total_found_container[0]
+    @staticmethod
+    def _build_schedule(schedule_meta):
+        """Reconstruct final schedule but include alternatives info"""
+        final_schedule = []
+        for m in schedule_meta:
+            # Create a shallow copy of the representative so we can attach alternatives
+            # without mutating the original shared object
+            rep = m['representative'].copy()
+            # We pass the list of alternatives (including the rep itself is fine)
+            rep['alternatives'] = m['alternatives']
+            final_schedule.append(rep)
+        return final_schedule
 
     @staticmethod
     def is_valid_combination(courses):
@@ -0,0 +1,124 @@
+"""
+Location parser benchmark: memoized single-pass ScheduleBitmapper vs the original regex path.
+
+Usage: python benchmarks/bench_bitmapper.py [repeats]
+Runs over every dist/data catalog; "cold" clears the memo first (one full catalog
+pass, so repeated time strings across sections/campuses already help), "warm" is a
+re-parse of the same catalogs (e.g. a refresh).
+"""
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from jwFetcher import ScheduleBitmapper, WEEKDAY_MAP
+from build_search_shards import catalog_sources
+
+LEGACY_PATTERN = re.compile(r"周([一二三四五六日])\s*(\d+)-(\d+)节\s*([0-9,-]+)周")
+
+
+def legacy_parse_week_ranges(week_str):
+    weeks = set()
+    parts = week_str.split(',')
+    for part in parts:
+        if '-' in part:
+            try:
+                s, e = map(int, part.split('-'))
+                weeks.update(range(s, e + 1))
+            except: pass
+        else:
+            try:
+                weeks.add(int(part))
+            except: pass
+    return sorted(list(weeks))
+
+
+def legacy_generate_bitmap(location_text, max_weeks=25):
+    """The original ScheduleBitmapper.generate_bitmap, kept verbatim as the reference."""
+    semester_schedule = [0] * (max_weeks + 1)
+    sessions = []
+    if not location_text:
+        return [str(x) for x in semester_schedule], sessions
+    segments = re.split(r'[,;]', location_text)
+    for seg in segments:
+        matches = list(LEGACY_PATTERN.finditer(seg))
+        if not matches:
+            continue
+        is_odd_only = "(单)" in seg
+        is_even_only = "(双)" in seg
+        location_part = seg
+        for m in matches:
+            location_part = location_part.replace(m.group(0), "")
+        location_part = location_part.replace("(单)", "").replace("(双)", "").strip()
+        for match in matches:
+            day_char, start_node, end_node, week_range_str = match.groups()
+            day_idx = WEEKDAY_MAP.get(day_char, 0)
+            s_node = int(start_node)
+            e_node = int(end_node)
+            active_weeks = legacy_parse_week_ranges(week_range_str)
+            filtered_weeks = []
+            for w in active_weeks:
+                if 0 < w <= max_weeks:
+                    if is_odd_only and (w % 2 == 0): continue
+                    if is_even_only and (w % 2 != 0): continue
+                    filtered_weeks.append(w)
+            if not filtered_weeks:
+                continue
+            sessions.append({"day": day_idx, "start": s_node, "end": e_node,
+                             "weeks": filtered_weeks, "location": location_part})
+            segment_mask = 0
+            for node in range(s_node, e_node + 1):
+                bit_pos = (day_idx * 13) + (node - 1)
+                segment_mask |= (1 << bit_pos)
+            for w in filtered_weeks:
+                semester_schedule[w] |= segment_mask
+    return [str(x) for x in semester_schedule], sessions
+
+
+def clear_memo():
+    ScheduleBitmapper._parse.cache_clear()
+    ScheduleBitmapper._schedule.cache_clear()
+    ScheduleBitmapper._rule.cache_clear()
+    ScheduleBitmapper._week_tuple.cache_clear()
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    texts = []
+    for path in catalog_sources(os.path.join(ROOT, 'dist', 'data')):
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.extend(item['location_text'] for item in json.load(f))
+    print(f"=== Location parser benchmark ({len(texts)} rows, {len(set(texts))} distinct texts) ===")
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        legacy = [legacy_generate_bitmap(t) for t in texts]
+    t_legacy = (time.perf_counter() - t0) / repeats
+
+    t_cold = 0.0
+    for _ in range(repeats):
+        clear_memo()
+        t0 = time.perf_counter()
+        cold = ScheduleBitmapper.generate_bitmaps(texts)
+        t_cold += time.perf_counter() - t0
+    t_cold /= repeats
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        warm = ScheduleBitmapper.generate_bitmaps(texts)
+    t_warm = (time.perf_counter() - t0) / repeats
+
+    mismatches = sum(1 for a, b, c in zip(legacy, cold, warm) if not (a == b == c))
+    info = ScheduleBitmapper._rule.cache_info()
+    print(f"regex path   {t_legacy * 1e3:8.2f} ms  ({t_legacy * 1e6 / len(texts):6.1f} us/row)")
+    print(f"memo, cold   {t_cold * 1e3:8.2f} ms  ({t_cold * 1e6 / len(texts):6.1f} us/row)  x{t_legacy / t_cold:5.1f}")
+    print(f"memo, warm   {t_warm * 1e3:8.2f} ms  ({t_warm * 1e6 / len(texts):6.1f} us/row)  x{t_legacy / t_warm:5.1f}")
+    print(f"time rules memo: {info.currsize} entries | mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
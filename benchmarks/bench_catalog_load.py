@@ -0,0 +1,73 @@
+"""
+Catalog load benchmark: dist/data JSON vs the memory-mapped columnar .ncat.
+
+Usage: python benchmarks/bench_catalog_load.py [campus] [semester]
+Builds the .ncat into a temp dir, then times opening, a single row lookup and a
+full decode, with the Python heap growth of each (tracemalloc).
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.catalog_binary import BinaryCatalog, build_from_json
+
+
+def measure(label, fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+        if hasattr(result, 'close'):
+            result.close()
+    tracemalloc.start()
+    result = fn()
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if hasattr(result, 'close'):
+        result.close()
+    print(f"{label:<22} {best * 1000:8.2f} ms  heap {heap / 1024:9.1f} KiB")
+
+
+def main():
+    campus = sys.argv[1] if len(sys.argv) > 1 else '3'
+    semester = sys.argv[2] if len(sys.argv) > 2 else '2025-2026-2'
+    src = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    tmp = tempfile.mkdtemp()
+    try:
+        path = build_from_json(src, os.path.join(tmp, 'catalog.ncat'))
+        with BinaryCatalog(path) as catalog:
+            rows = len(catalog)
+        print(f"=== Catalog load ({rows} rows) | json {os.path.getsize(src) / 1024:.0f} KiB, "
+              f"ncat {os.path.getsize(path) / 1024:.0f} KiB ===")
+
+        def load_json():
+            with open(src, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        def one_row():
+            catalog = BinaryCatalog(path)
+            catalog[rows // 2]
+            return catalog
+
+        def all_rows():
+            with BinaryCatalog(path) as catalog:
+                return catalog.items()
+
+        measure("json.load", load_json)
+        measure("ncat open", lambda: BinaryCatalog(path))
+        measure("ncat open + 1 row", one_row)
+        measure("ncat all rows", all_rows)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
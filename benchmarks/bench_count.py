@@ -0,0 +1,61 @@
+"""
+Counting benchmark: exact schedule count by CombinationCounter vs visiting every
+conflict-free combination (the DFS of backend/feasible_cache.py without a cap).
+
+Usage: python benchmarks/bench_count.py [groups]
+Baskets are built from dist/data (same course name = one group, every section
+selected). Enumeration is skipped past ENUMERATE_LIMIT combinations.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.solver import ScheduleSolver, TopKSearch
+from backend.feasible_cache import enumerate_feasible
+
+ENUMERATE_LIMIT = 2000000
+
+
+def basket(n_groups, campus='1', semester='2025-2026-2', seed=3):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    by_name = {}
+    for c in catalog:
+        by_name.setdefault(c['name'], []).append(dict(c, selected=True))
+    multi = [cands for cands in by_name.values() if 8 <= len(cands) <= 30]
+    picks = random.Random(seed).sample(multi, n_groups)
+    return [{'id': i, 'candidates': c} for i, c in enumerate(picks)]
+
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [4, 6, 8, 10, 12]
+    for n in sizes:
+        groups = basket(n)
+        stats = {}
+        started = time.perf_counter()
+        total = ScheduleSolver.count_schedules(groups, stats=stats)
+        count_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        sections = ScheduleSolver.count_schedules(groups, with_alternatives=True)
+        sections_ms = (time.perf_counter() - started) * 1000
+
+        line = (f"{n:2d} groups | {total:>10d} schedules {count_ms:7.2f} ms | "
+                f"{sections:>14d} section combinations {sections_ms:7.2f} ms | {stats}")
+        if total <= ENUMERATE_LIMIT:
+            records = [[m['record'] for m in g] for g in ScheduleSolver._prepare_meta_groups(groups)]
+            started = time.perf_counter()
+            feasible = enumerate_feasible(records, TopKSearch._compat_masks(records), float('inf'), float('inf'))
+            enum_ms = (time.perf_counter() - started) * 1000
+            assert len(feasible) == total
+            line += f" | enumerate {enum_ms:9.2f} ms, x{enum_ms / count_ms:.0f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Infeasibility diagnosis benchmark: deletion filtering with the early-terminating
+feasibility check (backend/diagnosis.py) vs the same filtering where every check
+enumerates all combinations (what running the solver per check would cost).
+
+Usage: python benchmarks/bench_diagnosis.py [groups]
+Random dist/data baskets with no pairwise definite conflict but no valid schedule.
+"""
+import json
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend import diagnosis
+from backend.solver import ScheduleSolver
+from backend.feasible_cache import enumerate_feasible
+
+
+def infeasible_baskets(n_groups, count=3, campus='1', semester='2025-2026-2'):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    by_name = {}
+    for c in catalog:
+        by_name.setdefault(c['name'], []).append(dict(c, selected=True))
+    multi = [cands for cands in by_name.values() if 4 <= len(cands) <= 30]
+    seed = 0
+    while count:
+        seed += 1
+        groups = [{'id': i, 'candidates': c} for i, c in enumerate(random.Random(seed).sample(multi, n_groups))]
+        if ScheduleSolver.check_conflicts(groups) or ScheduleSolver.count_schedules(groups):
+            continue
+        count -= 1
+        yield seed, groups
+
+
+def exhaustive_is_feasible(group_records, compat, members, stats=None, budget=None):
+    records = [group_records[g] for g in members]
+    sub_compat = [[[row[h] for h in members] for row in compat[g]] for g in members]
+    return bool(enumerate_feasible(records, sub_compat, float('inf'), float('inf')))
+
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [8, 12, 16]
+    for n in sizes:
+        for seed, groups in infeasible_baskets(n):
+            started = time.perf_counter()
+            ScheduleSolver.generate_schedules(groups)
+            search_ms = (time.perf_counter() - started) * 1000
+            stats = {}
+            started = time.perf_counter()
+            core = ScheduleSolver.diagnose_infeasible(groups, stats=stats)
+            early_ms = (time.perf_counter() - started) * 1000
+            with patch.object(diagnosis, 'is_feasible', exhaustive_is_feasible):
+                started = time.perf_counter()
+                same = ScheduleSolver.diagnose_infeasible(groups)
+                full_ms = (time.perf_counter() - started) * 1000
+            assert same['groups'] == core['groups']
+            print(f"{n:2d} groups seed {seed:3d} | empty search {search_ms:7.2f} ms | "
+                  f"core of {len(core['groups'])} ({len(core['slots'])} slots) in {early_ms:6.2f} ms, "
+                  f"{stats['checks']} checks / {stats['nodes']} nodes | exhaustive checks {full_ms:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Preference-only re-ranking benchmark: full branch-and-bound search vs the top-K
+re-selected from the cached feasible set of the same basket.
+
+Usage: python benchmarks/bench_feasible_cache.py [groups]
+Baskets are built from dist/data (same course name = one group, every section
+selected). For each basket the preference cases are run one after another, as
+when the user toggles preferences: the first run fills the cache (miss), the
+others are hits.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.solver import ScheduleSolver
+from backend.feasible_cache import FeasibleCache
+from backend.ranker import ScheduleRanker
+
+PREFERENCE_CASES = [
+    {},
+    {'avoid_early_morning': True},
+    {'avoid_early_morning': True, 'compactness': 'high'},
+    {'compactness': 'low', 'avoid_weekend': True},
+    {'compactness': 'high', 'max_daily_load': 4},
+]
+
+
+def basket(n_groups, campus='3', semester='2025-2026-2', seed=3):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    by_name = {}
+    for c in catalog:
+        by_name.setdefault(c['name'], []).append(dict(c, selected=True))
+    multi = [cands for cands in by_name.values() if 4 <= len(cands) <= 12]
+    picks = random.Random(seed).sample(multi, n_groups)
+    return [{'id': i, 'candidates': c} for i, c in enumerate(picks)]
+
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [5, 7, 9]
+    for n in sizes:
+        groups = basket(n)
+        cache = FeasibleCache()
+        search_ms = []
+        cached_ms = []
+        found = 0
+        for prefs in PREFERENCE_CASES:
+            started = time.perf_counter()
+            expected, _ = ScheduleSolver.generate_schedules(groups, preferences=prefs)
+            search_ms.append((time.perf_counter() - started) * 1000)
+            stats = {}
+            started = time.perf_counter()
+            got, found = ScheduleSolver.generate_schedules(groups, preferences=prefs,
+                                                           feasible_cache=cache, stats=stats)
+            cached_ms.append((time.perf_counter() - started) * 1000)
+            assert [ScheduleRanker.score_schedule(s, prefs) for s in got] == \
+                   [ScheduleRanker.score_schedule(s, prefs) for s in expected]
+        hits = search_ms[1:]
+        rerank = cached_ms[1:]
+        state = 'overflow' if cache.stats()['overflows'] else f"{found} feasible"
+        print(f"{n} groups ({state}) | search {sum(hits) / len(hits):8.2f} ms/pref | "
+              f"first (enumerate) {cached_ms[0]:8.2f} ms | "
+              f"cached re-rank {sum(rerank) / len(rerank):7.2f} ms/pref | "
+              f"x{sum(hits) / sum(rerank):5.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Bridge payload benchmark: full course dicts vs the compact id-referenced payload.
+
+Usage: python benchmarks/bench_payload.py [groups]
+Baskets are built from dist/data (same course name = one group, every section
+selected), solved once, then both payload forms are serialized with json.dumps
+(what pywebview does for a js_api return value / evaluate_js argument).
+"""
+import json
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from main import Api
+from backend.payload import compact_schedules, expand_schedules
+
+
+def basket(n_groups, campus='3', semester='2025-2026-2', seed=2):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    by_name = {}
+    for c in catalog:
+        by_name.setdefault(c['name'], []).append(dict(c, selected=True))
+    multi = [cands for cands in by_name.values() if 4 <= len(cands) <= 40]
+    picks = random.Random(seed).sample(multi, n_groups)
+    return [{'id': i, 'candidates': c} for i, c in enumerate(picks)]
+
+
+def timed(fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [4, 6, 8]
+    with patch('main.NJUCourseClient'):
+        api = Api()
+    prefs = {'avoid_early_morning': True, 'compactness': 'high'}
+    for n in sizes:
+        groups = basket(n)
+        res = api.generate_schedules(groups, prefs)
+        if 'error' in res:
+            print(f"{n} groups: {res['error']}")
+            continue
+        ranked = res['schedules']
+        full_t, full = timed(lambda: json.dumps(ranked))
+        compact_t, compact = timed(lambda: json.dumps(compact_schedules(ranked)))
+        assert expand_schedules(compact_schedules(ranked)) == ranked
+        sections = sum(len(g['candidates']) for g in groups)
+        print(f"{n} groups / {sections} sections, {len(ranked)} schedules | "
+              f"full {len(full) / 1024:8.1f} KiB {full_t * 1000:6.2f} ms | "
+              f"compact {len(compact) / 1024:7.1f} KiB {compact_t * 1000:6.2f} ms | "
+              f"x{len(full) / len(compact):5.1f} size, x{full_t / compact_t:5.1f} time")
+
+
+if __name__ == '__main__':
+    main()
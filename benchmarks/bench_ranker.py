@@ -0,0 +1,202 @@
+"""
+ScheduleRanker benchmark: table-driven ScoringKernel vs the original per-term loops.
+
+Usage: python benchmarks/bench_ranker.py [n_schedules]
+Schedules are random 6-10 course picks from dist/data (conflicts don't matter to the ranker).
+"""
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.ranker import ScheduleRanker
+from backend.compiled_course import compile_course
+from backend.batch_ranker import BatchRanker, numpy_available
+
+PREFERENCE_CASES = [
+    {},
+    {'avoid_early_morning': True},
+    {'avoid_early_morning': True, 'avoid_weekend': True, 'compactness': 'high'},
+    {'compactness': 'low', 'max_daily_load': 4},
+    {'avoid_early_morning': True, 'avoid_weekend': True, 'compactness': 'high', 'max_daily_load': 4,
+     'day_max_limit_enabled': True, 'day_max_limit_value': 4, 'day_max_limit_days': [True] * 7},
+]
+
+LABELS = {'avoid_early_morning': 'early', 'avoid_weekend': 'weekend', 'compactness': 'compact',
+          'max_daily_load': 'load', 'day_max_limit_enabled': 'daylimit'}
+
+
+def legacy_evaluate_schedule(schedule, preferences):
+    """The original ScheduleRanker.evaluate_schedule, kept verbatim as the reference."""
+    base_score = 100.0
+    details = {}
+    total_penalty = 0.0
+    total_bonus = 0.0
+
+    full_bitmap = [0] * 30
+    for course in schedule:
+        cb = course.get('schedule_bitmaps', [])
+        for w in range(len(cb)):
+            if w < len(full_bitmap):
+                val = cb[w]
+                if isinstance(val, str):
+                    try:
+                        val = int(val)
+                    except:
+                        val = 0
+                full_bitmap[w] |= val
+
+    if preferences.get('avoid_early_morning'):
+        penalty = 0
+        for w in range(1, 26):
+            mask = full_bitmap[w]
+            if mask == 0: continue
+            early_mask = 0
+            for d in range(7):
+                early_mask |= (1 << (d * 13 + 0))
+                early_mask |= (1 << (d * 13 + 1))
+            if (mask & early_mask):
+                penalty += 1
+        p_val = penalty * 2
+        total_penalty += p_val
+        details['早八回避'] = -p_val
+
+    if preferences.get('avoid_weekend'):
+        penalty = 0
+        weekend_mask = 0
+        for node in range(13):
+            weekend_mask |= (1 << (5 * 13 + node))
+            weekend_mask |= (1 << (6 * 13 + node))
+        for w in range(1, 26):
+            if (full_bitmap[w] & weekend_mask):
+                penalty += 1
+        p_val = penalty * 2.0
+        total_penalty += p_val
+        details['周末回避'] = -p_val
+
+    if preferences.get('compactness') in ['high', 'low']:
+        total_gaps = 0
+        for w in range(1, 26):
+            mask = full_bitmap[w]
+            if mask == 0: continue
+            for d in range(5):
+                day_bits = (mask >> (d * 13)) & 0x1FFF
+                if day_bits == 0: continue
+                has_started = False
+                gap_count = 0
+                current_gap = 0
+                for i in range(13):
+                    is_set = (day_bits >> i) & 1
+                    if is_set:
+                        if has_started and current_gap > 0:
+                            gap_count += current_gap
+                        has_started = True
+                        current_gap = 0
+                    elif has_started:
+                        current_gap += 1
+                total_gaps += gap_count
+        if preferences['compactness'] == 'high':
+            p_val = total_gaps * 0.2
+            total_penalty += p_val
+            details['课程紧凑'] = -p_val
+        else:
+            b_val = total_gaps * 0.2
+            total_bonus += b_val
+            details['课程分散'] = +b_val
+
+    limit = preferences.get('max_daily_load')
+    if limit and limit > 0:
+        overload = 0
+        for w in range(1, 26):
+            mask = full_bitmap[w]
+            if mask == 0: continue
+            for d in range(7):
+                day_bits = (mask >> (d * 13)) & 0x1FFF
+                count = bin(day_bits).count('1')
+                if count > limit:
+                    overload += (count - limit)
+        p_val = overload * 5.0
+        total_penalty += p_val
+        details['每日负载'] = -p_val
+
+    if preferences.get('day_max_limit_enabled'):
+        limit = preferences.get('day_max_limit_value', 4)
+        target_days = preferences.get('day_max_limit_days', [])
+        if len(target_days) < 7:
+            target_days = target_days + [False] * (7 - len(target_days))
+        penalty = 0
+        for w in range(1, 26):
+            mask = full_bitmap[w]
+            if mask == 0: continue
+            for d in range(7):
+                if not target_days[d]: continue
+                day_bits = (mask >> (d * 13)) & 0x1FFF
+                count = bin(day_bits).count('1')
+                if count > limit:
+                    diff = count - limit
+                    penalty += diff * 50.0
+        p_val = penalty
+        total_penalty += p_val
+        details['特定日限制'] = -p_val
+
+    final_score = base_score + total_bonus - total_penalty
+    return {'score': final_score, 'details': details}
+
+
+def load_catalog(campus='3', semester='2025-2026-2'):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    catalog = load_catalog()
+    rng = random.Random(0)
+    schedules = [rng.sample(catalog, rng.randint(6, 10)) for _ in range(n)]
+
+    print(f"=== ScheduleRanker benchmark ({n} schedules) ===")
+    for prefs in PREFERENCE_CASES:
+        t0 = time.perf_counter()
+        legacy = [legacy_evaluate_schedule(s, prefs) for s in schedules]
+        t_legacy = time.perf_counter() - t0
+
+        # Warm the compiled-course memo so both sides start from parsed data fairly
+        for s in schedules:
+            ScheduleRanker.evaluate_schedule(s, prefs)
+        t0 = time.perf_counter()
+        current = [ScheduleRanker.evaluate_schedule(s, prefs) for s in schedules]
+        t_kernel = time.perf_counter() - t0
+
+        # Solver path: already merged packed integers
+        merged = [0] * n
+        for i, s in enumerate(schedules):
+            for c in s:
+                merged[i] |= compile_course(c).packed
+        t0 = time.perf_counter()
+        for m in merged:
+            ScheduleRanker.score_bitmap(m, prefs)
+        t_merged = time.perf_counter() - t0
+
+        mismatches = sum(1 for a, b in zip(legacy, current) if a != b)
+        enabled = ",".join(LABELS[k] for k, v in prefs.items() if v and k in LABELS) or "none"
+        line = (f"{enabled:<36} legacy {t_legacy * 1e6 / n:7.1f} us | evaluate_schedule {t_kernel * 1e6 / n:6.1f} us"
+                f" (x{t_legacy / max(t_kernel, 1e-9):4.1f}) | score_bitmap {t_merged * 1e6 / n:6.1f} us"
+                f" (x{t_legacy / max(t_merged, 1e-9):5.1f})")
+
+        if numpy_available():
+            t0 = time.perf_counter()
+            batch = BatchRanker.evaluate_packed(merged, prefs)
+            t_batch = time.perf_counter() - t0
+            mismatches += sum(1 for a, s, d in zip(legacy, batch['scores'].tolist(), batch['details'])
+                              if a != {'score': s, 'details': d})
+            line += f" | batch {t_batch * 1e6 / n:6.1f} us (x{t_legacy / max(t_batch, 1e-9):5.1f})"
+        print(line + f" | mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
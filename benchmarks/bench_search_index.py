@@ -0,0 +1,80 @@
+"""
+Local search benchmark: linear filter (as in dist/functions/search.js) vs CatalogIndex.
+
+Usage: python benchmarks/bench_search_index.py [queries]
+Queries are 1-4 character fragments of real course names (half OR, half AND with
+two keywords) and code substrings, drawn from every dist/data catalog.
+"""
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.search_index import CatalogIndex
+
+
+def linear(items, name, code, match_mode):
+    keywords = (name or '').lower().split()
+    code = (code or '').lower().strip()
+    out = []
+    for item in items:
+        if keywords:
+            item_name = (item.get('name') or '').lower()
+            hits = [k in item_name for k in keywords]
+            if not (all(hits) if match_mode == 'AND' else any(hits)):
+                continue
+        if code and code not in (item.get('code') or '').lower():
+            continue
+        out.append(item)
+    return out
+
+
+def make_queries(items, n, rng):
+    queries = []
+    for i in range(n):
+        a, b = rng.choice(items)['name'], rng.choice(items)['name']
+        if i % 3 == 2:
+            code = rng.choice(items)['code']
+            queries.append((None, code[rng.randrange(4):][:4], 'OR'))
+        else:
+            frag = a[rng.randrange(len(a)):][:rng.randint(1, 4)]
+            mode = 'AND' if i % 2 else 'OR'
+            queries.append((f"{frag} {b[:2]}" if mode == 'AND' else frag, None, mode))
+    return queries
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(1)
+    for path in sorted(glob.glob(os.path.join(ROOT, 'dist', 'data', '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        if not items:
+            continue
+        queries = make_queries(items, n, rng)
+
+        started = time.perf_counter()
+        index = CatalogIndex(items)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = [linear(items, *q) for q in queries]
+        scan_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        got = [index.search(*q) for q in queries]
+        index_time = time.perf_counter() - started
+
+        mismatches = sum(a != b for a, b in zip(expected, got))
+        print(f"{os.path.basename(path):<32} rows={len(items):5d} build {build * 1000:6.1f} ms | "
+              f"scan {scan_time / n * 1e6:7.1f} us/q  index {index_time / n * 1e6:7.1f} us/q  "
+              f"x{scan_time / index_time:5.1f}  mismatches={mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Solver benchmark: static-order DFS vs forward checking + dynamic MRV.
+
+Usage: python benchmarks/bench_solver.py [session.json]
+Without an argument, uses saved_sessions/last_session.json plus a few random
+baskets built from dist/data (the same course name never appears twice in one basket).
+"""
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from backend.solver import ScheduleSolver, TopKSearch
+
+PREFERENCE_CASES = [
+    {},
+    {'avoid_early_morning': True, 'compactness': 'high', 'max_daily_load': 4},
+]
+
+
+def random_baskets(n_baskets=3, n_groups=7, campus='3', semester='2025-2026-2'):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    by_name = {}
+    for c in catalog:
+        by_name.setdefault(c['name'], []).append(dict(c, selected=True))
+    multi = [cands for cands in by_name.values() if 4 <= len(cands) <= 15]
+    rng = random.Random(1)
+    baskets = []
+    for b in range(n_baskets):
+        picks = rng.sample(multi, n_groups)
+        baskets.append((f"random basket {b + 1}", [{'id': i, 'candidates': c} for i, c in enumerate(picks)]))
+    return baskets
+
+
+def run(groups, prefs, forward_checking):
+    meta_groups = ScheduleSolver._prepare_meta_groups(groups)
+    if meta_groups is None:
+        return None
+    records = [[m['record'] for m in g] for g in meta_groups]
+    t0 = time.perf_counter()
+    search = TopKSearch(records, prefs, 20, forward_checking=forward_checking)
+    search.run()
+    return time.perf_counter() - t0, search.stats, [s for s, _ in search.results()]
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            cases = [(sys.argv[1], json.load(f)['groups'])]
+    else:
+        cases = []
+        session = os.path.join(ROOT, 'saved_sessions', 'last_session.json')
+        if os.path.exists(session):
+            with open(session, 'r', encoding='utf-8') as f:
+                cases.append(("last_session", json.load(f)['groups']))
+        cases += random_baskets()
+
+    for name, groups in cases:
+        for prefs in PREFERENCE_CASES:
+            static = run(groups, prefs, False)
+            fc = run(groups, prefs, True)
+            if static is None:
+                print(f"{name}: a group has no selected candidate")
+                break
+            label = ",".join(k for k, v in prefs.items() if v) or "no preferences"
+            print(f"{name} [{label}] same top-K: {static[2] == fc[2]}")
+            for tag, (elapsed, stats, _) in (("static", static), ("forward", fc)):
+                print(f"    {tag:<8} {elapsed * 1000:9.1f} ms  nodes={stats['nodes']:<9} leaves={stats['leaves']:<9}"
+                      f" conflicts={stats['conflicts']:<9} wipeouts={stats['wipeouts']:<8} bound_prunes={stats['bound_prunes']}")
+            saved = static[1]['nodes'] + static[1]['conflicts'] - fc[1]['nodes']
+            print(f"    nodes saved by forward checking: {saved}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Catalog download benchmark: sequential NJUCourseClient.search vs sync_catalog.
+
+Usage: python benchmarks/bench_sync.py [campus] [latency_ms]
+No network: rows are rebuilt from dist/data and every page request sleeps
+latency + 0.02 ms per row to mimic the eHall server. search() keeps its
+20-row pages and 0.3 s pause between pages, so the full crawl is slow on purpose.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from jwFetcher import NJUCourseClient
+
+
+def raw_rows(campus, semester='2025-2026-2'):
+    path = os.path.join(ROOT, 'dist', 'data', f'nju_courses_{campus}_{semester}.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    return [{"KCM": c['name'], "KCH": c['code'], "SKJS": c['teacher'], "YPSJDD": c['location_text'],
+             "XF": c['credit'], "XS": c['hours'], "PKDWDM_DISPLAY": c['school']} for c in items]
+
+
+def fake_server(rows, latency, stats):
+    lock = threading.Lock()
+
+    def post(url, headers=None, data=None, timeout=None):
+        size, page = int(data['pageSize']), int(data['pageNumber'])
+        chunk = rows[(page - 1) * size:page * size]
+        time.sleep(latency + 0.00002 * len(chunk))
+        with lock:
+            stats['requests'] += 1
+        response = MagicMock()
+        response.json.return_value = {"datas": {"qxfbkccx": {"rows": chunk, "totalSize": len(rows)}}}
+        return response
+    return post
+
+
+def main():
+    campus = sys.argv[1] if len(sys.argv) > 1 else '1'
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 80.0) / 1000.0
+    rows = raw_rows(campus)
+
+    with patch('jwFetcher.LoginInterceptor') as interceptor:
+        interceptor.return_value.get_cookie.return_value = "dummy_cookie"
+        client = NJUCourseClient()
+
+    print(f"=== Catalog sync benchmark (campus {campus}, {len(rows)} rows, {latency * 1000:.0f} ms latency) ===")
+
+    stats = {'requests': 0}
+    with patch('requests.post', side_effect=fake_server(rows, latency, stats)):
+        t0 = time.perf_counter()
+        sequential = client.search(campus=campus, semester='2025-2026-2')
+        t_seq = time.perf_counter() - t0
+    print(f"search()      {t_seq:7.2f} s  {len(rows) / t_seq:8.1f} rows/s  ({stats['requests']} requests)")
+
+    for concurrency in (1, 4, 8):
+        stats = {'requests': 0}
+        session = MagicMock()
+        session.post.side_effect = fake_server(rows, latency, stats)
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session):
+            items, report = client.sync_catalog(campus, '2025-2026-2', concurrency=concurrency)
+        print(f"sync x{concurrency:<2}       {report['seconds']:7.2f} s  {report['rows_per_sec']:8.1f} rows/s"
+              f"  ({stats['requests']} requests, identical={items == sequential})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Edge search 索引分片构建 (dist/functions/search.js 使用).
+
+python build_search_shards.py [dist/data/nju_courses_<campus>_<semester>.json ...]
+  默认处理 dist/data 下所有目录, 输出到 dist/data/index/nju_courses_<campus>_<semester>/:
+    manifest.json       版本, 行数, 分桶数, 行块大小, 非空分桶列表
+    name/<bucket>.json  课程名 n-gram (单字 + 二元组) -> 行号列表
+    code/<bucket>.json  课程号 n-gram -> 行号列表 (每个后缀的 1/2 字符前缀, 子串匹配不变)
+    rows/<chunk>.json   按目录顺序每 CHUNK_SIZE 行一块的完整条目
+  一个查询只取它的 n-gram 所在分桶和候选行所在的行块, 再用原来的 filter 复核,
+  所以结果与全量扫描一致; 构建后会用全量扫描逐条校验.
+"""
+import json
+import os
+import random
+import re
+import shutil
+import sys
+
+VERSION = 1
+BUCKETS = 64
+CHUNK_SIZE = 64
+DATA_DIR = os.path.join("dist", "data")
+INDEX_DIR = os.path.join(DATA_DIR, "index")
+# 只匹配目录本身, 不匹配 <目录>.sections.json / .changes.json 等旁路文件
+CATALOG_FILE = re.compile(r"nju_courses_[^_.]+_\d{4}-\d{4}-\d+\.json")
+
+
+def gram_bucket(gram, buckets=BUCKETS):
+    """FNV-1a over code points; search.js computes the same value."""
+    h = 0x811C9DC5
+    for ch in gram:
+        h = ((h ^ ord(ch)) * 0x01000193) & 0xFFFFFFFF
+    return h % buckets
+
+
+def text_grams(text):
+    """Every unigram and bigram of a (lowercased) text."""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(keyword):
+    """The grams a row must hold to contain keyword: the keyword itself if short, else its bigrams."""
+    if len(keyword) <= 2:
+        return [keyword]
+    return [keyword[i:i + 2] for i in range(len(keyword) - 1)]
+
+
+def full_scan(items, name=None, code=None, match_mode="OR"):
+    """Reference filter, the same rules as the dataset.filter in search.js."""
+    name = (name or "").lower().strip()
+    code = (code or "").lower().strip()
+    keywords = name.split()
+    out = []
+    for row, item in enumerate(items):
+        if name:
+            item_name = (item.get("name") or "").lower()
+            hits = [k in item_name for k in keywords]
+            if not (all(hits) if match_mode == "AND" else any(hits)):
+                continue
+        if code and code not in (item.get("code") or "").lower():
+            continue
+        out.append(row)
+    return out
+
+
+def _postings(texts):
+    buckets = {}
+    for row, text in enumerate(texts):
+        for gram in text_grams(text):
+            buckets.setdefault(gram_bucket(gram), {}).setdefault(gram, []).append(row)
+    return buckets
+
+
+def _dump(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def build_shards(items, out_dir):
+    """Writes the shard set of one catalog into out_dir (replacing it). Returns the manifest."""
+    tmp = out_dir + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    for sub in ("name", "code", "rows"):
+        os.makedirs(os.path.join(tmp, sub))
+
+    fields = {
+        "name": _postings([(i.get("name") or "").lower() for i in items]),
+        "code": _postings([(i.get("code") or "").lower() for i in items]),
+    }
+    for field, buckets in fields.items():
+        for bucket, grams in buckets.items():
+            _dump(os.path.join(tmp, field, f"{bucket}.json"), grams)
+
+    chunks = (len(items) + CHUNK_SIZE - 1) // CHUNK_SIZE
+    for c in range(chunks):
+        _dump(os.path.join(tmp, "rows", f"{c}.json"), items[c * CHUNK_SIZE:(c + 1) * CHUNK_SIZE])
+
+    manifest = {
+        "version": VERSION,
+        "rows": len(items),
+        "buckets": BUCKETS,
+        "chunk_size": CHUNK_SIZE,
+        "chunks": chunks,
+        "name_buckets": sorted(fields["name"]),
+        "code_buckets": sorted(fields["code"]),
+    }
+    _dump(os.path.join(tmp, "manifest.json"), manifest)
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    return manifest
+
+
+class ShardReader:
+    """
+    Python twin of the lookup in search.js, reading shards from disk; counts the
+    files a query touches so the build can report how much each query fetches.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.manifest = self._load("manifest.json")
+        self._present = {"name": set(self.manifest["name_buckets"]), "code": set(self.manifest["code_buckets"])}
+        self.files = set()
+
+    def _load(self, rel):
+        with open(os.path.join(self.index_dir, rel), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _gram_rows(self, field, gram):
+        bucket = gram_bucket(gram, self.manifest["buckets"])
+        if bucket not in self._present[field]:
+            return set()
+        rel = f"{field}/{bucket}.json"
+        self.files.add(rel)
+        return set(self._load(rel).get(gram, ()))
+
+    def _keyword_rows(self, field, keyword):
+        rows = None
+        for gram in query_grams(keyword):
+            found = self._gram_rows(field, gram)
+            rows = found if rows is None else rows & found
+            if not rows:
+                return set()
+        return rows
+
+    def search(self, name=None, code=None, match_mode="OR"):
+        """Matching items in catalog order, or None for a query without filters (the caller scans)."""
+        name = (name or "").lower().strip()
+        code = (code or "").lower().strip()
+        if not name and not code:
+            return None
+        candidates = None
+        if name:
+            sets = [self._keyword_rows("name", k) for k in name.split()]
+            candidates = set.intersection(*sets) if match_mode == "AND" else set.union(*sets)
+        if code:
+            found = self._keyword_rows("code", code)
+            candidates = found if candidates is None else candidates & found
+
+        size = self.manifest["chunk_size"]
+        chunks = {}
+        for c in sorted({r // size for r in candidates}):
+            rel = f"rows/{c}.json"
+            self.files.add(rel)
+            chunks[c] = self._load(rel)
+        rows = sorted(candidates)
+        items = [chunks[r // size][r % size] for r in rows]
+        # 复核: n-gram 只保证必要条件
+        keep = set(full_scan(items, name, code, match_mode))
+        return [(row, item) for pos, (row, item) in enumerate(zip(rows, items)) if pos in keep]
+
+
+def sample_queries(items, n=300, seed=0):
+    """Fixed edge cases plus random name fragments / code substrings taken from the catalog."""
+    rng = random.Random(seed)
+    queries = [("数学", None, "OR"), ("高等 数学", None, "AND"), ("数学 物理 英语", None, "OR"),
+               ("学", None, "OR"), ("english", None, "OR"), ("不存在的课程", None, "OR"),
+               (None, "0", "OR"), (None, "00", "OR"), (None, "zzz", "OR"), ("英语", "0", "AND")]
+    if not items:
+        return queries
+    for i in range(n):
+        a = rng.choice(items).get("name") or ""
+        b = rng.choice(items).get("name") or ""
+        frag = a[rng.randrange(max(len(a), 1)):][:rng.randint(1, 5)]
+        code = (rng.choice(items).get("code") or "")
+        code = code[rng.randrange(max(len(code), 1)):][:rng.randint(1, 6)]
+        kind = i % 4
+        if kind == 0:
+            queries.append((frag, None, "OR"))
+        elif kind == 1:
+            queries.append((f"{frag} {b[:2]}", None, "AND"))
+        elif kind == 2:
+            queries.append((None, code, "OR"))
+        else:
+            queries.append((f"{frag} {b[-2:]}", code[:3], rng.choice(["OR", "AND"])))
+    return queries
+
+
+def validate(items, index_dir, queries=None):
+    """Compares shard lookups with the full scan. Returns (mismatches, report)."""
+    reader = ShardReader(index_dir)
+    queries = queries if queries is not None else sample_queries(items)
+    mismatches = []
+    files = []
+    fetched = []
+    for q in queries:
+        reader.files = set()
+        got = reader.search(*q)
+        if got is None:
+            continue
+        expected = full_scan(items, *q)
+        if [row for row, _ in got] != expected or any(item != items[row] for row, item in got):
+            mismatches.append(q)
+        files.append(len(reader.files))
+        fetched.append(sum(os.path.getsize(os.path.join(index_dir, rel)) for rel in reader.files))
+    n = len(files) or 1
+    report = {"queries": len(files), "mismatches": len(mismatches),
+              "avg_files": round(sum(files) / n, 1), "max_files": max(files, default=0),
+              "avg_kib": round(sum(fetched) / n / 1024, 1), "max_kib": round(max(fetched, default=0) / 1024, 1)}
+    return mismatches, report
+
+
+def catalog_sources(data_dir=DATA_DIR):
+    """dist/data catalogs (nju_courses_<campus>_<semester>.json), sorted by path."""
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if CATALOG_FILE.fullmatch(name))
+
+
+def index_dir_for(json_path, root=INDEX_DIR):
+    return os.path.join(root, os.path.splitext(os.path.basename(json_path))[0])
+
+
+def build_from_json(json_path, root=INDEX_DIR):
+    """Build + validate for one dist/data catalog. Returns (manifest, mismatches, report)."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    out_dir = index_dir_for(json_path, root)
+    manifest = build_shards(items, out_dir)
+    mismatches, report = validate(items, out_dir)
+    return manifest, mismatches, report
+
+
+if __name__ == "__main__":
+    sources = sys.argv[1:] or catalog_sources()
+    failed = False
+    for src in sources:
+        manifest, mismatches, report = build_from_json(src)
+        print(f"[Shards] {src}: {manifest['rows']} rows, {len(manifest['name_buckets'])} name / "
+              f"{len(manifest['code_buckets'])} code buckets, {manifest['chunks']} row chunks | {report}")
+        for q in mismatches[:10]:
+            print(f"    mismatch: {q}")
+        failed = failed or bool(mismatches)
+    sys.exit(1 if failed else 0)
@@ -1,3 +1,117 @@
+// Index layout written by build_search_shards.py (dist/data/index/<filenameKey>/)
+const INDEX_VERSION = 1;
+
+const jsonResponse = (body, status = 200) => new Response(JSON.stringify(body), {
+    headers: { "Content-Type": "application/json" },
+    status
+});
+
+// FNV-1a over code points, same as gram_bucket() in build_search_shards.py
+function gramBucket(gram, buckets) {
+    let h = 0x811C9DC5;
+    for (const ch of gram) {
+        h = Math.imul(h ^ ch.codePointAt(0), 0x01000193) >>> 0;
+    }
+    return h % buckets;
+}
+
+// A row containing `keyword` holds the keyword itself (1-2 chars) or every bigram of it
+function queryGrams(keyword) {
+    const chars = Array.from(keyword);
+    if (chars.length <= 2) return [keyword];
+    const grams = [];
+    for (let i = 0; i < chars.length - 1; i++) grams.push(chars[i] + chars[i + 1]);
+    return grams;
+}
+
+function matches(item, name, code, matchMode) {
+    if (name) {
+        const keywords = name.split(/\s+/);
+        const itemName = (item.name || '').toLowerCase();
+
+        if (matchMode === 'AND') {
+            if (!keywords.every(k => itemName.includes(k))) return false;
+        } else {
+            if (!keywords.some(k => itemName.includes(k))) return false;
+        }
+    }
+
+    if (code) {
+         if (!(item.code || '').toLowerCase().includes(code)) return false;
+    }
+
+    return true;
+}
+
+async function fetchJson(origin, path) {
+    const resp = await fetch(new URL(path, origin).toString());
+    return resp.ok ? await resp.json() : null;
+}
+
+// Sharded lookup: only the n-gram buckets of the query and the row chunks of the
+// candidates are fetched; candidates are re-checked with the same filter as the full scan.
+// Returns null when the index is missing or the query has no filter (caller scans the dataset).
+async function searchShards(origin, filenameKey, name, code, matchMode) {
+    if (!name && !code) return null;
+    const base = `/data/index/${filenameKey}/`;
+    const manifest = await fetchJson(origin, base + 'manifest.json');
+    if (!manifest || manifest.version !== INDEX_VERSION) return null;
+
+    const present = { name: new Set(manifest.name_buckets), code: new Set(manifest.code_buckets) };
+    const bucketCache = new Map();
+    const loadBucket = (field, bucket) => {
+        const key = `${field}/${bucket}`;
+        if (!bucketCache.has(key)) {
+            bucketCache.set(key, fetchJson(origin, `${base}${key}.json`).then(b => {
+                if (!b) throw new Error(`missing shard ${key}`);
+                return b;
+            }));
+        }
+        return bucketCache.get(key);
+    };
+
+    const keywordRows = async (field, keyword) => {
+        const grams = queryGrams(keyword);
+        const postings = await Promise.all(grams.map(async gram => {
+            const bucket = gramBucket(gram, manifest.buckets);
+            if (!present[field].has(bucket)) return [];
+            return (await loadBucket(field, bucket))[gram] || [];
+        }));
+        let rows = new Set(postings[0]);
+        for (const list of postings.slice(1)) {
+            const next = new Set(list);
+            rows = new Set([...rows].filter(r => next.has(r)));
+        }
+        return rows;
+    };
+
+    let candidates = null;
+    if (name) {
+        const sets = await Promise.all(name.split(/\s+/).map(k => keywordRows('name', k)));
+        if (matchMode === 'AND') {
+            candidates = sets.reduce((acc, s) => new Set([...acc].filter(r => s.has(r))));
+        } else {
+            candidates = new Set(sets.flatMap(s => [...s]));
+        }
+    }
+    if (code) {
+        const rows = await keywordRows('code', code);
+        candidates = candidates === null ? rows : new Set([...candidates].filter(r => rows.has(r)));
+    }
+
+    const rows = [...candidates].sort((a, b) => a - b);
+    const size = manifest.chunk_size;
+    const chunkIds = [...new Set(rows.map(r => Math.floor(r / size)))];
+    const chunks = new Map(await Promise.all(chunkIds.map(async c => {
+        const chunk = await fetchJson(origin, `${base}rows/${c}.json`);
+        if (!chunk) throw new Error(`missing chunk ${c}`);
+        return [c, chunk];
+    })));
+    return rows
+        .map(r => chunks.get(Math.floor(r / size))[r % size])
+        .filter(item => matches(item, name, code, matchMode));
+}
+
 export async function onRequest({ request, env, event }) {
     const url = new URL(request.url);
     const params = url.searchParams;
@@ -8,58 +122,34 @@ export async function onRequest({ request, env, event }) {
     const datasetKey = `nju_courses_${campus}_${semester.split('-').join('')}`;
     const filenameKey = `nju_courses_${campus}_${semester}`;
 
+    const name = (params.get('name') || '').toLowerCase().trim();
+    const code = (params.get('code') || '').toLowerCase().trim();
+    const matchMode = params.get('match_mode') || 'OR';
+
+    try {
+        const results = await searchShards(url.origin, filenameKey, name, code, matchMode);
+        if (results !== null) {
+            return jsonResponse(results);
+        }
+    } catch (e) {
+        // Incomplete index: fall through to the full dataset
+    }
+
     let dataset = null;
 
     if (!dataset) {
         try {
-             const dataUrl = new URL(`/data/${filenameKey}.json`, url.origin).toString();
-             const resp = await fetch(dataUrl);
-             if (resp.ok) {
-                 dataset = await resp.json();
-             }
+             dataset = await fetchJson(url.origin, `/data/${filenameKey}.json`);
         } catch (e) {
-            return new Response(JSON.stringify({ error: "Error fetching dataset" }), {
-            headers: { "Content-Type": "application/json" },
-            status: 404
-        });                                                                                                                      
+            return jsonResponse({ error: "Error fetching dataset" }, 404);
+        }
     }
-}
 
     if (!dataset) {
-        return new Response(JSON.stringify({ error: "Dataset not found for this campus/semester" }), {
-            headers: { "Content-Type": "application/json" },
-            status: 404
-        });
+        return jsonResponse({ error: "Dataset not found for this campus/semester" }, 404);
     }
 
-    const name = (params.get('name') || '').toLowerCase().trim();
-    const code = (params.get('code') || '').toLowerCase().trim();
-    const matchMode = params.get('match_mode') || 'OR';
-
-    const results = dataset.filter(item => {
-        if (name) {
-            const keywords = name.split(/\s+/);
-            const itemName = (item.name || '').toLowerCase();
-            const itemTeacher = (item.teacher || '').toLowerCase();
-            const combined = itemName; 
-
-            if (matchMode === 'AND') {
-                if (!keywords.every(k => itemName.includes(k))) return false;
-            } else {
-                if (!keywords.some(k => itemName.includes(k))) return false;
-            }
-        }
+    const results = dataset.filter(item => matches(item, name, code, matchMode));
 
-        if (code) {
-             if (!(item.code || '').toLowerCase().includes(code)) return false;
-        }
-
-        return true;
-    });
-
-
-    return new Response(JSON.stringify(results), {
-        headers: { "Content-Type": "application/json" },
-        status: 200
-    });
-}
\ No newline at end of file
+    return jsonResponse(results);
+}
@@ -1,17 +1,33 @@
 import requests
 import json
+import asyncio
 import math
 import time
 import re
 import webview
 import threading
 import http.cookies
+from functools import lru_cache
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from backend.cookie_manager import CookieManager
+from backend.catalog_diff import diff_rows, has_changes
+from backend.catalog_binary import binary_path, write_catalog
+from backend.fetch_policy import (AdaptiveRateLimiter, RetryPolicy, FetchError, classify_response,
+                                  classify_error, SESSION, NETWORK, THROTTLED)
 
 # ================= 配置常量 =================
 TARGET_URL = "https://ehallapp.nju.edu.cn/jwapp/sys/kcbcx/modules/qxkcb/qxfbkccx.do"
 GATEWAY_URL = "https://ehallapp.nju.edu.cn/jwapp/sys/kcbcx/*default/index.do"
 
+# 整学期批量同步 (sync_catalog) 的默认分页大小与并发页数
+SYNC_PAGE_SIZE = 100
+SYNC_CONCURRENCY = 4
+# --refresh 的构建产物 (行指纹, 变更集): 不放进 dist/, 不随站点部署
+REFRESH_STATE_DIR = os.path.join("build", "catalog")
+
 # 星期映射 (用于位图计算)
 WEEKDAY_MAP = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
 
@@ -22,9 +38,14 @@ class ScheduleBitmapper:
     # 捕获组: 1=星期, 2=开始节, 3=结束节, 4=周次(如 "1-10,12")
     REGEX_PATTERN = re.compile(r"周([一二三四五六日])\s*(\d+)-(\d+)节\s*([0-9,-]+)周")
 
+    # 单遍分词器: 分隔符 / 时间规则 / 单双周标记. 规则本身不可能跨越 [,;],
+    # 所以整串扫描一遍与先 re.split 再逐段 finditer 得到的匹配完全相同
+    TOKEN_PATTERN = re.compile(r"(?P<sep>[,;])|(?P<odd>\(单\))|(?P<even>\(双\))"
+                               r"|周(?P<day>[一二三四五六日])\s*(?P<start>\d+)-(?P<end>\d+)节\s*(?P<weeks>[0-9-]+)周")
+
     @staticmethod
-    def parse_week_ranges(week_str):
-        """解析 '1-16' 或 '1-8,10-16' 为具体的周列表"""
+    @lru_cache(maxsize=4096)
+    def _week_tuple(week_str):
         weeks = set()
         parts = week_str.split(',')
         for part in parts:
@@ -37,84 +58,124 @@ class ScheduleBitmapper:
                 try:
                     weeks.add(int(part))
                 except: pass
-        return sorted(list(weeks))
+        return tuple(sorted(weeks))
 
     @staticmethod
-    def generate_bitmap(location_text, max_weeks=25):
+    def parse_week_ranges(week_str):
+        """解析 '1-16' 或 '1-8,10-16' 为具体的周列表 (按字符串记忆化)"""
+        return list(ScheduleBitmapper._week_tuple(week_str))
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _rule(day_char, start_node, end_node, week_range_str, is_odd_only, is_even_only, max_weeks):
         """
-        核心算法：生成时间位图列表 和 结构化会话数据
-        Returns:
-           bitmap: List[str], index=周次 (0不使用), value=当周的位掩码(字符串格式, 避免整数溢出)
-           sessions: List[dict], 包含结构化的时间地点信息
-        位掩码规则: Day(0-6) * 13 + Node(0-12) -> 对应 Bit 置 1
+        一条时间规则 -> (day_idx, s_node, e_node, filtered_weeks, segment_mask); 无有效周次时为 None.
+        按规范化后的时间字段记忆化, 不同教学班/校区共用同一份结果
         """
-        # 初始化：0周不用，1-max_weeks 周
-        semester_schedule = [0] * (max_weeks + 1)
-        sessions = []
-        
-        if not location_text:
-            return [str(x) for x in semester_schedule], sessions
-
-        # 处理多个时间段，通常用分号分隔
-        segments = re.split(r'[,;]', location_text)
+        day_idx = WEEKDAY_MAP.get(day_char, 0)
+        s_node = int(start_node)
+        e_node = int(end_node)
+        filtered_weeks = tuple(
+            w for w in ScheduleBitmapper._week_tuple(week_range_str)
+            if 0 < w <= max_weeks
+            and not (is_odd_only and w % 2 == 0)
+            and not (is_even_only and w % 2 != 0)
+        )
+        if not filtered_weeks:
+            return None
+
+        # 计算这一条时间规则在“单周”内的掩码 (Base Mask)
+        segment_mask = 0
+        for node in range(s_node, e_node + 1):
+            # 假设每天13节课，位置 = 天*13 + (节-1)
+            # Bit 0 = 周一第1节
+            bit_pos = (day_idx * 13) + (node - 1)
+            segment_mask |= (1 << bit_pos)
+        return day_idx, s_node, e_node, filtered_weeks, segment_mask
 
-        for seg in segments:
-            matches = list(ScheduleBitmapper.REGEX_PATTERN.finditer(seg))
-            if not matches:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _schedule(signature, max_weeks):
+        """
+        一组时间规则 (整条 location_text 去掉地点后的规范化形式) -> (bitmap 字符串元组, 各规则结果).
+        signature: ((day, start, end, weeks, is_odd_only, is_even_only), ...)
+        """
+        semester_schedule = [0] * (max_weeks + 1)
+        rules = []
+        for fields in signature:
+            rule = ScheduleBitmapper._rule(*fields, max_weeks)
+            rules.append(rule)
+            if rule is None:
                 continue
+            segment_mask = rule[4]
+            for w in rule[3]:
+                semester_schedule[w] |= segment_mask
+        # 多数周的掩码相同, 每个不同的值只转一次字符串
+        strings = {}
+        bitmap = tuple(strings[x] if x in strings else strings.setdefault(x, str(x)) for x in semester_schedule)
+        return bitmap, tuple(rules)
 
-            is_odd_only = "(单)" in seg
-            is_even_only = "(双)" in seg
-            
-            # 尝试从 seg 中提取地点信息 (移除匹配的时间部分)
-            # 这是一个简单的 heuristic，可能不完美
-            location_part = seg
-            for m in matches:
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _parse(location_text, max_weeks):
+        """整条 location_text 的不可变解析结果: (bitmap 字符串元组, session 元组)"""
+        # 一遍扫描, 按分隔符切出各段的规则与单双周标记
+        segments = []
+        seg_start, rules, odd, even = 0, [], False, False
+        for tok in ScheduleBitmapper.TOKEN_PATTERN.finditer(location_text):
+            kind = tok.lastgroup
+            if kind == 'sep':
+                if rules:
+                    segments.append((seg_start, tok.start(), rules, odd, even))
+                seg_start, rules, odd, even = tok.end(), [], False, False
+            elif kind == 'odd':
+                odd = True
+            elif kind == 'even':
+                even = True
+            else:
+                rules.append(tok)
+        if rules:
+            segments.append((seg_start, len(location_text), rules, odd, even))
+
+        signature = []
+        locations = []
+        for start, end, rules, is_odd_only, is_even_only in segments:
+            # 地点 = 段文本去掉时间规则和单双周标记 (与原 heuristic 逐字一致)
+            location_part = location_text[start:end]
+            for m in rules:
                 location_part = location_part.replace(m.group(0), "")
             location_part = location_part.replace("(单)", "").replace("(双)", "").strip()
+            for m in rules:
+                signature.append((m.group('day'), m.group('start'), m.group('end'), m.group('weeks'),
+                                  is_odd_only, is_even_only))
+                locations.append(location_part)
 
-            for match in matches:
-                day_char, start_node, end_node, week_range_str = match.groups()
-
-                day_idx = WEEKDAY_MAP.get(day_char, 0)
-                s_node = int(start_node)
-                e_node = int(end_node)
-                active_weeks = ScheduleBitmapper.parse_week_ranges(week_range_str)
-
-                # Filter active weeks based on odd/even
-                filtered_weeks = []
-                for w in active_weeks:
-                    if 0 < w <= max_weeks:
-                        if is_odd_only and (w % 2 == 0): continue
-                        if is_even_only and (w % 2 != 0): continue
-                        filtered_weeks.append(w)
+        bitmap, results = ScheduleBitmapper._schedule(tuple(signature), max_weeks)
+        sessions = tuple(rule[:4] + (location,) for rule, location in zip(results, locations) if rule is not None)
+        return bitmap, sessions
 
-                if not filtered_weeks:
-                    continue
+    @staticmethod
+    def generate_bitmap(location_text, max_weeks=25):
+        """
+        核心算法：生成时间位图列表 和 结构化会话数据
+        Returns:
+           bitmap: List[str], index=周次 (0不使用), value=当周的位掩码(字符串格式, 避免整数溢出)
+           sessions: List[dict], 包含结构化的时间地点信息
+        位掩码规则: Day(0-6) * 13 + Node(0-12) -> 对应 Bit 置 1
+        解析结果按 location_text 记忆化; 每次调用返回新的 list/dict, 调用方可以放心修改
+        """
+        if not location_text:
+            return ["0"] * (max_weeks + 1), []
+        bitmap, sessions = ScheduleBitmapper._parse(location_text, max_weeks)
+        return list(bitmap), [
+            {"day": day, "start": start, "end": end, "weeks": list(weeks), "location": location}
+            for day, start, end, weeks, location in sessions
+        ]
 
-                # Store structured session
-                sessions.append({
-                    "day": day_idx,
-                    "start": s_node,
-                    "end": e_node,
-                    "weeks": filtered_weeks,
-                    "location": location_part
-                })
-
-                # 1. 计算这一条时间规则在“单周”内的掩码 (Base Mask)
-                segment_mask = 0
-                for node in range(s_node, e_node + 1):
-                    # 假设每天13节课，位置 = 天*13 + (节-1)
-                    # Bit 0 = 周一第1节
-                    bit_pos = (day_idx * 13) + (node - 1)
-                    segment_mask |= (1 << bit_pos)
-
-                # 2. 将掩码填充到具体的周次中
-                for w in filtered_weeks:
-                    semester_schedule[w] |= segment_mask
-                    
-        # Convert bitmaps to string to prevent JS overflow
-        return [str(x) for x in semester_schedule], sessions
+    @staticmethod
+    def generate_bitmaps(location_texts, max_weeks=25):
+        """批量接口 (整份目录): 对一串 location_text 返回 [(bitmap, sessions), ...], 相同文本只解析一次"""
+        return [ScheduleBitmapper.generate_bitmap(text, max_weeks) for text in location_texts]
 
 class LoginInterceptor:
     """基于 pywebview 的登录与 Cookie 嗅探"""
@@ -233,6 +294,11 @@ class NJUCourseClient:
             "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
             "X-Requested-With": "XMLHttpRequest"
         }
+        # 所有分页请求共用的自适应限速器与重试策略 (取代固定的 0.3s 间隔)
+        self.limiter = AdaptiveRateLimiter()
+        self.retry_policy = RetryPolicy()
+        # 并发分页同时遇到会话过期时只登录一次
+        self._session_lock = threading.Lock()
 
         if cookie_str:
             self.headers["Cookie"] = cookie_str
@@ -245,6 +311,16 @@ class NJUCourseClient:
             cookie_str = self.interceptor.force_login()
         self.headers["Cookie"] = cookie_str
 
+    def _renew_session(self, stale_cookie):
+        """
+        会话过期后恢复会话 (线程安全): 第一个线程重新登录, 其余线程等锁,
+        拿到锁时 Cookie 已不是自己请求时用的那个, 直接复用新 Cookie.
+        """
+        with self._session_lock:
+            if self.headers.get("Cookie") != stale_cookie:
+                return
+            self.ensure_active_session()
+
     def _get_campus_display(self, code):
         """辅助：补全后端强制要求的 value_display"""
         mapping = {"1": "鼓楼校区", "2": "浦口校区", "3": "仙林校区", "4": "苏州校区"}
@@ -254,16 +330,10 @@ class NJUCourseClient:
         if self.toast_callback:
             self.toast_callback(msg, type)
 
-    def search(self, course_name=None, course_code=None, campus="1", semester="2025-2026-1", match_mode="OR"):
+    def build_query_setting(self, course_name=None, course_code=None, campus="1", semester="2025-2026-1", match_mode="OR"):
         """
-        分页拉取所有符合条件的数据
-        match_mode: "OR" (任意匹配) 或 "AND" (全部匹配) - 仅对 course_name 有效
+        构造 qxfbkccx.do 的 querySetting 列表 (search 与 sync_catalog 共用)
         """
-        all_data = []
-        page = 1
-        page_size = 20 # 你要求的默认值
-        
-        # 1. 构造查询结构 (QuerySetting)
         query_list = []
         
         # --- 动态参数 ---
@@ -318,6 +388,59 @@ class NJUCourseClient:
         query_list.append([[{"name": "RWZTDM", "value": "1", "linkOpt": "and", "builder": "equal"}, {"name": "RWZTDM", "linkOpt": "or", "builder": "isNull"}]])
         query_list.append({"name": "CXYH", "value": True, "linkOpt": "AND", "builder": "equal"})
         query_list.append({"name": "*order", "value": "+KKDWDM,+KCH,+KXH", "linkOpt": "AND", "builder": "m_value_equal"})
+        return query_list
+
+    @staticmethod
+    def clean_row(row):
+        """
+        单行数据清洗与二进制化; 老师和地点全为空的行返回 None
+        """
+        raw_loc = row.get("YPSJDD", "") or ""
+        teacher = row.get("SKJS") or ""
+
+        # 过滤 1: 老师和地点全为空 (包括空白字符)
+        if not teacher.strip() and not raw_loc.strip():
+            return None
+
+        # 调用正则解析器
+        bitmap, sessions = ScheduleBitmapper.generate_bitmap(raw_loc)
+        
+        # Try to extract credit (XF) and hours (XS)
+        try:
+            credit = float(row.get("XF", 0))
+        except:
+            credit = 0.0
+
+        try:
+            hours = float(row.get("XS", 0))
+        except:
+            hours = 0.0
+
+        item = {
+            "name": row.get("KCM"),
+            "code": row.get("KCH"),
+            "teacher": teacher,
+            "credit": credit,
+            "hours": hours,
+            "location_text": raw_loc,
+            "school": row.get("PKDWDM_DISPLAY") or row.get("KKDWDM_DISPLAY"),
+            # 输出二进制列表 (核心)
+            "schedule_bitmaps": bitmap,
+            "sessions": sessions
+        }
+        return item
+
+    def search(self, course_name=None, course_code=None, campus="1", semester="2025-2026-1", match_mode="OR"):
+        """
+        分页拉取所有符合条件的数据
+        match_mode: "OR" (任意匹配) 或 "AND" (全部匹配) - 仅对 course_name 有效
+        """
+        all_data = []
+        page = 1
+        page_size = 20 # 你要求的默认值
+        
+        # 1. 构造查询结构 (QuerySetting)
+        query_list = self.build_query_setting(course_name, course_code, campus, semester, match_mode)
 
         # 2. 分页循环
         print(f"[*] 开始查询: Name={course_name}, Code={course_code}, Campus={campus}...")
@@ -325,6 +448,8 @@ class NJUCourseClient:
         
         # 用于去重 (计算 content hash)
         seen_hashes = set()
+        total_size = 0
+        failed_pages = []
 
         while True:
             form_data = {
@@ -335,24 +460,20 @@ class NJUCourseClient:
                 "pageNumber": str(page)
             }
             
-            # Retry loop for session expiration
-            res_json = None
-            max_retries = 1
-            for attempt in range(max_retries + 1):
-                try:
-                    resp = requests.post(TARGET_URL, headers=self.headers, data=form_data, timeout=10)
-                    res_json = resp.json()
-                    break # Success
-                except (json.JSONDecodeError, requests.RequestException) as e:
-                    if attempt < max_retries:
-                         print(f"[Warn] Request failed (Attempt {attempt+1}): {e}")
-                         self._toast("会话可能已过期，正在尝试恢复...", "error")
-                         self.ensure_active_session()
-                         # Continue to next attempt
-                    else:
-                         print(f"[Error] Request failed after retries: {e}")
-                         self._toast(f"查询失败 (网络或会话错误): {e}", "error")
-                         return [] # Stop
+            # 限速 + 分类重试; 重试耗尽的页单独跳过, 不中断整个搜索
+            try:
+                res_json = self._request_page(requests.post, form_data, page)
+            except FetchError as e:
+                if page == 1:
+                    print(f"[Error] Request failed after retries: {e}")
+                    self._toast(f"查询失败 (网络或会话错误): {e.cause}", "error")
+                    return [] # Stop
+                print(f"[Error] Page {page} failed after retries, skipped: {e}")
+                failed_pages.append(page)
+                if (page * page_size) >= total_size:
+                    break
+                page += 1
+                continue
 
             if not res_json:
                 break
@@ -372,40 +493,10 @@ class NJUCourseClient:
                 
                 # 数据清洗与二进制化
                 for row in rows:
-                    raw_loc = row.get("YPSJDD", "") or ""
-                    teacher = row.get("SKJS") or ""
-
-                    # 过滤 1: 老师和地点全为空 (包括空白字符)
-                    if not teacher.strip() and not raw_loc.strip():
+                    item = self.clean_row(row)
+                    if item is None:
                         continue
 
-                    # 调用正则解析器
-                    bitmap, sessions = ScheduleBitmapper.generate_bitmap(raw_loc)
-                    
-                    # Try to extract credit (XF) and hours (XS)
-                    try:
-                        credit = float(row.get("XF", 0))
-                    except:
-                        credit = 0.0
-
-                    try:
-                        hours = float(row.get("XS", 0))
-                    except:
-                        hours = 0.0
-
-                    item = {
-                        "name": row.get("KCM"),
-                        "code": row.get("KCH"),
-                        "teacher": teacher,
-                        "credit": credit,
-                        "hours": hours,
-                        "location_text": raw_loc,
-                        "school": row.get("PKDWDM_DISPLAY") or row.get("KKDWDM_DISPLAY"),
-                        # 输出二进制列表 (核心)
-                        "schedule_bitmaps": bitmap,
-                        "sessions": sessions
-                    }
-
                     # 过滤 2: 完全一致项目去重
                     # 构造唯一标识 tuple (name, code, teacher, location_text, school)
                     # schedule_bitmaps 是派生数据，不需要加入 hash
@@ -425,17 +516,316 @@ class NJUCourseClient:
                     break
                 
                 page += 1
-                time.sleep(0.3)
                 
             except Exception as e:
                 print(f"[Error] Page {page} failed: {e}")
                 break
-                
+
+        if failed_pages:
+            self._toast(f"第 {', '.join(map(str, failed_pages))} 页下载失败, 结果可能不完整", "error")
+        return all_data
+
+    def _request_page(self, post, form_data, page, timeout=None, interactive=True):
+        """
+        单页请求: 令牌桶限速, 按错误类型处理失败 (见 backend/fetch_policy.py):
+        网络错误/限流 -> 指数退避 + 抖动后重试; 会话过期 -> 恢复会话 (并发请求只登录一次) 后重试; 其他 -> 直接失败.
+        post: requests.post 或连接池 session.post
+        interactive: False 时会话过期直接失败, 不弹登录窗口 (后台刷新)
+        Returns: 解析后的 JSON; 重试耗尽时抛出 FetchError
+        """
+        policy = self.retry_policy
+        attempt = 0
+        session_attempt = 0
+        while True:
+            self.limiter.acquire()
+            started = time.monotonic()
+            error = None
+            sent_cookie = self.headers.get("Cookie")
+            try:
+                resp = post(TARGET_URL, headers=self.headers, data=form_data, timeout=timeout or policy.timeout)
+                kind = classify_response(resp)
+                if kind is None:
+                    res_json = resp.json()
+                    self.limiter.record(time.monotonic() - started, ok=True)
+                    return res_json
+                error = f"HTTP {getattr(resp, 'status_code', '?')}"
+            except Exception as e:
+                kind = classify_error(e)
+                error = e
+
+            self.limiter.record(time.monotonic() - started, ok=False, throttled=(kind == THROTTLED))
+            if kind == SESSION and interactive and session_attempt < policy.session_retries:
+                session_attempt += 1
+                print(f"[Warn] Page {page}: session expired? ({error})")
+                self._toast("会话可能已过期，正在尝试恢复...", "error")
+                self._renew_session(sent_cookie)
+                continue
+            if kind in (NETWORK, THROTTLED) and attempt < policy.max_retries:
+                delay = policy.backoff(attempt)
+                attempt += 1
+                print(f"[Warn] Page {page}: {kind} error ({error}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            raise FetchError(kind, error)
+
+    @staticmethod
+    def item_key(item):
+        """search() 的去重键: (name, code, teacher, location_text, school)"""
+        return (item["name"], item["code"], item["teacher"], item["location_text"], item["school"])
+
+    @classmethod
+    def collect_items(cls, pages, seen_hashes=None):
+        """按页码顺序清洗并去重原始行; seen_hashes 可跨多次调用共享"""
+        if seen_hashes is None:
+            seen_hashes = set()
+        all_data = []
+        for rows in pages:
+            for row in rows:
+                item = cls.clean_row(row)
+                if item is None:
+                    continue
+                item_id = cls.item_key(item)
+                if item_id in seen_hashes:
+                    continue
+                seen_hashes.add(item_id)
+                all_data.append(item)
         return all_data
 
+    def _pooled_session(self, pool_size):
+        """keep-alive 连接池, 大小与并发页数一致"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _fetch_page(self, session, query_json, page, page_size, interactive=True):
+        """拉取单页, 返回 (rows, total_size); 失败处理同 _request_page"""
+        form_data = {
+            "CXYH": "true",
+            "querySetting": query_json,
+            "*order": "+KKDWDM,+KCH,+KXH",
+            "pageSize": str(page_size),
+            "pageNumber": str(page)
+        }
+        res_json = self._request_page(session.post, form_data, page, timeout=30, interactive=interactive)
+        block = res_json.get("datas", {}).get("qxfbkccx", {})
+        return block.get("rows", []), block.get("totalSize", 0)
+
+    def fetch_catalog_pages(self, campus="1", semester="2025-2026-2", page_size=SYNC_PAGE_SIZE,
+                            concurrency=SYNC_CONCURRENCY, interactive=True):
+        """
+        整学期原始分页 (不带课程名/课程号条件): 连接池 + 有界并发分页 + 大页, 按页码顺序返回.
+        任意一页重试耗尽则抛出 FetchError, 不返回残缺目录.
+        interactive: False 时会话过期抛出 FetchError(SESSION), 不重新登录
+        """
+        query_json = json.dumps(self.build_query_setting(campus=campus, semester=semester))
+        print(f"[*] 开始同步: Campus={campus}, Semester={semester}, pageSize={page_size}, concurrency={concurrency}")
+
+        session = self._pooled_session(concurrency)
+        try:
+            rows, total_size = self._fetch_page(session, query_json, 1, page_size, interactive)
+            pages = [rows]
+            n_pages = max(1, math.ceil(total_size / page_size))
+            print(f"    -> 命中总数: {total_size} ({n_pages} pages)")
+            if n_pages > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    # map 保持页码顺序
+                    results = pool.map(lambda p: self._fetch_page(session, query_json, p, page_size, interactive)[0],
+                                       range(2, n_pages + 1))
+                    pages.extend(results)
+        finally:
+            session.close()
+        return pages
+
+    def _sync_report(self, pages, items, started):
+        raw_rows = sum(len(rows) for rows in pages)
+        seconds = time.perf_counter() - started
+        return {
+            'rows': raw_rows,
+            'items': len(items),
+            'pages': len(pages),
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(raw_rows / seconds, 1) if seconds > 0 else 0.0,
+            'limiter': self.limiter.snapshot(),
+        }
+
+    def sync_catalog(self, campus="1", semester="2025-2026-2", page_size=SYNC_PAGE_SIZE,
+                     concurrency=SYNC_CONCURRENCY, out_path=None):
+        """
+        整学期课程目录批量同步; 清洗与去重仍按页码顺序进行, 结果与 search() 的全量结果一致.
+        out_path: 可选, 按 dist/data 的格式写出 JSON
+        Returns: (items, report) report = {rows, items, pages, seconds, rows_per_sec, limiter}
+        """
+        started = time.perf_counter()
+        pages = self.fetch_catalog_pages(campus, semester, page_size, concurrency)
+        all_data = self.collect_items(pages)
+        report = self._sync_report(pages, all_data, started)
+        print(f"    -> 同步完成: {report}")
+
+        if out_path:
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(all_data, f, ensure_ascii=False, indent=2)
+        return all_data, report
+
+    def refresh_catalog(self, previous, campus="1", semester="2025-2026-2", page_size=SYNC_PAGE_SIZE,
+                        concurrency=SYNC_CONCURRENCY, interactive=True):
+        """
+        增量刷新: 重新下载原始分页, 但只重新解析指纹变化的行 (见 backend/catalog_diff.py).
+        previous: {section_id: (fingerprint, item)}, 如 CatalogStore.sections()
+        interactive: 见 fetch_catalog_pages; 后台刷新传 False
+        Returns: (items, records, changes, report); items 与 sync_catalog 的结果一致
+        """
+        started = time.perf_counter()
+        pages = self.fetch_catalog_pages(campus, semester, page_size, concurrency, interactive)
+        items, records, changes = diff_rows(pages, previous, self.clean_row, self.item_key)
+        report = self._sync_report(pages, items, started)
+        report.update(parsed=changes['parsed'], reused=changes['reused'], added=len(changes['added']),
+                      removed=len(changes['removed']), modified=len(changes['modified']))
+        print(f"    -> 增量刷新完成: {report}")
+        return items, records, changes, report
+
+class AsyncNJUCourseClient:
+    """
+    asyncio 版多查询并发检索 (如按培养方案导入一串课程号).
+    所有查询的分页请求共用一个连接池, 在线程池中执行 (requests 是同步库), 并发页数由信号量限制;
+    限速与重试沿用 NJUCourseClient._request_page.
+    """
+
+    def __init__(self, client, concurrency=SYNC_CONCURRENCY, page_size=SYNC_PAGE_SIZE):
+        self.client = client
+        self.concurrency = concurrency
+        self.page_size = page_size
+
+    async def search_many(self, queries):
+        """
+        queries: [{name, code, campus, semester, match_mode}, ...] (与 Api.search 参数相同)
+        Returns: {
+            'results': 每个查询各自的结果 (去重规则同 search),
+            'merged': 所有查询合并后的结果 (跨查询用同一个 seen_hashes 去重),
+            'timings': [{query, seconds, pages, rows, error}], 'seconds': 总耗时
+        }
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        session = self.client._pooled_session(self.concurrency)
+        gate = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(query_json, page):
+            async with gate:
+                return await loop.run_in_executor(
+                    executor, self.client._fetch_page, session, query_json, page, self.page_size)
+
+        async def run_query(query):
+            query_started = time.perf_counter()
+            query_json = json.dumps(self.client.build_query_setting(
+                query.get('name'), query.get('code'), query.get('campus', "1"),
+                query.get('semester', "2025-2026-1"), query.get('match_mode', "OR")))
+            pages = []
+            error = None
+            try:
+                rows, total_size = await fetch(query_json, 1)
+                pages.append(rows)
+                n_pages = math.ceil(total_size / self.page_size)
+                if n_pages > 1:
+                    # 等所有页都结束再报错: 失败页的兄弟请求不能在共用的连接池关闭后还在跑
+                    rest = await asyncio.gather(*(fetch(query_json, p) for p in range(2, n_pages + 1)),
+                                                return_exceptions=True)
+                    failed = next((r for r in rest if isinstance(r, BaseException)), None)
+                    if failed is not None:
+                        raise failed
+                    pages.extend(rows for rows, _ in rest)
+            except Exception as e:
+                # 任何错误只记在这个查询上, 不影响其他查询
+                print(f"[Error] Query {query} failed: {e}")
+                pages = []
+                error = str(e)
+            timing = {
+                'query': query,
+                'seconds': round(time.perf_counter() - query_started, 3),
+                'pages': len(pages),
+                'rows': sum(len(r) for r in pages),
+                'error': error,
+            }
+            return pages, timing
+
+        try:
+            outcomes = await asyncio.gather(*(run_query(q) for q in queries))
+        finally:
+            # 先等线程池里的请求都结束, 再关连接池
+            executor.shutdown(wait=True)
+            session.close()
+
+        seen_hashes = set()
+        results = []
+        merged = []
+        for pages, _ in outcomes:
+            results.append(self.client.collect_items(pages))
+            merged.extend(self.client.collect_items(pages, seen_hashes))
+        return {
+            'results': results,
+            'merged': merged,
+            'timings': [timing for _, timing in outcomes],
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+    def search_many_blocking(self, queries):
+        """同步调用入口 (pywebview 的 Api 方法运行在普通线程里)"""
+        return asyncio.run(self.search_many(queries))
+
 # ================= 主程序入口 =================
 if __name__ == "__main__":
     print("=== NJU Course Fetcher & Bitmapper ===")
+
+    # 批量同步模式: python jwFetcher.py --sync <campus> <semester>  -> dist/data/nju_courses_<campus>_<semester>.json
+    # 同时写出列式二进制目录 .ncat (mmap 加载, 见 backend/catalog_binary.py)
+    # 和 edge search 的索引分片 dist/data/index/ (见 build_search_shards.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "--sync":
+        # 构建脚本只在命令行同步时用到, 不进运行时依赖
+        from build_search_shards import build_shards, index_dir_for
+        sync_campus = sys.argv[2] if len(sys.argv) > 2 else "1"
+        sync_sem = sys.argv[3] if len(sys.argv) > 3 else "2025-2026-2"
+        out = f"dist/data/nju_courses_{sync_campus}_{sync_sem}.json"
+        items, _ = NJUCourseClient().sync_catalog(sync_campus, sync_sem, out_path=out)
+        write_catalog(items, binary_path(out))
+        build_shards(items, index_dir_for(out))
+        print(f"完整数据已保存至 '{out}' (二进制: '{binary_path(out)}')")
+        sys.exit(0)
+
+    # 增量刷新: python jwFetcher.py --refresh <campus> <semester>
+    # 旁路文件 build/catalog/<目录>.sections.json 记录每行的 [section_id, fingerprint],
+    # <目录>.changes.json 为最近一次变更集; 目录无变化时不重写 1.7MB 的 JSON
+    if len(sys.argv) > 1 and sys.argv[1] == "--refresh":
+        from build_search_shards import build_shards, index_dir_for
+        ref_campus = sys.argv[2] if len(sys.argv) > 2 else "1"
+        ref_sem = sys.argv[3] if len(sys.argv) > 3 else "2025-2026-2"
+        out = f"dist/data/nju_courses_{ref_campus}_{ref_sem}.json"
+        state = os.path.join(REFRESH_STATE_DIR, os.path.basename(out)[:-len(".json")])
+        sidecar = state + ".sections.json"
+        previous = {}
+        if os.path.exists(out) and os.path.exists(sidecar):
+            with open(out, "r", encoding="utf-8") as f:
+                old_items = json.load(f)
+            with open(sidecar, "r", encoding="utf-8") as f:
+                old_records = json.load(f)
+            previous = {sid: (fp, item) for item, (sid, fp) in zip(old_items, old_records)}
+        items, records, changes, report = NJUCourseClient().refresh_catalog(previous, ref_campus, ref_sem)
+        if has_changes(changes) or not previous:
+            os.makedirs(REFRESH_STATE_DIR, exist_ok=True)
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(items, f, ensure_ascii=False, indent=2)
+            with open(sidecar, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            write_catalog(items, binary_path(out))
+            build_shards(items, index_dir_for(out))
+            changes_path = state + ".changes.json"
+            with open(changes_path, "w", encoding="utf-8") as f:
+                json.dump(changes, f, ensure_ascii=False, indent=2)
+            print(f"目录已更新: {out}, 变更集: {changes_path}")
+        else:
+            print("目录无变化")
+        sys.exit(0)
     
     # 1. Init client (will auto-load cookie or prompt login)
     client = NJUCourseClient()
@@ -2,10 +2,29 @@ import webview
 import json
 import os
 import threading
-from jwFetcher import NJUCourseClient
+import time
+from jwFetcher import NJUCourseClient, AsyncNJUCourseClient
 from backend.session_manager import SessionManager
 from backend.solver import ScheduleSolver
 from backend.ranker import ScheduleRanker
+from backend.compiled_course import compile_course
+from backend.conflict_cache import ConflictCache
+from backend.job_manager import JobManager
+from backend.catalog_store import CatalogStore, CatalogRefresher, DEFAULT_DB_PATH
+from backend.search_cache import SearchCache
+from backend.catalog_diff import has_changes
+from backend.payload import compact_schedules
+from backend.feasible_cache import FeasibleCache
+from backend.diagnosis import DiagnosisAborted
+
+# dist/data 中打包的课程目录, 本地库为空时用来播种
+DIST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist', 'data')
+
+# 无解诊断的节点预算: 超出则不给出诊断, 不拖住生成结果
+DIAGNOSIS_MAX_NODES = 200000
+# 精确计数的预算: 超出时返回 total_found=None (未知)
+COUNT_MAX_NODES = 2000000
+COUNT_MAX_SECONDS = 3.0
 
 def send_toast_global(msg, type='info'):
     """Standalone callback for backend components to send toasts"""
@@ -21,12 +40,32 @@ def send_toast_global(msg, type='info'):
     except Exception as e:
         print(f"[Api] Failed to send toast: {e}")
 
+def push_generation_update(job_id, payload):
+    """Streams a generation job batch to the frontend (window.onGenerationUpdate)"""
+    if len(webview.windows) > 0:
+        webview.windows[0].evaluate_js(f"onGenerationUpdate({json.dumps(payload)})")
+
 class Api:
-    def __init__(self):
+    def __init__(self, catalog_path=DEFAULT_DB_PATH):
         # Pass standalone function to break circular reference Api -> Client -> Api.method
         # Use lazy_init=True so we don't block startup or try to toast before window exists
         self.client = NJUCourseClient(toast_callback=send_toast_global, lazy_init=True)
         self.session_manager = SessionManager()
+        # 候选对冲突结果跨多次生成复用, 只在目录数据变化时失效
+        self.conflict_cache = ConflictCache()
+        self.jobs = JobManager(emit=push_generation_update)
+        # 上一次选课篮子的全部可行组合: 只改偏好时直接重新评分选 top-K, 不再搜索
+        self.feasible_cache = FeasibleCache()
+        # 整学期课程目录的本地副本: 搜索优先走本地, 过期 (TTL) 后后台刷新
+        # 后台刷新不弹登录窗口: 会话过期时保留旧目录, 稍后重试
+        self.catalog = CatalogStore(catalog_path)
+        self.catalog_refresher = CatalogRefresher(
+            self.catalog,
+            fetch=lambda campus, semester, previous: self.client.refresh_catalog(
+                previous, campus, semester, interactive=False)[:3],
+            on_update=self._on_catalog_update)
+        # 相同参数的搜索: 并发时共用一次请求, 完成后在 LRU 中缓存一段时间
+        self.search_cache = SearchCache()
 
     def init_client(self):
         """Called from frontend on mount to verify session"""
@@ -41,52 +80,199 @@ class Api:
 
     def search(self, params):
         """
-        params: dict {name, code, campus}
+        params: dict {name, code, campus, semester, match_mode}
+        Served from the local catalog when it holds this campus/semester (a stale
+        copy is still returned and refreshed in the background); otherwise crawled.
+        Identical searches are coalesced while in flight and cached (see SearchCache).
         """
         print(f"[Api] Search: {params}")
+        campus = params.get('campus', '1')
+        semester = params.get('semester', '2025-2026-2')
+        match_mode = params.get('match_mode', 'OR')
+        key = SearchCache.key(params.get('name'), params.get('code'), campus, semester, match_mode)
+        results = self.search_cache.get_or_fetch(
+            key, lambda: self._search_uncached(params, campus, semester, match_mode))
+        print(f"[Api] Search cache: {self.search_cache.stats()}")
+        return results
+
+    def _search_uncached(self, params, campus, semester, match_mode):
+        local = self._search_catalog(params.get('name'), params.get('code'), campus, semester, match_mode)
+        if local is not None:
+            print(f"[Api] Local catalog hit: {len(local)} rows")
+            return local
+
         # Map params to client args
         # search(self, course_name=None, course_code=None, campus="1", semester="2025-2026-1")
-        # Default semester hardcoded in client, could expose later
         try:
             results = self.client.search(
                 course_name=params.get('name'),
                 course_code=params.get('code'),
-                campus=params.get('campus', '1'),
-                semester=params.get('semester', '2025-2026-2'),
-                match_mode=params.get('match_mode', 'OR')
+                campus=campus,
+                semester=semester,
+                match_mode=match_mode
             )
+            # Fresh catalog rows: drop cached conflicts of candidates whose bitmap changed
+            self.conflict_cache.refresh(results)
             return results
         except Exception as e:
             print(f"[Api] Search Error: {e}")
             raise e
 
-    def generate_schedules(self, groups, preferences):
+    def search_many(self, params_list):
         """
-        groups: List of group objects
-        preferences: dict
+        Batch search (e.g. training-plan import), one result list per params dict.
+        Queries the local catalog can answer are served locally; the rest are fanned
+        out concurrently by AsyncNJUCourseClient over one connection pool.
+        Returns {'results': [[...], ...], 'timings': [...], 'seconds'}
         """
-        print("[Api] Generating Schedules...")
+        print(f"[Api] Batch search: {len(params_list)} queries")
+        results = [None] * len(params_list)
+        remote = []
+        for idx, params in enumerate(params_list):
+            local = self._search_catalog(
+                params.get('name'), params.get('code'), params.get('campus', '1'),
+                params.get('semester', '2025-2026-2'), params.get('match_mode', 'OR'))
+            if local is not None:
+                results[idx] = local
+            else:
+                remote.append(idx)
 
-        # 1. Check Conflicts
-        conflicts = ScheduleSolver.check_conflicts(groups)
-        if conflicts:
-            conflict_msg = []
-            for item in conflicts:
-                # item is (i, j, reason)
-                i, j = item[0], item[1]
-                reason = item[2] if len(item) > 2 else "Unknown"
-
-                name1 = groups[i]['candidates'][0]['name'] if groups[i]['candidates'] else f"Group {i+1}"
-                name2 = groups[j]['candidates'][0]['name'] if groups[j]['candidates'] else f"Group {j+1}"
-                conflict_msg.append(f"{name1} 与 {name2} 冲突 ({reason})")
-            return {'error': " | ".join(conflict_msg)}
+        timings = []
+        seconds = 0.0
+        if remote:
+            queries = [dict(params_list[idx], campus=params_list[idx].get('campus', '1'),
+                            semester=params_list[idx].get('semester', '2025-2026-2')) for idx in remote]
+            fetched = AsyncNJUCourseClient(self.client).search_many_blocking(queries)
+            for idx, items in zip(remote, fetched['results']):
+                results[idx] = items
+            self.conflict_cache.refresh(fetched['merged'])
+            timings = fetched['timings']
+            seconds = fetched['seconds']
+            print(f"[Api] Batch search: {len(remote)} remote queries in {seconds}s")
+        return {'results': results, 'timings': timings, 'seconds': seconds}
 
-        # 2. Generate
-        # Pass preferences to solver for DFS pruning/ordering
-        raw_schedules, total_count = ScheduleSolver.generate_schedules(groups, preferences=preferences)
-        print(f"[Api] Found {len(raw_schedules)} top schedules (from {total_count} total explored)")
+    def _search_catalog(self, name, code, campus, semester, match_mode):
+        """Local catalog search, or None when this campus/semester isn't stored (or has no rows)."""
+        try:
+            if not self._ensure_catalog(campus, semester):
+                return None
+            return self.catalog.search(campus, semester, name, code, match_mode)
+        except Exception as e:
+            print(f"[Api] Local catalog unavailable: {e}")
+            return None
 
-        # 3. Rank and Enrich
+    def _ensure_catalog(self, campus, semester):
+        """
+        Makes sure the catalog is stored (seeding from dist/data); refreshes it in the background when stale.
+        False when there is no usable local copy: nothing to seed from, or a catalog with no rows
+        (an empty dump is a failed crawl, not an empty semester), so callers go to the network.
+        Seeds count as never fetched, so their first use starts a refresh.
+        """
+        info = self.catalog.info(campus, semester)
+        if info is None:
+            seed = os.path.join(DIST_DATA_DIR, f"nju_courses_{campus}_{semester}")
+            if os.path.exists(seed + ".ncat"):
+                seeded = self.catalog.import_binary(campus, semester, seed + ".ncat")
+            elif os.path.exists(seed + ".json"):
+                seeded = self.catalog.import_json(campus, semester, seed + ".json")
+            else:
+                return False
+            if not seeded:
+                return False
+            info = self.catalog.info(campus, semester)
+        if not info['row_count']:
+            return False
+        if info['stale']:
+            self.catalog_refresher.refresh_async(campus, semester)
+        return True
+
+    def find_fitting_courses(self, params):
+        """
+        "What fits my timetable": every catalog section that doesn't clash with the given courses.
+        params: {campus, semester, courses: [course dicts of the built schedule],
+                 schools: [...], min_credit, max_credit, preferences, max_penalty}
+        Returns: {'results': [item], 'penalties': [score drop per item or None], 'ms'}
+        Raises when the catalog of this campus/semester isn't available locally.
+        """
+        started = time.perf_counter()
+        campus = params.get('campus', '1')
+        semester = params.get('semester', '2025-2026-2')
+        if not self._ensure_catalog(campus, semester):
+            raise Exception(f"本地没有 {campus}/{semester} 的课程目录")
+        index = self.catalog.index(campus, semester)
+        taken = {(c.get('code'), c.get('location_text')) for c in params.get('courses', [])}
+        fits = index.fitting(params.get('courses', []),
+                             schools=params.get('schools'),
+                             min_credit=params.get('min_credit'),
+                             max_credit=params.get('max_credit'),
+                             preferences=params.get('preferences'),
+                             max_penalty=params.get('max_penalty'))
+        results = []
+        penalties = []
+        for row, penalty in fits:
+            item = index.items[row]
+            # 课表里已有的教学班本身也"不冲突" (时间为空的课), 不再重复推荐
+            if (item.get('code'), item.get('location_text')) in taken:
+                continue
+            results.append(item)
+            penalties.append(penalty)
+        ms = round((time.perf_counter() - started) * 1000, 2)
+        print(f"[Api] Free-slot query: {len(results)} sections fit ({ms} ms)")
+        return {'results': results, 'penalties': penalties, 'ms': ms}
+
+    def _on_catalog_update(self, campus, semester, items, changes):
+        self.conflict_cache.refresh(items)
+        self.search_cache.invalidate(campus, semester)
+        if has_changes(changes):
+            print(f"[Api] Catalog {campus}/{semester} changed: +{len(changes['added'])} "
+                  f"-{len(changes['removed'])} ~{len(changes['modified'])}")
+            flagged = self.session_manager.flag_catalog_changes(changes)
+            if flagged:
+                send_toast_global(f"课程目录已更新: 已保存会话中有 {sum(flagged.values())} 个教学班发生变化", "info")
+
+    def search_cache_stats(self):
+        """Frontend/debug hook: search cache hit / miss counters."""
+        return self.search_cache.stats()
+
+    def refresh_catalog(self, campus='1', semester='2025-2026-2'):
+        """Frontend hook: re-download a catalog in the background regardless of its age (or an earlier failure)."""
+        return self.catalog_refresher.refresh_async(campus, semester, force=True)
+
+    def _conflict_error(self, groups):
+        """Definite conflicts between groups as one message, or None."""
+        conflicts = ScheduleSolver.check_conflicts(groups, cache=self.conflict_cache)
+        print(f"[Api] Conflict cache: {self.conflict_cache.stats()}")
+        if not conflicts:
+            return None
+        conflict_msg = []
+        for item in conflicts:
+            # item is (i, j, reason)
+            i, j = item[0], item[1]
+            reason = item[2] if len(item) > 2 else "Unknown"
+
+            name1 = groups[i]['candidates'][0]['name'] if groups[i]['candidates'] else f"Group {i+1}"
+            name2 = groups[j]['candidates'][0]['name'] if groups[j]['candidates'] else f"Group {j+1}"
+            conflict_msg.append(f"{name1} 与 {name2} 冲突 ({reason})")
+        return " | ".join(conflict_msg)
+
+    def _diagnose(self, groups, stop=None):
+        """
+        Minimal infeasible set of groups for an empty result (ScheduleSolver.diagnose_infeasible),
+        or None when there is none or the node budget / stop() ended the diagnosis first.
+        """
+        stats = {}
+        try:
+            diagnosis = ScheduleSolver.diagnose_infeasible(groups, stats=stats, max_nodes=DIAGNOSIS_MAX_NODES,
+                                                           stop=stop)
+        except DiagnosisAborted as e:
+            print(f"[Api] Diagnosis skipped: {e} (stats {stats})")
+            return None
+        if diagnosis:
+            print(f"[Api] Infeasible core: {diagnosis['message']} (stats {stats})")
+        return diagnosis
+
+    def _rank_and_enrich(self, raw_schedules, preferences):
+        """Scores each schedule and attaches credit / hour / week-span stats, best first."""
         ranker = ScheduleRanker()
         ranked = []
         for s in raw_schedules:
@@ -116,17 +302,8 @@ class Api:
                         if sess['weeks']:
                             course_weeks.update(sess['weeks'])
                 else:
-                    # Fallback: scan schedule_bitmaps
-                    # index 1..len
-                    bitmaps = course.get('schedule_bitmaps', [])
-                    for w_idx in range(1, len(bitmaps)):
-                        val = bitmaps[w_idx]
-                        if isinstance(val, str):
-                            try:
-                                val = int(val)
-                            except: val = 0
-                        if val > 0:
-                            course_weeks.add(w_idx)
+                    # Fallback: active weeks of the compiled bitmap record
+                    course_weeks.update(compile_course(course).weeks())
 
                 # Update global stats
                 if course_weeks:
@@ -145,14 +322,8 @@ class Api:
                             w_len = len(sess['weeks'])
                             total_hours += (p_len * w_len)
                     else:
-                        # Fallback: Count bits in bitmaps for active weeks
-                        bitmaps = course.get('schedule_bitmaps', [])
-                        for w in course_weeks:
-                            if w < len(bitmaps):
-                                val = bitmaps[w]
-                                if isinstance(val, str):
-                                    val = int(val)
-                                total_hours += bin(val).count('1')
+                        # Fallback: Count bits in bitmaps (course_weeks came from the same record)
+                        total_hours += compile_course(course).popcount()
 
             avg_weekly = 0.0
             if has_classes and max_week >= min_week:
@@ -174,8 +345,112 @@ class Api:
 
         # Sort desc
         ranked.sort(key=lambda x: x['score'], reverse=True)
+        return ranked
+
+
+    def generate_schedules(self, groups, preferences, compact=False):
+        """
+        groups: List of group objects
+        preferences: dict
+        compact: return the id-referenced payload of backend/payload.py instead of full course dicts
+        """
+        print("[Api] Generating Schedules...")
+
+        # 1. Check Conflicts
+        error = self._conflict_error(groups)
+        if error:
+            return {'error': error}
+
+        # 2. Generate
+        # Pass preferences to solver for DFS pruning/ordering
+        search_stats = {}
+        raw_schedules, total_count = ScheduleSolver.generate_schedules(
+            groups, preferences=preferences, workers='auto', stats=search_stats,
+            feasible_cache=self.feasible_cache)
+        print(f"[Api] Found {len(raw_schedules)} top schedules (from {total_count} total explored)")
+        print(f"[Api] Search stats: {search_stats}")
+
+        # 3. Rank and Enrich
+        ranked = self._rank_and_enrich(raw_schedules, preferences)
+        extra = {'total_found': total_count}
+        if not raw_schedules:
+            diagnosis = self._diagnose(groups)
+            if diagnosis:
+                extra['infeasible'] = diagnosis
+        if compact:
+            return dict(compact_schedules(ranked), **extra)
+        return dict(extra, schedules=ranked)
+
+    def start_generation(self, groups, preferences, deadline_ms=None):
+        """
+        Job-based generate_schedules: returns {'job_id'} at once and streams
+        {job_id, state, done, schedules, total_found, stats, elapsed_ms} batches to
+        window.onGenerationUpdate. The final batch (done=True) holds the best results
+        found before completion, cancel_generation() or the deadline.
+        Batches use the compact payload (candidates / alternative_sets tables, schedules
+        referring to them by index), see backend/payload.py.
+        """
+        print("[Api] Starting generation job...")
+        error = self._conflict_error(groups)
+        if error:
+            return {'error': error}
+
+        # 新的生成请求让旧任务作废
+        self.jobs.cancel_all()
 
-        return {'schedules': ranked, 'total_found': total_count}
+        def run(job):
+            search_stats = {}
+
+            def on_progress(partial):
+                if job.due():
+                    job.publish(dict(compact_schedules(self._rank_and_enrich(partial.schedules(), preferences)),
+                                     total_found=partial.found, stats=partial.stats))
+                return job.should_stop()
+
+            raw_schedules, total_count = ScheduleSolver.generate_schedules(
+                groups, preferences=preferences, stats=search_stats, progress=on_progress,
+                feasible_cache=self.feasible_cache)
+            # 只有搜索真的被截断才算超时; 刚好在截止时间后跑完的任务仍是 done
+            job.truncated = bool(search_stats.get('stopped'))
+            print(f"[Api] Job {job.id}: {len(raw_schedules)} top schedules from {total_count} "
+                  f"in {job.elapsed():.2f}s, stats {search_stats}")
+            result = dict(compact_schedules(self._rank_and_enrich(raw_schedules, preferences)),
+                          total_found=total_count, stats=search_stats)
+            if not raw_schedules and not job.truncated and not job.cancelled:
+                # 搜索完整结束却没有方案: 给出互相冲突的最小课程组合 (同样受取消 / 截止时间约束)
+                diagnosis = self._diagnose(groups, stop=job.should_stop)
+                if diagnosis:
+                    result['infeasible'] = diagnosis
+            return result
+
+        deadline = deadline_ms / 1000.0 if deadline_ms else None
+        return {'job_id': self.jobs.start(run, deadline=deadline)}
+
+    def cancel_generation(self, job_id):
+        return self.jobs.cancel(job_id)
+
+    def count_schedules(self, groups, with_alternatives=False):
+        """
+        Count-only mode: exact number of valid schedules without generating them
+        (a pruned search only reports the leaves it visited as total_found).
+        Returns {total_found, ms}, plus total_sections with with_alternatives
+        (every same-time alternative section counted separately). A count that
+        outgrows COUNT_MAX_NODES / COUNT_MAX_SECONDS is None (unknown).
+        """
+        error = self._conflict_error(groups)
+        if error:
+            return {'error': error}
+        started = time.perf_counter()
+        stats = {}
+        budget = {'max_nodes': COUNT_MAX_NODES, 'max_seconds': COUNT_MAX_SECONDS}
+        res = {'total_found': ScheduleSolver.count_schedules(groups, stats=stats, **budget)}
+        if with_alternatives:
+            res['total_sections'] = (None if res['total_found'] is None else
+                                     ScheduleSolver.count_schedules(groups, with_alternatives=True, stats=stats,
+                                                                    **budget))
+        res['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        print(f"[Api] Count: {res} stats {stats}")
+        return res
 
     def save_image_dialog(self, base64_data):
         import base64
@@ -22,9 +22,12 @@ createApp({
 
         const schedules = ref([]);
         const totalCount = ref(0);
+        const totalExact = ref(false); // false: total_found counts the combinations the search explored
         const currentScheduleIdx = ref(0);
         const currentWeek = ref(1);
         const toastRef = ref(null);
+        const generationJob = ref(null); // id of the running generation job
+        const GENERATION_DEADLINE_MS = 15000;
 
         // Import Modal State
         const showImportModal = ref(false);
@@ -174,17 +177,35 @@ createApp({
             let successCount = 0;
             let failCount = 0;
 
+            const queries = validCodes.map(code => ({
+                code: code,
+                semester: importParams.semester,
+                campus: importParams.campus,
+                match_mode: 'OR' // irrelevant for code search usually
+            }));
+
+            // One concurrent batch on the backend; per-code fallback for the mock
+            let batchResults = null;
+            if (window.pywebview) {
+                try {
+                    importStatus.value = `正在并发获取 ${validCodes.length} 个课程...`;
+                    batchResults = (await window.pywebview.api.search_many(queries)).results;
+                } catch (e) {
+                    console.error("Batch import error", e);
+                }
+            }
+
             for (let i = 0; i < validCodes.length; i++) {
                 const code = validCodes[i];
-                importStatus.value = `[${i+1}/${validCodes.length}] 正在搜索 ${code}...`;
 
                 try {
-                    const res = await fetchCourses({
-                        code: code,
-                        semester: importParams.semester,
-                        campus: importParams.campus,
-                        match_mode: 'OR' // irrelevant for code search usually
-                    });
+                    let res;
+                    if (batchResults) {
+                        res = batchResults[i];
+                    } else {
+                        importStatus.value = `[${i+1}/${validCodes.length}] 正在搜索 ${code}...`;
+                        res = await fetchCourses(queries[i]);
+                    }
 
                     if (res && res.length > 0) {
                         // Create Group
@@ -245,24 +266,124 @@ createApp({
 
         const removeGroup = (idx) => groups.value.splice(idx, 1);
 
+        // Compact result payload (backend/payload.py): schedules refer to a candidate table by index.
+        // The tables stay outside Vue's reactivity; a schedule's course dicts are built when first shown.
+        let resultTables = null;
+        let expandedCourses = new Map(); // schedule index -> expanded courses
+
+        const setSchedules = (update) => {
+            resultTables = update.format === 'compact'
+                ? { candidates: update.candidates, alternativeSets: update.alternative_sets }
+                : null;
+            expandedCourses = new Map();
+            schedules.value = update.schedules;
+        };
+
+        const scheduleCourses = (schIdx) => {
+            const sch = schedules.value[schIdx];
+            if (!sch) return [];
+            if (!resultTables) return sch.courses;
+            let courses = expandedCourses.get(schIdx);
+            if (!courses) {
+                const { candidates, alternativeSets } = resultTables;
+                courses = sch.courses.map(([candIdx, altIdx]) => {
+                    const course = { ...candidates[candIdx] };
+                    if (altIdx >= 0) course.alternatives = alternativeSets[altIdx].map(i => candidates[i]);
+                    return course;
+                });
+                expandedCourses.set(schIdx, courses);
+            }
+            return courses;
+        };
+
+        // Streamed batches from Api.start_generation (pushed via evaluate_js)
+        let earlyUpdates = null; // batches that beat start_generation's reply
+        const onGenerationUpdate = (update) => {
+            if (earlyUpdates && generationJob.value === null) {
+                earlyUpdates.push(update);
+                return;
+            }
+            if (update.job_id !== generationJob.value) return; // stale job
+            if (update.error) {
+                showToast("生成失败: " + update.error, 'error');
+            } else if (update.schedules && (update.schedules.length > 0 || update.done)) {
+                setSchedules(update);
+                if (currentView.value !== 'results' && update.schedules.length > 0) {
+                    currentView.value = 'results';
+                    currentScheduleIdx.value = 0;
+                }
+                if (currentScheduleIdx.value >= update.schedules.length) currentScheduleIdx.value = 0;
+            }
+            if (update.total_found !== undefined) {
+                totalCount.value = update.total_found;
+                totalExact.value = false;
+            }
+            if (update.done) {
+                generationJob.value = null;
+                loading.value = false;
+                if (update.infeasible) {
+                    showToast("没有可行方案: " + update.infeasible.message, 'error');
+                } else if (update.state === 'done') {
+                    refreshExactCount(update.job_id);
+                    showToast(`成功生成 ${schedules.value.length} 个方案`, 'success');
+                } else if (update.state === 'timeout') {
+                    // 超时的篮子计数多半也很慢, 保留已搜索的数量
+                    showToast(`搜索超时, 显示目前最优的 ${schedules.value.length} 个方案`, 'info');
+                }
+            }
+        };
+        window.onGenerationUpdate = onGenerationUpdate;
+
+        // 剪枝搜索的 total_found 只是访问到的方案数, 结束后用计数 DP 取精确总数
+        // (计数有预算, 超出时 total_found 为 null, 保留已搜索的数量)
+        let countedJob = null;
+        const refreshExactCount = async (jobId) => {
+            if (!window.pywebview) return;
+            countedJob = jobId;
+            try {
+                const res = await window.pywebview.api.count_schedules(JSON.parse(JSON.stringify(groups.value)));
+                if (countedJob === jobId && !res.error && res.total_found !== null) {
+                    totalCount.value = res.total_found;
+                    totalExact.value = true;
+                }
+            } catch (e) {
+                console.error("count_schedules failed", e);
+            }
+        };
+
+        const cancelGeneration = async () => {
+            const jobId = generationJob.value;
+            if (!jobId || !window.pywebview) return;
+            generationJob.value = null;
+            loading.value = false;
+            await window.pywebview.api.cancel_generation(jobId);
+            showToast("已停止搜索", 'info');
+        };
+
         const generateSchedules = async () => {
             if (groups.value.length === 0) return showToast("没有课程组", 'error');
             loading.value = true;
             try {
                 if (window.pywebview) {
                     const cleanGroups = JSON.parse(JSON.stringify(groups.value));
-                    const res = await window.pywebview.api.generate_schedules(cleanGroups, preferences);
+                    generationJob.value = null;
+                    countedJob = null;
+                    earlyUpdates = [];
+                    const res = await window.pywebview.api.start_generation(cleanGroups, preferences, GENERATION_DEADLINE_MS);
+                    const buffered = earlyUpdates;
+                    earlyUpdates = null;
                     if (res.error) {
                         showToast("错误: " + res.error, 'error');
                     } else {
-                        schedules.value = res.schedules;
-                        totalCount.value = res.total_found;
-                        currentView.value = 'results';
-                        currentScheduleIdx.value = 0;
-                        showToast(`成功生成 ${res.schedules.length} 个方案`, 'success');
+                        // Results arrive through onGenerationUpdate
+                        generationJob.value = res.job_id;
+                        totalCount.value = 0;
+                        buffered.forEach(onGenerationUpdate);
                     }
                 } else {
                     // Mock
+                    resultTables = null;
+                    expandedCourses = new Map();
                     schedules.value = [
                         {
                             score: 95,
@@ -277,18 +398,21 @@ createApp({
                         }
                     ];
                     totalCount.value = 1;
+                    totalExact.value = true;
                     currentView.value = 'results';
                 }
             } catch (e) {
                 showToast("生成失败: " + e, 'error');
             } finally {
-                loading.value = false;
+                earlyUpdates = null;
+                // 任务在跑时由 onGenerationUpdate 的 done 批次 (或 cancelGeneration) 清掉 loading
+                if (!generationJob.value) loading.value = false;
             }
         };
 
         const getCell = (schIdx, week, day, node) => {
             if (!schedules.value[schIdx]) return null;
-            const courses = schedules.value[schIdx].courses;
+            const courses = scheduleCourses(schIdx);
             const bitPos = BigInt(day * 13 + node);
             const mask = 1n << bitPos;
 
@@ -350,6 +474,29 @@ createApp({
             return null;
         };
 
+        // "What fits my timetable": sections of the catalog that don't clash with the current plan
+        const findFittingCourses = async () => {
+            const sch = schedules.value[currentScheduleIdx.value];
+            if (!sch || !window.pywebview) return;
+            loading.value = true;
+            try {
+                const res = await window.pywebview.api.find_fitting_courses({
+                    campus: searchParams.campus,
+                    semester: searchParams.semester,
+                    courses: scheduleCourses(currentScheduleIdx.value)
+                });
+                searchResults.value = res.results.map(c => ({ ...c, checked: false }));
+                hasSearched.value = true;
+                filterText.value = '';
+                currentView.value = 'search';
+                showToast(`方案 ${currentScheduleIdx.value + 1} 的空闲时段可插入 ${res.results.length} 个教学班 (${res.ms} ms)`, 'success');
+            } catch (e) {
+                showToast("查询失败: " + e, 'error');
+            } finally {
+                loading.value = false;
+            }
+        };
+
         const downloadImage = () => {
             const el = document.getElementById('capture-area');
             if(window.html2canvas) {
@@ -391,7 +538,7 @@ createApp({
         const newSession = () => {
             if(confirm("确定清空当前进度？")) {
                 groups.value = [];
-                schedules.value = [];
+                setSchedules({ schedules: [] });
                 currentView.value = 'search';
                 searchResults.value = [];
                 hasSearched.value = false;
@@ -478,10 +625,10 @@ createApp({
 
         return {
             currentView, loading, searchParams, searchResults,
-            groups, preferences, schedules, totalCount, currentScheduleIdx, currentWeek,
+            groups, preferences, schedules, totalCount, totalExact, currentScheduleIdx, currentWeek,
             filterText, hasSearched, filteredSearchResults,
             doSearch, createGroup, getGroupName, getActiveCount, removeGroup,
-            generateSchedules, getCell, downloadImage, saveSession, newSession, toastRef,
+            generateSchedules, cancelGeneration, generationJob, getCell, downloadImage, findFittingCourses, saveSession, newSession, toastRef,
             toggleSelectAll, toggleAllDays, invertDays,
             showImportModal, importText, isImporting, importStatus, importParams,
             openImportModal, closeImportModal, startBatchImport,
@@ -1,13 +1,27 @@
+import json
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from main import Api
+from backend.solver import ScheduleSolver
+from backend.catalog_store import CatalogStore
+from backend.payload import expand_schedules
 
 class TestApiFlow(unittest.TestCase):
     def setUp(self):
         # Mock the NJUCourseClient to avoid network calls and GUI
+        # Local catalog in a temp dir, never the real one next to main.py
+        self.tmp = tempfile.mkdtemp()
         with patch('main.NJUCourseClient') as MockClient:
             self.mock_client_instance = MockClient.return_value
-            self.api = Api()
+            self.api = Api(catalog_path=os.path.join(self.tmp, 'catalog.sqlite3'))
+
+    def tearDown(self):
+        self.api.catalog.close()
+        shutil.rmtree(self.tmp)
 
     def test_search_flow(self):
         # Setup mock return
@@ -27,6 +41,60 @@ class TestApiFlow(unittest.TestCase):
             match_mode='OR'
         )
 
+    def test_search_is_cached(self):
+        self.mock_client_instance.search.return_value = [{'name': 'Math', 'code': '001'}]
+        params = {'name': 'Math', 'semester': '2025-2026-1'}
+        self.api.search(params)
+        self.api.search(dict(params))
+        self.assertEqual(self.mock_client_instance.search.call_count, 1)
+        self.assertEqual(self.api.search_cache_stats()['hits'], 1)
+
+    def test_seeded_catalogs(self):
+        seeds = os.path.join(self.tmp, 'data')
+        os.makedirs(seeds)
+        row = {'name': 'Math', 'code': '001', 'schedule_bitmaps': ['0', '3'], 'sessions': []}
+        for campus, items in (('1', [row]), ('2', [])):
+            with open(os.path.join(seeds, f'nju_courses_{campus}_2099-2100-1.json'), 'w', encoding='utf-8') as f:
+                json.dump(items, f)
+        self.mock_client_instance.search.return_value = [dict(row, name='Remote Math')]
+        self.api.catalog_refresher.refresh_async = MagicMock()
+
+        with patch('main.DIST_DATA_DIR', seeds):
+            local = self.api.search({'name': 'Math', 'campus': '1', 'semester': '2099-2100-1'})
+            # An empty dump is no catalog: go to the server instead of answering []
+            remote = self.api.search({'name': 'Math', 'campus': '2', 'semester': '2099-2100-1'})
+        self.assertEqual(local, [row])
+        self.assertEqual(remote, [dict(row, name='Remote Math')])
+        self.assertEqual(self.mock_client_instance.search.call_count, 1)
+        self.assertIsNone(self.api.catalog.info('2', '2099-2100-1'))
+        # A seed's mtime isn't its crawl time: it is stale at once and refreshed on first use
+        self.assertTrue(self.api.catalog.info('1', '2099-2100-1')['stale'])
+        self.api.catalog_refresher.refresh_async.assert_called_once_with('1', '2099-2100-1')
+
+        # A catalog stored with no rows is skipped as well
+        self.api.catalog.replace_catalog('3', '2099-2100-1', [])
+        self.api.search({'name': 'Math', 'campus': '3', 'semester': '2099-2100-1'})
+        self.assertEqual(self.mock_client_instance.search.call_count, 2)
+
+    def test_find_fitting_courses(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            self.api.catalog = CatalogStore(os.path.join(tmp, 'catalog.sqlite3'), ttl=float('inf'))
+            a = {'name': 'A', 'code': 'A1', 'credit': 2.0, 'location_text': 'a', 'school': 'X',
+                 'schedule_bitmaps': ['0', '3'], 'sessions': []}
+            b = dict(a, name='B', code='B1', location_text='b', schedule_bitmaps=['0', '6'])
+            c = dict(a, name='C', code='C1', location_text='c', schedule_bitmaps=['0', '12'])
+            self.api.catalog.replace_catalog('1', '2099-2100-1', [a, b, c])
+            res = self.api.find_fitting_courses({'semester': '2099-2100-1', 'courses': [a]})
+            # A is the plan itself, B shares a node with it
+            self.assertEqual([r['name'] for r in res['results']], ['C'])
+            self.assertEqual(res['penalties'], [None])
+            with self.assertRaises(Exception):
+                self.api.find_fitting_courses({'semester': '1999-2000-1', 'courses': [a]})
+        finally:
+            self.api.catalog.close()
+            shutil.rmtree(tmp)
+
     def test_generate_flow(self):
         # Dummy groups
         groups = [{
@@ -42,6 +110,123 @@ class TestApiFlow(unittest.TestCase):
         self.assertEqual(len(res['schedules']), 1)
         self.assertEqual(res['schedules'][0]['score'], 100.0) # No conflicts, no prefs
 
+    def test_compact_payload(self):
+        groups = [
+            {'id': 1, 'candidates': [
+                {'name': 'A', 'teacher': 'x', 'schedule_bitmaps': ['0', '3'], 'selected': True},
+                {'name': 'A', 'teacher': 'y', 'schedule_bitmaps': ['0', '3'], 'selected': True},
+                {'name': 'A', 'teacher': 'z', 'schedule_bitmaps': ['0', '48'], 'selected': True}]},
+            {'id': 2, 'candidates': [
+                {'name': 'B', 'schedule_bitmaps': ['0', '12'], 'selected': True},
+                {'name': 'B', 'schedule_bitmaps': ['0', '768'], 'selected': True}]},
+        ]
+        full = self.api.generate_schedules(groups, {})
+        compact = self.api.generate_schedules(groups, {}, compact=True)
+        self.assertEqual(compact['format'], 'compact')
+        self.assertEqual(compact['total_found'], full['total_found'])
+        self.assertEqual(expand_schedules(compact), full['schedules'])
+        # Every section is sent once, the A x/y time cluster is one shared alternative set
+        self.assertEqual(len(compact['candidates']), 5)
+        self.assertEqual(len(compact['alternative_sets']), 4)
+        self.assertTrue(all('alternatives' not in c for c in compact['candidates']))
+
+    def test_count_schedules(self):
+        groups = [
+            {'id': 1, 'candidates': [
+                {'name': 'A', 'teacher': 'x', 'schedule_bitmaps': ['0', '3'], 'selected': True},
+                {'name': 'A', 'teacher': 'y', 'schedule_bitmaps': ['0', '3'], 'selected': True},
+                {'name': 'A', 'teacher': 'z', 'schedule_bitmaps': ['0', '48'], 'selected': True}]},
+            {'id': 2, 'candidates': [
+                {'name': 'B', 'schedule_bitmaps': ['0', '12'], 'selected': True},
+                {'name': 'B', 'schedule_bitmaps': ['0', '16'], 'selected': True}]},
+        ]
+        res = self.api.count_schedules(groups, with_alternatives=True)
+        # A(x|y) with either B, A(z) only with the B at node 2-3
+        self.assertEqual(res['total_found'], 3)
+        self.assertEqual(res['total_sections'], 5)
+        self.assertNotIn('total_sections', self.api.count_schedules(groups))
+        self.assertEqual(self.api.generate_schedules(groups, {})['total_found'], 3)
+        # Past the counting budget the total is unknown
+        clashing = [{'id': i, 'candidates': [
+            {'name': n, 'teacher': 'x', 'schedule_bitmaps': ['0', '1'], 'selected': True},
+            {'name': n, 'teacher': 'y', 'schedule_bitmaps': ['0', '2'], 'selected': True}]}
+            for i, n in enumerate('ABC')]
+        with patch('main.COUNT_MAX_NODES', 1):
+            res = self.api.count_schedules(clashing, with_alternatives=True)
+        self.assertIsNone(res['total_found'])
+        self.assertIsNone(res['total_sections'])
+
+    def test_infeasible_basket_is_diagnosed(self):
+        # Any two of A/B/C fit into Monday nodes 1-2, all three can't
+        groups = [{'id': i, 'candidates': [
+            {'name': n, 'teacher': 'x', 'schedule_bitmaps': ['0', '1'], 'selected': True},
+            {'name': n, 'teacher': 'y', 'schedule_bitmaps': ['0', '2'], 'selected': True}]}
+            for i, n in enumerate('ABC')]
+        res = self.api.generate_schedules(groups, {})
+        self.assertEqual(res['schedules'], [])
+        self.assertEqual(res['infeasible']['names'], ['A', 'B', 'C'])
+        self.assertEqual(res['infeasible']['slots'], ["Week 1 Day 1 Node 1", "Week 1 Day 1 Node 2"])
+        self.assertNotIn('infeasible', self.api.generate_schedules(groups[:2], {}))
+        # Out of diagnosis budget: still no schedules, but no (partial) diagnosis either
+        with patch('main.DIAGNOSIS_MAX_NODES', 1):
+            res = self.api.generate_schedules(groups, {})
+        self.assertEqual(res['schedules'], [])
+        self.assertNotIn('infeasible', res)
+
+    def test_generation_job_flow(self):
+        groups = [{
+            'id': 1,
+            'candidates': [{'name': 'A', 'schedule_bitmaps': [0, 3], 'selected': True}],
+        }]
+        updates = []
+        self.api.jobs.emit = lambda job_id, payload: updates.append(payload)
+
+        res = self.api.start_generation(groups, {})
+        self.assertIn('job_id', res)
+        for _ in range(500):
+            if updates and updates[-1]['done']:
+                break
+            time.sleep(0.01)
+        final = updates[-1]
+        self.assertTrue(final['done'])
+        self.assertEqual(final['state'], 'done')
+        self.assertEqual(final['job_id'], res['job_id'])
+        self.assertEqual(len(final['schedules']), 1)
+        self.assertEqual(expand_schedules(final)[0]['courses'][0]['name'], 'A')
+
+    def run_job(self, groups, deadline_ms):
+        updates = []
+        self.api.jobs.emit = lambda job_id, payload: updates.append(payload)
+        self.api.start_generation(groups, {}, deadline_ms=deadline_ms)
+        for _ in range(1000):
+            if updates and updates[-1]['done']:
+                break
+            time.sleep(0.01)
+        return updates[-1]
+
+    def test_job_state_follows_truncation(self):
+        groups = [{'id': 1, 'candidates': [{'name': 'A', 'schedule_bitmaps': [0, 3], 'selected': True}]}]
+        solve = ScheduleSolver.generate_schedules
+
+        def slow_but_complete(*args, **kwargs):
+            time.sleep(0.1)
+            return solve(*args, **kwargs)
+
+        # Finished just past the deadline: still a complete result
+        with patch('main.ScheduleSolver.generate_schedules', side_effect=slow_but_complete):
+            final = self.run_job(groups, deadline_ms=20)
+        self.assertEqual(final['state'], 'done')
+        self.assertEqual(len(final['schedules']), 1)
+
+        # Ten groups over nine Monday nodes: the search can't finish before the deadline
+        pigeonholes = [{'id': g, 'candidates': [
+            {'name': f'G{g}', 'teacher': f'T{n}', 'schedule_bitmaps': ['0', str(1 << n)], 'selected': True}
+            for n in range(9)]} for g in range(10)]
+        final = self.run_job(pigeonholes, deadline_ms=50)
+        self.assertEqual(final['state'], 'timeout')
+        self.assertGreater(final['stats']['stopped'], 0)
+        self.assertNotIn('infeasible', final)
+
     def test_save_flow(self):
         # Test Save
         groups_json = '[{"id": 1}]'
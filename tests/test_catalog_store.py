@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch
+
+from backend.catalog_store import CatalogStore, CatalogRefresher
+from backend.catalog_binary import BinaryCatalog, build_from_json, write_catalog
+from backend.catalog_diff import diff_rows, has_changes
+from backend.session_manager import SessionManager
+from backend.fetch_policy import FetchError, SESSION
+from jwFetcher import NJUCourseClient
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'dist', 'data', 'nju_courses_3_2025-2026-2.json')
+
+
+def scan(items, name, code, match_mode):
+    """Reference filter, same rules as dist/functions/search.js"""
+    keywords = (name or '').lower().split()
+    code = (code or '').lower().strip()
+    out = []
+    for item in items:
+        item_name = (item.get('name') or '').lower()
+        if keywords:
+            hits = [k in item_name for k in keywords]
+            if not (all(hits) if match_mode == 'AND' else any(hits)):
+                continue
+        if code and code not in (item.get('code') or '').lower():
+            continue
+        out.append(item)
+    return out
+
+
+class TestCatalogStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = CatalogStore(os.path.join(self.tmp, 'catalog.sqlite3'), ttl=3600)
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            self.items = json.load(f)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp)
+
+    def test_missing_catalog(self):
+        self.assertIsNone(self.store.search('3', '2025-2026-2', '数学'))
+        self.assertFalse(os.path.exists(self.store.db_path))
+
+    def test_search_matches_full_scan(self):
+        self.store.replace_catalog('3', '2025-2026-2', self.items)
+        self.assertEqual(self.store.load('3', '2025-2026-2'), self.items)
+        cases = [('数学', None, 'OR'), ('数学 物理', None, 'OR'), ('高等 数学', None, 'AND'),
+                 (None, '0000', 'OR'), ('英语', '00', 'AND'), ('不存在的课', None, 'OR')]
+        for name, code, mode in cases:
+            self.assertEqual(self.store.search('3', '2025-2026-2', name, code, mode),
+                             scan(self.items, name, code, mode), (name, code, mode))
+
+    def test_ttl(self):
+        self.store.replace_catalog('3', '2025-2026-2', self.items[:10], fetched_at=time.time() - 7200)
+        info = self.store.info('3', '2025-2026-2')
+        self.assertTrue(info['stale'])
+        self.assertEqual(info['row_count'], 10)
+
+        updates = []
+        refresher = CatalogRefresher(self.store, fetch=lambda c, s, previous: (self.items[:20], None, None),
+                                     on_update=lambda c, s, items, changes: updates.append(len(items)))
+        self.assertTrue(refresher.refresh_async('3', '2025-2026-2'))
+        for _ in range(500):
+            if updates:
+                break
+            time.sleep(0.01)
+        self.assertEqual(updates, [20])
+        info = self.store.info('3', '2025-2026-2')
+        self.assertFalse(info['stale'])
+        self.assertEqual(info['row_count'], 20)
+
+    def test_failed_refresh_keeps_catalog(self):
+        self.store.replace_catalog('3', '2025-2026-2', self.items[:10], fetched_at=time.time() - 7200)
+
+        def fetch(campus, semester, previous):
+            raise FetchError(SESSION, "redirected to login")
+
+        refresher = CatalogRefresher(self.store, fetch=fetch, retry_delay=3600)
+        refresher._refresh('3', '2025-2026-2')
+        self.assertEqual(len(self.store.load('3', '2025-2026-2')), 10)
+        self.assertTrue(self.store.info('3', '2025-2026-2')['stale'])
+        self.assertIn(('3', '2025-2026-2'), refresher.failures)
+        # Not retried on every stale search, only when due or forced
+        self.assertFalse(refresher.refresh_async('3', '2025-2026-2'))
+        refresher.fetch = lambda c, s, previous: (self.items[:20], None, None)
+        refresher.failures[('3', '2025-2026-2')]['retry_at'] = 0
+        self.assertTrue(refresher.refresh_async('3', '2025-2026-2'))
+        for _ in range(500):
+            if not refresher.failures:
+                break
+            time.sleep(0.01)
+        self.assertEqual(refresher.failures, {})
+        self.assertEqual(self.store.info('3', '2025-2026-2')['row_count'], 20)
+
+
+class TestBinaryCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip_and_json_export(self):
+        path = build_from_json(DATA_FILE, os.path.join(self.tmp, 'catalog.ncat'))
+        self.assertLess(os.path.getsize(path), os.path.getsize(DATA_FILE) // 2)
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        with BinaryCatalog(path) as catalog:
+            self.assertEqual(len(catalog), len(items))
+            self.assertEqual(catalog[-1], items[-1])
+            self.assertEqual(catalog.items(), items)
+            self.assertEqual(catalog.column('name'), [i['name'] for i in items])
+            self.assertEqual(catalog.week_masks(0), [int(x) for x in items[0]['schedule_bitmaps']])
+            out = os.path.join(self.tmp, 'export.json')
+            catalog.export_json(out)
+        with open(out, 'rb') as a, open(DATA_FILE, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_missing_values_and_bad_files(self):
+        item = {'name': None, 'code': 'X1', 'teacher': '', 'credit': 0.0, 'hours': 0.0, 'location_text': '',
+                'school': None, 'schedule_bitmaps': ['0'] * 26, 'sessions': []}
+        path = os.path.join(self.tmp, 'small.ncat')
+        write_catalog([item], path)
+        with BinaryCatalog(path) as catalog:
+            self.assertEqual(catalog.items(), [item])
+
+        with self.assertRaises(ValueError):
+            write_catalog([dict(item, schedule_bitmaps=['0'] * 26), dict(item, schedule_bitmaps=['0'])], path)
+        bad = os.path.join(self.tmp, 'bad.ncat')
+        with open(bad, 'w') as f:
+            f.write('[]')
+        with self.assertRaises(ValueError):
+            BinaryCatalog(bad)
+
+        store = CatalogStore(os.path.join(self.tmp, 'catalog.sqlite3'))
+        try:
+            self.assertEqual(store.import_binary('3', '2025-2026-2', path), 1)
+            self.assertEqual(store.load('3', '2025-2026-2'), [item])
+        finally:
+            store.close()
+
+
+def raw_section(i, **changes):
+    row = {"KCM": f"课程{i}", "KCH": f"{i:08d}", "KXH": "01", "SKJS": f"教师{i}",
+           "YPSJDD": f"周{'一二三四五'[i % 5]} {i % 9 + 1}-{i % 9 + 2}节 1-16周 仙Ⅱ-{i}",
+           "XF": "2", "XS": "32", "PKDWDM_DISPLAY": "数学系"}
+    row.update(changes)
+    return row
+
+
+class TestCatalogDiff(unittest.TestCase):
+    def test_only_changed_rows_are_reparsed(self):
+        old_pages = [[raw_section(i) for i in range(0, 30)], [raw_section(i) for i in range(30, 60)]]
+        _, records, baseline = diff_rows(old_pages, {}, NJUCourseClient.clean_row, NJUCourseClient.item_key)
+        self.assertTrue(baseline['baseline'])
+        self.assertFalse(has_changes(baseline))
+        items = NJUCourseClient.collect_items(old_pages)
+        previous = {sid: (fp, item) for item, (sid, fp) in zip(items, records)}
+
+        edits = {3: {'YPSJDD': "周六 1-2节 1-8周 仙Ⅱ-999"},  # time/place moved
+                 11: {'XF': "3"}}                           # credit changed
+        rows = [raw_section(i, **edits.get(i, {})) for i in range(0, 61) if i != 7]  # 7 removed, 60 added
+        pages = [rows[:25], rows[25:]]
+
+        with patch.object(NJUCourseClient, 'clean_row', wraps=NJUCourseClient.clean_row) as clean:
+            new_items, _, changes = diff_rows(pages, previous, clean, NJUCourseClient.item_key)
+        self.assertEqual(clean.call_count, 3)
+        self.assertEqual(new_items, NJUCourseClient.collect_items(pages))
+        self.assertTrue(has_changes(changes))
+        self.assertEqual([i['code'] for i in changes['added']], ['00000060'])
+        self.assertEqual([i['code'] for i in changes['removed']], ['00000007'])
+        self.assertEqual(sorted(m['section'] for m in changes['modified']), ['00000003/01', '00000011/01'])
+        self.assertEqual(changes['reused'], 57)
+
+        # Saved sessions referencing changed sections get flagged, the rest stays untouched
+        tmp = tempfile.mkdtemp()
+        try:
+            sm = SessionManager(tmp)
+            sm.save_session("a", [{'id': 1, 'candidates': [dict(items[3], selected=True), dict(items[7])]}])
+            sm.save_session("b", [{'id': 1, 'candidates': [dict(items[20])]}])
+            self.assertEqual(sm.flag_catalog_changes(changes), {'a.json': 2})
+            cands = sm.load_session("a")['groups'][0]['candidates']
+            self.assertEqual([c['catalog_status'] for c in cands], ['modified', 'removed'])
+            self.assertEqual(cands[0]['catalog_update']['location_text'], "周六 1-2节 1-8周 仙Ⅱ-999")
+            self.assertNotIn('catalog_status', sm.load_session("b")['groups'][0]['candidates'][0])
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.ranker import ScheduleRanker, DAY_GAPS, DAY_POPCOUNT
+from backend.batch_ranker import BatchRanker, numpy_available
+from backend.compiled_course import MAX_WEEKS, WEEK_BITS, unpack_week
+
+
+def course(week_masks):
+    bitmaps = ["0"] * 26
+    for w, m in week_masks.items():
+        bitmaps[w] = str(m)
+    return {'schedule_bitmaps': bitmaps}
+
+
+class TestScoringKernel(unittest.TestCase):
+    def test_day_tables(self):
+        self.assertEqual(len(DAY_GAPS), 8192)
+        self.assertEqual(DAY_GAPS[0b1000101], 4)
+        self.assertEqual(DAY_POPCOUNT[0b1000101], 3)
+
+    def test_breakdown(self):
+        # Mon nodes 1,2 and 5 in weeks 1-2; Sat node 3 in week 2
+        mon = (1 << 0) | (1 << 1) | (1 << 4)
+        sat = 1 << (5 * 13 + 2)
+        schedule = [course({1: mon, 2: mon}), course({2: sat})]
+        prefs = {
+            'avoid_early_morning': True, 'avoid_weekend': True, 'compactness': 'high',
+            'max_daily_load': 2, 'day_max_limit_enabled': True, 'day_max_limit_value': 2,
+            'day_max_limit_days': [True],
+        }
+        result = ScheduleRanker.evaluate_schedule(schedule, prefs)
+        self.assertEqual(result['details'], {
+            '早八回避': -4, '周末回避': -2.0, '课程紧凑': -(4 * 0.2),
+            '每日负载': -10.0, '特定日限制': -100.0,
+        })
+        self.assertAlmostEqual(result['score'], 100 - 4 - 2 - 0.8 - 10 - 100)
+        self.assertEqual(ScheduleRanker.score_schedule(schedule, prefs), result['score'])
+
+
+@unittest.skipUnless(numpy_available(), "numpy not installed")
+class TestBatchRanker(unittest.TestCase):
+    PREFS = [
+        {},
+        {'avoid_early_morning': True, 'avoid_weekend': True, 'compactness': 'low'},
+        {'compactness': 'high', 'max_daily_load': 3, 'day_max_limit_enabled': True,
+         'day_max_limit_value': 2, 'day_max_limit_days': [False, True, True]},
+    ]
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.merged = [rng.getrandbits(MAX_WEEKS * WEEK_BITS) & rng.getrandbits(MAX_WEEKS * WEEK_BITS)
+                       for _ in range(200)] + [0]
+
+    def test_matches_scalar(self):
+        import numpy as np
+        words = np.zeros((len(self.merged), MAX_WEEKS + 1, 2), dtype=np.uint64)
+        for i, m in enumerate(self.merged):
+            for w in range(1, MAX_WEEKS + 1):
+                week = unpack_week(m, w)
+                words[i, w, 0] = week & ((1 << 64) - 1)
+                words[i, w, 1] = week >> 64
+
+        for prefs in self.PREFS:
+            expected = [ScheduleRanker.evaluate_bitmap(m, prefs) for m in self.merged]
+            for batch in (BatchRanker.evaluate_packed(self.merged, prefs), BatchRanker.evaluate(words, prefs)):
+                self.assertEqual(batch['scores'].tolist(), [e['score'] for e in expected])
+                self.assertEqual(batch['details'], [e['details'] for e in expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.search_cache import SearchCache
+
+
+class TestSearchCache(unittest.TestCase):
+    def test_concurrent_identical_searches_share_one_fetch(self):
+        cache = SearchCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return [{'name': 'Math'}]
+
+        key = SearchCache.key('Math')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch(key, fetch)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for _ in range(500):
+            if cache.stats()['coalesced'] == 4:
+                break
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[{'name': 'Math'}]] * 5)
+        stats = cache.stats()
+        self.assertEqual((stats['misses'], stats['coalesced']), (1, 4))
+        self.assertEqual(cache.get_or_fetch(key, fetch), [{'name': 'Math'}])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_lru_ttl_and_errors(self):
+        cache = SearchCache(max_entries=2, ttl=60)
+        for name in ('a', 'b', 'c'):
+            cache.get_or_fetch(SearchCache.key(name), lambda: [name])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.get_or_fetch(SearchCache.key('a'), lambda: ['a2'])
+        self.assertEqual(cache.stats()['misses'], 4)
+
+        # Empty results and failures aren't cached
+        cache.get_or_fetch(SearchCache.key('empty'), lambda: [])
+        cache.get_or_fetch(SearchCache.key('empty'), lambda: [])
+        with self.assertRaises(RuntimeError):
+            cache.get_or_fetch(SearchCache.key('bad'), lambda: (_ for _ in ()).throw(RuntimeError("down")))
+        self.assertEqual(cache.stats()['misses'], 7)
+
+        cache.ttl = 0
+        cache.get_or_fetch(SearchCache.key('x', campus='3'), lambda: ['x'])
+        cache.get_or_fetch(SearchCache.key('x', campus='3'), lambda: ['x'])
+        self.assertEqual(cache.stats()['expired'], 1)
+
+        cache.invalidate(campus='1')
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.search_index import CatalogIndex
+from backend.solver import ScheduleSolver
+from backend.ranker import ScheduleRanker
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'dist', 'data', 'nju_courses_3_2025-2026-2.json')
+
+
+def scan(items, course_name=None, course_code=None, match_mode='OR', teacher=None):
+    """Linear reference, same rules as dist/functions/search.js (teacher keywords likewise)."""
+    out = []
+    for item in items:
+        ok = True
+        for field, query in (('name', course_name), ('teacher', teacher)):
+            keywords = (query or '').lower().split()
+            if keywords:
+                value = (item.get(field) or '').lower()
+                hits = [k in value for k in keywords]
+                ok = ok and (all(hits) if match_mode == 'AND' else any(hits))
+        code_q = (course_code or '').lower().strip()
+        if code_q and code_q not in (item.get('code') or '').lower():
+            ok = False
+        if ok:
+            out.append(item)
+    return out
+
+
+class TestCatalogIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            cls.items = json.load(f)
+        cls.index = CatalogIndex(cls.items)
+
+    def check(self, **query):
+        self.assertEqual(self.index.search(**query), scan(self.items, **query), query)
+
+    def test_fixed_queries(self):
+        self.check()
+        self.check(course_name='数学')
+        self.check(course_name='数 学', match_mode='AND')
+        self.check(course_name='高等 数学 英语', match_mode='OR')
+        self.check(course_name='  English  ')
+        self.check(course_name='学学')
+        self.check(course_name='不存在的课')
+        self.check(course_code='0000')
+        self.check(course_code='041')
+        self.check(course_code='zz')
+        self.check(course_name='英语', course_code='00', match_mode='AND')
+        self.check(teacher='王')
+        self.check(course_name='数学', teacher='王 李', match_mode='OR')
+
+    def test_random_substrings_match_scan(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            item = rng.choice(self.items)
+            name = item['name']
+            start = rng.randrange(len(name))
+            fragment = name[start:start + rng.randint(1, 5)]
+            other = rng.choice(self.items)['name'][:2]
+            mode = rng.choice(['OR', 'AND'])
+            code = item['code'][rng.randrange(8):][:rng.randint(0, 4)]
+            self.check(course_name=f"{fragment} {other}", course_code=code, match_mode=mode)
+
+
+class TestFreeSlotQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            cls.items = json.load(f)
+        cls.index = CatalogIndex(cls.items)
+        # A conflict-free plan of a few sections
+        cls.plan = []
+        for item in cls.items[::97]:
+            if not any(ScheduleSolver.courses_conflict(item, c) for c in cls.plan):
+                cls.plan.append(item)
+
+    def reference(self, pred=lambda item: True):
+        return [row for row, item in enumerate(self.items)
+                if pred(item) and not any(ScheduleSolver.courses_conflict(item, c) for c in self.plan)]
+
+    def test_matches_pairwise_conflicts(self):
+        self.assertGreater(len(self.plan), 5)
+        rows = [row for row, _ in self.index.fitting(self.plan)]
+        self.assertEqual(rows, self.reference())
+        self.assertEqual([row for row, _ in self.index.fitting(0)], list(range(len(self.items))))
+
+    def test_filters(self):
+        school = self.items[0]['school']
+        rows = [row for row, _ in self.index.fitting(self.plan, schools=[school], min_credit=2, max_credit=3)]
+        self.assertEqual(rows, self.reference(lambda i: i['school'] == school and 2 <= i['credit'] <= 3))
+
+        prefs = {'avoid_early_morning': True, 'compactness': 'high'}
+        base = ScheduleRanker.evaluate_schedule(self.plan, prefs)['score']
+        fits = self.index.fitting(self.plan, preferences=prefs, max_penalty=1.0)
+        self.assertTrue(fits)
+        for row, penalty in fits[:50]:
+            with_row = ScheduleRanker.evaluate_schedule(self.plan + [self.items[row]], prefs)['score']
+            self.assertAlmostEqual(penalty, base - with_row)
+            self.assertLessEqual(penalty, 1.0)
+        self.assertLess(len(fits), len(self.reference()))
+
+
+if __name__ == '__main__':
+    unittest.main()
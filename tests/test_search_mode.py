@@ -3,11 +3,16 @@ from unittest.mock import MagicMock, patch
 import json
 import sys
 import os
+import threading
+import time
 
 # Add repo root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from jwFetcher import NJUCourseClient
+import requests
+from jwFetcher import NJUCourseClient, AsyncNJUCourseClient, ScheduleBitmapper
+from backend.fetch_policy import (AdaptiveRateLimiter, FetchError, classify_error, classify_response,
+                                  NETWORK, SESSION)
 
 class TestSearchMode(unittest.TestCase):
     def setUp(self):
@@ -73,5 +78,275 @@ class TestSearchMode(unittest.TestCase):
         self.assertEqual(kcm_items[1]['value'], 'English')
         self.assertEqual(kcm_items[1]['linkOpt'], 'AND')
 
+
+def fake_catalog_rows(n=137):
+    """Raw qxfbkccx rows, including an exact duplicate and an empty teacher/location row."""
+    rows = []
+    for i in range(n):
+        rows.append({
+            "KCM": f"课程{i % 40}", "KCH": f"{i:08d}", "SKJS": f"教师{i % 7}",
+            "YPSJDD": f"周{'一二三四五'[i % 5]} {i % 10 + 1}-{i % 10 + 2}节 1-16周 仙Ⅱ-{i}",
+            "XF": "2", "XS": "32", "PKDWDM_DISPLAY": "数学系",
+        })
+    rows.insert(50, dict(rows[10]))
+    rows.insert(80, {"KCM": "空行", "KCH": "99999999", "SKJS": " ", "YPSJDD": ""})
+    return rows
+
+
+def fake_page_response(rows, data):
+    size, page = int(data['pageSize']), int(data['pageNumber'])
+    response = MagicMock()
+    response.json.return_value = {"datas": {"qxfbkccx": {
+        "rows": rows[(page - 1) * size:page * size], "totalSize": len(rows)}}}
+    return response
+
+
+class TestCatalogSync(unittest.TestCase):
+    def setUp(self):
+        with patch('jwFetcher.LoginInterceptor') as MockInterceptor:
+            MockInterceptor.return_value.get_cookie.return_value = "dummy_cookie"
+            self.client = NJUCourseClient()
+        self.rows = fake_catalog_rows()
+
+    @patch('jwFetcher.time.sleep')
+    @patch('requests.post')
+    def test_sync_matches_sequential_search(self, mock_post, _sleep):
+        mock_post.side_effect = lambda url, headers=None, data=None, timeout=None: fake_page_response(self.rows, data)
+        expected = self.client.search(campus="3", semester="2025-2026-2")
+
+        session = MagicMock()
+        session.post.side_effect = lambda url, headers=None, data=None, timeout=None: fake_page_response(self.rows, data)
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session):
+            items, report = self.client.sync_catalog("3", "2025-2026-2", page_size=25, concurrency=3)
+
+        self.assertEqual(items, expected)
+        self.assertEqual(len(items), len(self.rows) - 2)
+        self.assertEqual(report['pages'], 6)
+        self.assertEqual(report['rows'], len(self.rows))
+        self.assertTrue(session.close.called)
+
+
+class TestFetchPolicy(unittest.TestCase):
+    def setUp(self):
+        with patch('jwFetcher.LoginInterceptor') as MockInterceptor:
+            MockInterceptor.return_value.get_cookie.return_value = "dummy_cookie"
+            self.client = NJUCourseClient()
+        self.client.limiter = AdaptiveRateLimiter(rate=1000, burst=100)
+        self.rows = fake_catalog_rows(60)
+
+    def flaky_server(self, failures):
+        """failures: {page: [exception, ...]} raised in order before the page succeeds."""
+        def post(url, headers=None, data=None, timeout=None):
+            pending = failures.get(int(data['pageNumber']))
+            if pending:
+                raise pending.pop(0)
+            return fake_page_response(self.rows, data)
+        return post
+
+    def test_classification(self):
+        self.assertEqual(classify_error(requests.ConnectionError("reset")), NETWORK)
+        self.assertEqual(classify_error(requests.Timeout("slow")), NETWORK)
+        # A body that doesn't decode is transient; only the login page itself means SESSION
+        self.assertEqual(classify_error(json.JSONDecodeError("truncated", "{\"datas\": {", 12)), NETWORK)
+        login_page = MagicMock(status_code=200, url="https://ehallapp.nju.edu.cn/jwapp/sys/kcbcx/index.do",
+                               headers={'Content-Type': 'text/html;charset=UTF-8'}, text="<title>统一身份认证</title>")
+        self.assertEqual(classify_response(login_page), SESSION)
+        self.assertIsNone(classify_response(fake_page_response(self.rows, {'pageSize': '20', 'pageNumber': '1'})))
+
+    def test_error_rate_drives_rate(self):
+        steady = AdaptiveRateLimiter(rate=4.0, max_rate=100.0)
+        flaky = AdaptiveRateLimiter(rate=4.0, max_rate=100.0)
+        for limiter, failures in ((steady, 1), (flaky, 3)):
+            for _ in range(failures):
+                limiter.record(0.1, ok=False)
+        # Repeated errors cut deeper than the plain 30% per error
+        self.assertLess(flaky.rate, 4.0 * 0.7 ** 3)
+        steady_rate, flaky_rate = steady.rate, flaky.rate
+        steady.record(0.1)
+        flaky.record(0.1)
+        # ... and hold back the recovery while the error rate is still high
+        self.assertGreater(steady.rate - steady_rate, flaky.rate - flaky_rate)
+        self.assertGreater(flaky.error_rate, steady.error_rate)
+
+    @patch('jwFetcher.time.sleep')
+    @patch('requests.post')
+    def test_transient_errors_retry_page(self, mock_post, mock_sleep):
+        mock_post.side_effect = self.flaky_server({2: [requests.ConnectionError("reset"), requests.Timeout("slow")]})
+        with patch.object(self.client, 'ensure_active_session') as ensure:
+            items = self.client.search(campus="3")
+        self.assertEqual(len(items), len(self.rows) - 2)
+        self.assertEqual(mock_sleep.call_count, 2)  # backoff only, no session recovery
+        ensure.assert_not_called()
+
+    @patch('jwFetcher.time.sleep')
+    @patch('requests.post')
+    def test_failed_page_is_skipped(self, mock_post, _sleep):
+        mock_post.side_effect = self.flaky_server({2: [requests.ConnectionError("down")] * 10})
+        items = self.client.search(campus="3")
+        # Pages 1 and 3 still arrive
+        self.assertEqual(len(items), len(self.rows) - 2 - 20)
+
+    @patch('jwFetcher.time.sleep')
+    @patch('requests.post')
+    def test_session_error_recovers(self, mock_post, _sleep):
+        login_page = MagicMock(url="https://authserver.nju.edu.cn/authserver/login")
+        pages = iter([login_page])
+        mock_post.side_effect = lambda url, headers=None, data=None, timeout=None: (
+            next(pages, None) or fake_page_response(self.rows, data))
+        with patch.object(self.client, 'ensure_active_session') as ensure:
+            items = self.client.search(campus="3")
+        ensure.assert_called_once()
+        self.assertEqual(len(items), len(self.rows) - 2)
+
+    @patch('jwFetcher.time.sleep')
+    @patch('requests.post')
+    def test_decode_error_is_retried(self, mock_post, mock_sleep):
+        mock_post.side_effect = self.flaky_server({1: [json.JSONDecodeError("truncated", "{", 1)]})
+        with patch.object(self.client, 'ensure_active_session') as ensure:
+            items = self.client.search(campus="3")
+        ensure.assert_not_called()
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(len(items), len(self.rows) - 2)
+
+    @patch('jwFetcher.time.sleep')
+    def test_concurrent_session_errors_login_once(self, _sleep):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def post(url, headers=None, data=None, timeout=None):
+            if int(data['pageNumber']) > 1 and headers["Cookie"] == "dummy_cookie":
+                # Every worker sees the expired session before anyone recovers it
+                barrier.wait()
+                response = MagicMock()
+                response.url = "https://authserver.nju.edu.cn/authserver/login"
+                return response
+            return fake_page_response(self.rows, data)
+
+        def login():
+            self.client.headers["Cookie"] = "fresh_cookie"
+
+        session = MagicMock()
+        session.post.side_effect = post
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session), \
+                patch.object(self.client, 'ensure_active_session', side_effect=login) as ensure:
+            pages = self.client.fetch_catalog_pages("3", page_size=15, concurrency=3)
+        ensure.assert_called_once()
+        self.assertEqual(sum(len(rows) for rows in pages), len(self.rows))
+
+    @patch('jwFetcher.time.sleep')
+    def test_background_refresh_never_logs_in(self, _sleep):
+        login_page = MagicMock()
+        login_page.url = "https://authserver.nju.edu.cn/authserver/login"
+        session = MagicMock()
+        session.post.return_value = login_page
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session), \
+                patch.object(self.client, 'ensure_active_session') as ensure:
+            with self.assertRaises(FetchError) as ctx:
+                self.client.refresh_catalog({}, "3", interactive=False)
+        self.assertEqual(ctx.exception.kind, SESSION)
+        ensure.assert_not_called()
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        with patch('jwFetcher.LoginInterceptor') as MockInterceptor:
+            MockInterceptor.return_value.get_cookie.return_value = "dummy_cookie"
+            self.client = NJUCourseClient()
+        self.client.limiter = AdaptiveRateLimiter(rate=1000, burst=100)
+        self.rows = fake_catalog_rows(300)
+
+    def server(self, url, headers=None, data=None, timeout=None):
+        """Applies the KCH include filter of the querySetting, then pages."""
+        codes = [q['value'] for q in json.loads(data['querySetting']) if isinstance(q, dict) and q.get('name') == 'KCH']
+        rows = [r for r in self.rows if all(c in r['KCH'] for c in codes)]
+        return fake_page_response(rows, data)
+
+    @patch('requests.post')
+    def test_search_many_matches_search(self, mock_post):
+        mock_post.side_effect = self.server
+        codes = ['0000001', '000001', '0000029', 'nothing']
+        queries = [{'code': c, 'campus': '3', 'semester': '2025-2026-2'} for c in codes]
+        expected = [self.client.search(course_code=c, campus='3', semester='2025-2026-2') for c in codes]
+
+        session = MagicMock()
+        session.post.side_effect = self.server
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session):
+            out = AsyncNJUCourseClient(self.client, concurrency=3, page_size=7).search_many_blocking(queries)
+
+        self.assertEqual(out['results'], expected)
+        # '000001' contains every '0000001x' row, so the merged list drops them once
+        keys = [NJUCourseClient.item_key(i) for i in out['merged']]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(set(keys), {NJUCourseClient.item_key(i) for r in expected for i in r})
+        self.assertEqual([t['query']['code'] for t in out['timings']], codes)
+        self.assertTrue(all(t['error'] is None for t in out['timings']))
+
+    def test_failing_query_is_isolated(self):
+        def server(url, headers=None, data=None, timeout=None):
+            if '0000002' in data['querySetting']:
+                response = MagicMock()
+                response.json.return_value = []  # malformed payload, not a FetchError
+                return response
+            return self.server(url, headers, data, timeout)
+
+        session = MagicMock()
+        session.post.side_effect = server
+        queries = [{'code': c, 'campus': '3', 'semester': '2025-2026-2'} for c in ('0000001', '0000002')]
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session):
+            out = AsyncNJUCourseClient(self.client, concurrency=3, page_size=7).search_many_blocking(queries)
+
+        self.assertEqual(len(out['results'][0]), 11)
+        self.assertIsNone(out['timings'][0]['error'])
+        self.assertEqual(out['results'][1], [])
+        self.assertIsNotNone(out['timings'][1]['error'])
+
+    def test_failed_page_waits_for_siblings(self):
+        in_flight = []
+        closed_with = []
+
+        def server(url, headers=None, data=None, timeout=None):
+            page = int(data['pageNumber'])
+            if page == 2:
+                raise ValueError("malformed page")
+            if page > 2:
+                in_flight.append(page)
+                time.sleep(0.05)
+                in_flight.remove(page)
+            return self.server(url, headers, data, timeout)
+
+        session = MagicMock()
+        session.post.side_effect = server
+        session.close.side_effect = lambda: closed_with.append(list(in_flight))
+        queries = [{'code': '00000', 'campus': '3', 'semester': '2025-2026-2'}]
+        with patch.object(NJUCourseClient, '_pooled_session', return_value=session), \
+                patch.object(self.client.retry_policy, 'max_retries', 0):
+            out = AsyncNJUCourseClient(self.client, concurrency=3, page_size=20).search_many_blocking(queries)
+
+        self.assertIn("malformed page", out['timings'][0]['error'])
+        # The sibling pages had all settled before the shared session was closed
+        self.assertEqual(closed_with, [[]])
+
+
+class TestScheduleBitmapper(unittest.TestCase):
+    def test_matches_stored_catalog(self):
+        """Memoized parser reproduces the bitmaps/sessions stored in dist/data."""
+        path = os.path.join(os.path.dirname(__file__), '..', 'dist', 'data', 'nju_courses_3_2025-2026-2.json')
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        texts = [i['location_text'] for i in items]
+        for item, (bitmaps, sessions) in zip(items, ScheduleBitmapper.generate_bitmaps(texts)):
+            self.assertEqual(bitmaps, item['schedule_bitmaps'], item['location_text'])
+            self.assertEqual(sessions, item['sessions'], item['location_text'])
+
+    def test_results_are_fresh_copies(self):
+        text = "周一 1-2节 1-16周(单) 仙Ⅱ-101,周三 3-4节 2-8周 仙Ⅱ-102"
+        bitmaps, sessions = ScheduleBitmapper.generate_bitmap(text)
+        bitmaps[1] = "0"
+        sessions[0]['weeks'].append(99)
+        again, sessions_again = ScheduleBitmapper.generate_bitmap(text)
+        self.assertNotEqual(again[1], "0")
+        self.assertEqual(sessions_again[0]['weeks'], [1, 3, 5, 7, 9, 11, 13, 15])
+        self.assertEqual(sessions_again[1]['location'], "仙Ⅱ-102")
+
+
 if __name__ == '__main__':
     unittest.main()
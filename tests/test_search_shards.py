@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from build_search_shards import build_shards, validate, sample_queries, full_scan, catalog_sources
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+KEY = 'nju_courses_4_2025-2026-2'
+
+# Runs dist/functions/search.js with fetch() served from a local folder
+HARNESS = """
+import { readFile } from 'node:fs/promises';
+import path from 'node:path';
+const [root, moduleUrl, queriesJson] = process.argv.slice(2);
+const fetched = [];
+globalThis.fetch = async (u) => {
+    const rel = new URL(u).pathname;
+    fetched.push(rel);
+    try {
+        const body = await readFile(path.join(root, rel), 'utf-8');
+        return { ok: true, json: async () => JSON.parse(body) };
+    } catch (e) {
+        return { ok: false, json: async () => null };
+    }
+};
+const { onRequest } = await import(moduleUrl);
+const out = [];
+for (const q of JSON.parse(queriesJson)) {
+    fetched.length = 0;
+    const params = new URLSearchParams({ campus: '4', semester: '2025-2026-2', match_mode: q[2] });
+    if (q[0]) params.set('name', q[0]);
+    if (q[1]) params.set('code', q[1]);
+    const resp = await onRequest({ request: { url: 'http://edge.test/api/search?' + params } });
+    out.push({ status: resp.status, body: JSON.parse(await resp.text()), full: fetched.some(f => f.endsWith(`${q[3]}.json`) && !f.includes('/index/')) });
+}
+console.log(JSON.stringify(out));
+"""
+
+
+class TestSearchShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        with open(os.path.join(ROOT, 'dist', 'data', f'{KEY}.json'), 'r', encoding='utf-8') as f:
+            self.items = json.load(f)
+        self.data = os.path.join(self.tmp, 'data')
+        os.makedirs(os.path.join(self.data, 'index'))
+        shutil.copy(os.path.join(ROOT, 'dist', 'data', f'{KEY}.json'), self.data)
+        self.index_dir = os.path.join(self.data, 'index', KEY)
+        build_shards(self.items, self.index_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_layout_matches_full_scan(self):
+        mismatches, report = validate(self.items, self.index_dir)
+        self.assertEqual(mismatches, [])
+        self.assertGreater(report['queries'], 100)
+        with open(os.path.join(self.index_dir, 'manifest.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows'], len(self.items))
+
+    def test_sources_skip_sidecars(self):
+        for name in (f'{KEY}.sections.json', f'{KEY}.changes.json', f'{KEY}.ncat', 'nju_courses_x.json'):
+            with open(os.path.join(self.data, name), 'w', encoding='utf-8') as f:
+                f.write('{}')
+        self.assertEqual(catalog_sources(self.data), [os.path.join(self.data, f'{KEY}.json')])
+
+    @unittest.skipUnless(shutil.which('node'), "node not installed")
+    def test_edge_function(self):
+        module = os.path.join(self.tmp, 'search.mjs')
+        shutil.copy(os.path.join(ROOT, 'dist', 'functions', 'search.js'), module)
+        harness = os.path.join(self.tmp, 'harness.mjs')
+        with open(harness, 'w', encoding='utf-8') as f:
+            f.write(HARNESS)
+
+        queries = [list(q) + [KEY] for q in sample_queries(self.items, n=40)] + [[None, None, 'OR', KEY]]
+
+        def run():
+            proc = subprocess.run(['node', harness, self.tmp, 'file://' + module, json.dumps(queries)],
+                                  capture_output=True, text=True, timeout=60)
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            return json.loads(proc.stdout)
+
+        for q, res in zip(queries, run()):
+            self.assertEqual(res['status'], 200)
+            self.assertEqual(res['body'], [self.items[r] for r in full_scan(self.items, *q[:3])], q)
+            # Only the unfiltered query needs the whole dataset
+            self.assertEqual(res['full'], not (q[0] or q[1]), q)
+
+        # Without an index the function falls back to the full dataset
+        shutil.rmtree(self.index_dir)
+        for q, res in zip(queries, run()):
+            self.assertEqual(res['body'], [self.items[r] for r in full_scan(self.items, *q[:3])], q)
+            self.assertTrue(res['full'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,461 @@
+import unittest
+import itertools
+import random
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.solver import ScheduleSolver, TopKSearch
+from backend.ranker import ScheduleRanker, ScoringKernel
+from backend.compiled_course import compile_course, merge_packed, WEEK_BITS
+from backend.components import conflict_components, is_separable
+from backend.conflict_cache import ConflictCache
+from backend.feasible_cache import FeasibleCache
+from backend.diagnosis import DiagnosisAborted
+
+
+def make_course(name, week_masks, **extra):
+    """week_masks: {week: 91-bit mask}; bitmaps are emitted as strings like the fetcher does."""
+    bitmaps = ["0"] * 26
+    for w, m in week_masks.items():
+        bitmaps[w] = str(m)
+    course = {'name': name, 'schedule_bitmaps': bitmaps, 'selected': True}
+    course.update(extra)
+    return course
+
+
+def random_groups(rng, n_groups, n_cands):
+    """Random basket: each candidate has 1-2 sessions of 1-4 nodes over a week range."""
+    groups = []
+    for g in range(n_groups):
+        cands = []
+        for c in range(n_cands):
+            weeks = {}
+            for _ in range(rng.randint(1, 2)):
+                day = rng.randint(0, 6)
+                start = rng.randint(0, 10)
+                length = rng.randint(1, 3)
+                mask = sum(1 << (day * 13 + n) for n in range(start, min(13, start + length)))
+                first = rng.randint(1, 8)
+                for w in range(first, rng.randint(first, 18) + 1):
+                    weeks[w] = weeks.get(w, 0) | mask
+            cands.append(make_course(f'G{g}', weeks, teacher=f'T{c}'))
+        groups.append({'id': g, 'candidates': cands})
+    return groups
+
+
+def brute_force_scores(groups, preferences):
+    scores = []
+    seen = set()
+    for combo in itertools.product(*[g['candidates'] for g in groups]):
+        key = tuple(compile_course(c).packed for c in combo)
+        if key in seen or not ScheduleSolver.is_valid_combination(list(combo)):
+            continue
+        seen.add(key)
+        scores.append(ScheduleRanker.score_schedule(list(combo), preferences))
+    return sorted(scores, reverse=True)
+
+
+def split_basket():
+    # Groups 0/1 only in weeks 1-8, groups 2/3 only in weeks 10-18: two components
+    rng = random.Random(5)
+    groups = random_groups(rng, 4, 4)
+    for g, group in enumerate(groups):
+        for c in group['candidates']:
+            for w in range(1, 26):
+                if (g < 2) != (w <= 8):
+                    c['schedule_bitmaps'][w] = "0"
+    return groups
+
+
+PREFERENCE_CASES = [
+    {},
+    {'avoid_early_morning': True, 'avoid_weekend': True},
+    {'compactness': 'low'},
+    {'compactness': 'high', 'max_daily_load': 2},
+    {'day_max_limit_enabled': True, 'day_max_limit_value': 1,
+     'day_max_limit_days': [True, False, True, False, True, False, False], 'compactness': 'low'},
+]
+
+
+class TestCompiledCourse(unittest.TestCase):
+    def test_packed_layout(self):
+        c = make_course('A', {1: 0b11, 3: 1 << 90})
+        rec = compile_course(c)
+        self.assertEqual(rec.packed, 0b11 | (1 << (2 * WEEK_BITS + 90)))
+        self.assertEqual(rec.any_week, 0b11 | (1 << 90))
+        self.assertEqual(rec.weeks(), [1, 3])
+        # Same content -> same memoized record
+        self.assertIs(rec, compile_course(make_course('B', {1: 0b11, 3: 1 << 90})))
+
+    def test_conflict_details(self):
+        a = make_course('A', {2: 1 << 15, 5: 1})
+        b = make_course('B', {5: 1, 2: 1 << 16})
+        c = make_course('C', {2: 1 << 16})
+        self.assertEqual(ScheduleSolver.courses_conflict_with_details(a, b), (True, "Week 5 Day 1 Node 1"))
+        self.assertEqual(ScheduleSolver.courses_conflict_with_details(a, c), (False, ""))
+        self.assertTrue(ScheduleSolver.courses_conflict(b, c))
+
+
+class TestTopK(unittest.TestCase):
+    def test_pruned_search_is_exact(self):
+        rng = random.Random(7)
+        for trial in range(6):
+            groups = random_groups(rng, 4, 4)
+            for prefs in PREFERENCE_CASES:
+                expected = brute_force_scores(groups, prefs)[:5]
+                schedules, _ = ScheduleSolver.generate_schedules(groups, max_results=5, preferences=prefs)
+                got = [ScheduleRanker.score_schedule(s, prefs) for s in schedules]
+                for a, b in zip(got, expected):
+                    self.assertAlmostEqual(a, b, msg=f"trial {trial} prefs {prefs}")
+                self.assertEqual(len(got), len(expected))
+
+    def test_forward_checking(self):
+        # A's only section clashes with every section of C: the wipeout shows up at depth 1
+        a = [compile_course(make_course('A', {1: 0b1}))]
+        b = [compile_course(make_course('B', {1: 1 << n})) for n in range(2, 6)]
+        c = [compile_course(make_course('C', {1: 0b1, 2: 1 << n})) for n in range(3)]
+        static = TopKSearch([a, b, c], {}, 5, forward_checking=False)
+        static.run()
+        fc = TopKSearch([a, b, c], {}, 5)
+        fc.run()
+        self.assertEqual(static.results(), fc.results())
+        self.assertEqual(fc.stats['wipeouts'], 1)
+        self.assertEqual(fc.stats['nodes'], 1)
+        self.assertEqual(static.stats['nodes'], 5)
+
+        stats = {}
+        ScheduleSolver.generate_schedules(random_groups(random.Random(2), 4, 4), stats=stats)
+        self.assertGreater(stats['nodes'], 0)
+
+    def test_parallel_matches_serial(self):
+        groups = random_groups(random.Random(11), 5, 4)
+        for prefs in PREFERENCE_CASES[1:3]:
+            serial, _ = ScheduleSolver.generate_schedules(groups, max_results=6, preferences=prefs)
+            parallel, _ = ScheduleSolver.generate_schedules(groups, max_results=6, preferences=prefs, workers=2)
+            self.assertEqual([ScheduleRanker.score_schedule(s, prefs) for s in parallel],
+                             [ScheduleRanker.score_schedule(s, prefs) for s in serial])
+
+    def test_ties_follow_path_order(self):
+        # Without preferences every schedule scores 100: the top-K is decided by path alone
+        from backend.parallel_search import parallel_top_k
+        groups = random_groups(random.Random(11), 5, 4)
+        records = [[m['record'] for m in g] for g in ScheduleSolver._prepare_meta_groups(groups)]
+        for prefs in ({}, {'compactness': 'high'}, {'avoid_weekend': True}):
+            kernel = ScoringKernel.for_preferences(prefs)
+            leaves = []
+            for path in itertools.product(*[range(len(g)) for g in records]):
+                chosen = [records[g][i] for g, i in enumerate(path)]
+                if all(not (a.packed & b.packed) for a, b in itertools.combinations(chosen, 2)):
+                    leaves.append((kernel.score(merge_packed(chosen)), path))
+            expected = sorted(leaves, key=lambda e: (-e[0], e[1]))[:6]
+            for fc in (True, False):
+                search = TopKSearch(records, prefs, 6, forward_checking=fc)
+                search.run()
+                self.assertEqual(search.results(), expected, msg=f"prefs {prefs} fc {fc}")
+            top, _ = parallel_top_k(records, prefs, 6, 2)
+            self.assertEqual(top, expected, msg=f"prefs {prefs} parallel")
+
+    def test_progress_can_stop_search(self):
+        groups = random_groups(random.Random(10), 7, 6)
+        prefs = {'compactness': 'low'}
+        full, total = ScheduleSolver.generate_schedules(groups, max_results=5, preferences=prefs)
+        calls = []
+
+        def stop_now(partial):
+            calls.append(partial.found)
+            return True
+
+        with patch('backend.solver._PROGRESS_NODES', 16):
+            partial, found = ScheduleSolver.generate_schedules(
+                groups, max_results=5, preferences=prefs, progress=stop_now)
+        self.assertTrue(calls)
+        self.assertLess(found, total)
+        for schedule in partial:
+            self.assertTrue(ScheduleSolver.is_valid_combination(schedule))
+
+
+class TestComponents(unittest.TestCase):
+    def test_component_split(self):
+        groups = split_basket()
+        records = [[compile_course(c)] for g in groups for c in g['candidates'][:1]]
+        comps = conflict_components(records)
+        self.assertTrue(all(set(c) <= {0, 1} or set(c) <= {2, 3} for c in comps))
+        self.assertTrue(is_separable(comps, records, {'avoid_early_morning': True, 'compactness': 'high'}))
+
+    def test_decomposed_ties_follow_joint_order(self):
+        # Single-node sections over three week bands: several components, many equal scores
+        rng = random.Random(8)
+        checked = 0
+        for trial in range(150):
+            groups = []
+            for g in range(rng.randint(3, 6)):
+                band = rng.randint(0, 2)
+                groups.append({'id': g, 'candidates': [
+                    make_course(f'G{g}', {w: 1 << rng.randrange(91) for w in range(1 + 6 * band, 3 + 6 * band)},
+                                teacher=f'T{c}') for c in range(rng.randint(2, 4))]})
+            prefs = PREFERENCE_CASES[trial % len(PREFERENCE_CASES)]
+            records = [[m['record'] for m in g] for g in ScheduleSolver._prepare_meta_groups(groups)]
+            comps = conflict_components(records)
+            if len(comps) < 2 or not is_separable(comps, records, prefs):
+                continue
+            checked += 1
+            k = 1 + trial % 5
+            joint, _ = ScheduleSolver._solve_joint(records, prefs, k, None)
+            merged, _ = ScheduleSolver._solve_components(records, comps, prefs, k, None)
+            self.assertEqual([p for _, p in merged], [p for _, p in joint], msg=f"trial {trial}")
+            cached = FeasibleCache().get(records, TopKSearch._compat_masks)
+            if cached is not None:
+                self.assertEqual([p for _, p in cached.top_k(prefs, k)], [p for _, p in joint], msg=f"trial {trial}")
+        self.assertGreater(checked, 50)
+
+    def test_decomposed_total_is_explored_leaves(self):
+        groups = split_basket()
+        stats = {}
+        _, total = ScheduleSolver.generate_schedules(groups, max_results=3, preferences={}, stats=stats)
+        # Leaves visited over all component searches, not a product of pruned counts
+        self.assertEqual(total, stats['leaves'])
+
+    def test_stop_keeps_a_leaf_per_component(self):
+        # Two components (weeks 1 / 2) of two clashing groups each
+        groups = [{'id': g, 'candidates': [make_course(f'G{g}', {1 + g // 2: 1 << n}, teacher=f'T{n}')
+                                           for n in range(3)]} for g in range(4)]
+        calls = []
+
+        def stop_now(partial):
+            calls.append(partial.found)
+            return True
+
+        with patch('backend.solver._PROGRESS_NODES', 1):
+            schedules, _ = ScheduleSolver.generate_schedules(groups, max_results=5, progress=stop_now)
+        self.assertTrue(calls)
+        self.assertTrue(schedules)
+        for schedule in schedules:
+            self.assertEqual(len(schedule), len(groups))
+            self.assertTrue(ScheduleSolver.is_valid_combination(schedule))
+
+    def test_decomposed_search_is_exact(self):
+        groups = split_basket()
+        for prefs in PREFERENCE_CASES:
+            expected = brute_force_scores(groups, prefs)[:7]
+            schedules, _ = ScheduleSolver.generate_schedules(groups, max_results=7, preferences=prefs)
+            got = [ScheduleRanker.score_schedule(s, prefs) for s in schedules]
+            self.assertEqual(len(got), len(expected))
+            for a, b in zip(got, expected):
+                self.assertAlmostEqual(a, b, msg=f"prefs {prefs}")
+
+
+class TestConflictCache(unittest.TestCase):
+    def test_matches_uncached_and_reuses_rows(self):
+        rng = random.Random(9)
+        groups = random_groups(rng, 5, 4)
+        for g in groups:
+            for i, c in enumerate(g['candidates']):
+                c['code'] = f"{c['name']}-{i}"
+                c['location_text'] = f"loc {i}"
+        cache = ConflictCache()
+        expected = ScheduleSolver.check_conflicts(groups)
+        self.assertEqual(ScheduleSolver.check_conflicts(groups, cache=cache), expected)
+        misses = cache.misses
+        self.assertEqual(ScheduleSolver.check_conflicts(groups, cache=cache), expected)
+        self.assertEqual(cache.misses, misses)
+
+        # Selecting a fresh candidate only computes its own pairs
+        extra = make_course('G0', {1: 1}, code='G0-x', location_text='loc x')
+        groups[0]['candidates'].append(extra)
+        ScheduleSolver.check_conflicts(groups, cache=cache)
+        self.assertLessEqual(cache.misses - misses, sum(len(g['candidates']) for g in groups[1:]))
+
+    def test_catalog_change_invalidates_row(self):
+        a = make_course('A', {1: 0b1}, code='A1', location_text='x')
+        b = make_course('B', {1: 0b1}, code='B1', location_text='y')
+        cache = ConflictCache()
+        self.assertTrue(cache.conflict(a, b)[0])
+        moved = make_course('A', {1: 0b10}, code='A1', location_text='x')
+        cache.refresh([moved])
+        self.assertEqual(cache.stats()['rows'], 1)
+        self.assertEqual(cache.conflict(moved, b), (False, ""))
+
+
+class TestFeasibleCache(unittest.TestCase):
+    def test_rerank_matches_search(self):
+        groups = random_groups(random.Random(3), 5, 4)
+        cache = FeasibleCache()
+        stats = {}
+        for prefs in PREFERENCE_CASES:
+            expected, total = ScheduleSolver.generate_schedules(groups, max_results=6, preferences=prefs)
+            got, found = ScheduleSolver.generate_schedules(groups, max_results=6, preferences=prefs,
+                                                           feasible_cache=cache, stats=stats)
+            self.assertEqual([ScheduleRanker.score_schedule(s, prefs) for s in got],
+                             [ScheduleRanker.score_schedule(s, prefs) for s in expected])
+            self.assertEqual(found, len(brute_force_scores(groups, {})))
+        # Enumerated once, every preference change after that is a hit
+        self.assertEqual(stats['cache_misses'], 1)
+        self.assertEqual(stats['cache_hits'], len(PREFERENCE_CASES) - 1)
+
+        groups[0]['candidates'].pop()
+        ScheduleSolver.generate_schedules(groups, feasible_cache=cache, stats=stats)
+        self.assertEqual(stats['cache_misses'], 2)
+
+    def test_overflow_falls_back_to_search(self):
+        groups = random_groups(random.Random(3), 5, 4)
+        prefs = {'compactness': 'high'}
+        cache = FeasibleCache(max_combinations=3)
+        stats = {}
+        expected, total = ScheduleSolver.generate_schedules(groups, max_results=4, preferences=prefs)
+        for _ in range(2):
+            got, found = ScheduleSolver.generate_schedules(groups, max_results=4, preferences=prefs,
+                                                           feasible_cache=cache, stats=stats)
+            self.assertEqual(found, total)
+            self.assertEqual([ScheduleRanker.score_schedule(s, prefs) for s in got],
+                             [ScheduleRanker.score_schedule(s, prefs) for s in expected])
+        # The over-sized basket isn't enumerated a second time
+        self.assertEqual(stats['cache_overflows'], 1)
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertGreater(stats['nodes'], 0)
+
+    def test_enumeration_is_bounded_and_stoppable(self):
+        # n groups over n-1 shared slots: no leaf at all, but a factorial dead-end tree
+        groups = pigeonholes(10)
+        cache = FeasibleCache()
+        calls = []
+
+        def cancel(partial):
+            calls.append(partial.found)
+            return True
+
+        started = time.perf_counter()
+        schedules, _ = ScheduleSolver.generate_schedules(groups, progress=cancel, feasible_cache=cache)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(schedules, [])
+        self.assertTrue(calls)
+        # An interrupted enumeration isn't remembered as an overflow
+        self.assertEqual(cache.stats()['overflows'], 0)
+
+        cache = FeasibleCache(max_nodes=5000)
+        stats = {}
+        with patch('backend.solver.TopKSearch.run') as run:
+            ScheduleSolver.generate_schedules(groups[:4], feasible_cache=cache, stats=stats)
+            self.assertFalse(run.called)
+        self.assertEqual(stats['cache_misses'], 1)
+        self.assertEqual(ScheduleSolver.generate_schedules(pigeonholes(8), feasible_cache=cache, stats=stats)[0], [])
+        self.assertEqual(stats['cache_overflows'], 1)
+
+
+class TestCounting(unittest.TestCase):
+    def test_count_matches_enumeration(self):
+        rng = random.Random(4)
+        for trial in range(8):
+            groups = random_groups(rng, 5, 4)
+            # Same-time sections with another teacher: one meta-candidate, two sections
+            for g in groups[:2]:
+                g['candidates'].append(dict(g['candidates'][0], teacher='Twin'))
+            metas = len(brute_force_scores(groups, {}))
+            sections = sum(1 for combo in itertools.product(*[g['candidates'] for g in groups])
+                           if ScheduleSolver.is_valid_combination(list(combo)))
+            # An unpruned joint search visits every leaf
+            records = [[m['record'] for m in g] for g in ScheduleSolver._prepare_meta_groups(groups)]
+            search = TopKSearch(records, {}, 10 ** 6)
+            search.run()
+            self.assertEqual(ScheduleSolver.count_schedules(groups), metas, msg=f"trial {trial}")
+            self.assertEqual(search.total_found, metas)
+            self.assertEqual(ScheduleSolver.count_schedules(groups, with_alternatives=True), sections,
+                             msg=f"trial {trial}")
+
+    def test_independent_parts_are_multiplied(self):
+        # Two disjoint halves: the count is the product, found through splits and memo hits
+        groups = split_basket()
+        stats = {}
+        total = ScheduleSolver.count_schedules(groups, stats=stats)
+        left = ScheduleSolver.count_schedules(groups[:2])
+        right = ScheduleSolver.count_schedules(groups[2:])
+        self.assertEqual(total, left * right)
+        self.assertGreater(stats['splits'], 0)
+        for c in groups[0]['candidates']:
+            c['selected'] = False
+        self.assertEqual(ScheduleSolver.count_schedules(groups), 0)
+
+    def test_budget_gives_unknown(self):
+        groups = pigeonholes(11)
+        stats = {}
+        self.assertIsNone(ScheduleSolver.count_schedules(groups, stats=stats, max_nodes=500))
+        self.assertEqual(stats['nodes'], 501)
+        # The clock is read every 1024 nodes, the full count takes about 5000
+        self.assertIsNone(ScheduleSolver.count_schedules(groups, max_seconds=0))
+        self.assertEqual(ScheduleSolver.count_schedules(groups, max_nodes=10 ** 6, max_seconds=60), 0)
+
+
+def pigeonholes(n):
+    # n groups over n - 1 single-node slots: infeasible, with a dead-end tree that grows factorially
+    return [{'id': g, 'candidates': [make_course(f'G{g}', {1: 1 << s}, teacher=f'T{s}')
+                                     for s in range(n - 1)]} for g in range(n)]
+
+
+def pigeonhole_basket():
+    # A, B, C each need node 1 or node 2 of Monday week 1: any two fit, the three don't.
+    # D (week 2) is unrelated.
+    groups = [{'id': i, 'candidates': [make_course(n, {1: 0b01}, teacher='x'),
+                                       make_course(n, {1: 0b10}, teacher='y')]}
+              for i, n in enumerate('ABC')]
+    groups.insert(1, {'id': 9, 'candidates': [make_course('D', {2: 1})]})
+    return groups
+
+
+class TestDiagnosis(unittest.TestCase):
+    def test_three_way_core(self):
+        groups = pigeonhole_basket()
+        self.assertEqual(ScheduleSolver.check_conflicts(groups), [])
+        self.assertEqual(ScheduleSolver.generate_schedules(groups)[0], [])
+        core = ScheduleSolver.diagnose_infeasible(groups)
+        self.assertEqual(core['groups'], [0, 2, 3])
+        self.assertEqual(core['names'], ['A', 'B', 'C'])
+        self.assertEqual(core['slots'], ["Week 1 Day 1 Node 1", "Week 1 Day 1 Node 2"])
+        self.assertIn("Week 1 Day 1 Node 2", core['message'])
+        self.assertIsNone(ScheduleSolver.diagnose_infeasible(groups[:3]))
+
+        for c in groups[1]['candidates']:
+            c['selected'] = False
+        self.assertEqual(ScheduleSolver.diagnose_infeasible(groups)['groups'], [1])
+
+    def test_core_is_minimal(self):
+        rng = random.Random(12)
+        diagnosed = 0
+        for trial in range(40):
+            # Two single-node sections per group over seven Monday nodes: often infeasible
+            groups = [{'id': g, 'candidates': [make_course(f'G{g}', {1: 1 << rng.randrange(7)}, teacher=t)
+                                               for t in 'xy']} for g in range(6)]
+            core = ScheduleSolver.diagnose_infeasible(groups)
+            if not brute_force_scores(groups, {}):
+                self.assertIsNotNone(core, msg=f"trial {trial}")
+            if core is None:
+                continue
+            diagnosed += 1
+            subset = [groups[i] for i in core['groups']]
+            self.assertEqual(brute_force_scores(subset, {}), [], msg=f"trial {trial}")
+            for drop in range(len(subset)):
+                rest = subset[:drop] + subset[drop + 1:]
+                self.assertTrue(brute_force_scores(rest, {}), msg=f"trial {trial} drop {drop}")
+        self.assertGreater(diagnosed, 0)
+
+    def test_budget_and_stop(self):
+        groups = pigeonholes(9)
+        stats = {}
+        with self.assertRaises(DiagnosisAborted):
+            ScheduleSolver.diagnose_infeasible(groups, stats=stats, max_nodes=5000)
+        self.assertLessEqual(stats['nodes'], 5001)
+        polls = []
+        started = time.perf_counter()
+        with self.assertRaises(DiagnosisAborted):
+            ScheduleSolver.diagnose_infeasible(groups, stop=lambda: polls.append(1) or True)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(polls), 1)
+        # Within budget the result is unchanged
+        self.assertEqual(ScheduleSolver.diagnose_infeasible(pigeonhole_basket(), max_nodes=5000)['groups'],
+                         [0, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()